@@ -49,11 +49,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'interview_core.middleware.ServerTimingMiddleware',
+    'interview_core.middleware.QueryInstrumentationMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'interview_core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -181,3 +184,148 @@ else:
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Point at loadtest/fake_openrouter.py (e.g. http://127.0.0.1:9100/api/v1) to run without real LLM calls
+OPENROUTER_BASE_URL = os.getenv('OPENROUTER_BASE_URL', 'https://openrouter.ai/api/v1')
+
+# 'whisper' runs openai/whisper-tiny on CPU; 'stub' skips decoding and burns
+# STUB_TRANSCRIBE_SECONDS of CPU instead, for load tests without the model
+TRANSCRIBER_BACKEND = os.getenv('TRANSCRIBER_BACKEND', 'whisper').lower()
+STUB_TRANSCRIBE_SECONDS = float(os.getenv('STUB_TRANSCRIBE_SECONDS', '0.5'))
+
+# Outbound OpenRouter rate limit, shared by all workers through the database.
+# Calls queue for a token for up to OPENROUTER_MAX_QUEUE_WAIT seconds.
+OPENROUTER_RATE_LIMIT = float(os.getenv('OPENROUTER_RATE_LIMIT', '2'))  # requests per second
+OPENROUTER_BURST = int(os.getenv('OPENROUTER_BURST', '5'))
+OPENROUTER_MAX_QUEUE_WAIT = float(os.getenv('OPENROUTER_MAX_QUEUE_WAIT', '20'))
+
+# Ordered model fallback chain per LLM operation (comma-separated OpenRouter model ids)
+def _model_chain(env_name, default):
+    return [model.strip() for model in os.getenv(env_name, default).split(',') if model.strip()]
+
+LLM_MODELS = {
+    'generate': _model_chain('LLM_GENERATE_MODELS', 'openai/gpt-3.5-turbo'),
+    'evaluate': _model_chain('LLM_EVALUATE_MODELS', 'openai/gpt-3.5-turbo'),
+    # Used instead of 'evaluate' once load shedding starts
+    'evaluate_degraded': _model_chain('LLM_DEGRADED_EVALUATE_MODELS', 'mistralai/mistral-7b-instruct'),
+    'parse_resume': _model_chain('LLM_PARSE_RESUME_MODELS', 'mistralai/mistral-7b-instruct'),
+}
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '30'))
+# A hedged request goes to the next model once a call outlives that model's p95 latency
+LLM_HEDGE = os.getenv('LLM_HEDGE', 'True').lower() == 'true'
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '10'))  # until enough samples
+LLM_HEDGE_MIN_DELAY = float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))
+# A model is skipped for LLM_BREAKER_COOLDOWN seconds after this many consecutive failures
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '30'))
+LLM_MAX_THREADS = int(os.getenv('LLM_MAX_THREADS', '32'))
+# 'live' calls OpenRouter; 'record' also saves each successful completion to
+# LLM_FIXTURES_PATH; 'replay' answers from that file only, with no network or API key.
+# Replayed calls wait their recorded latency times LLM_REPLAY_LATENCY_SCALE (0 = instant).
+LLM_TRANSPORT = os.getenv('LLM_TRANSPORT', 'live').lower()
+LLM_FIXTURES_PATH = os.getenv('LLM_FIXTURES_PATH', str(BASE_DIR / 'llm_fixtures.jsonl.gz'))
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv('LLM_REPLAY_LATENCY_SCALE', '0'))
+
+# Single-flight coalescing of identical in-flight requests (see interview_core/singleflight.py)
+SINGLEFLIGHT_WAIT_TIMEOUT = float(os.getenv('SINGLEFLIGHT_WAIT_TIMEOUT', '120'))
+SINGLEFLIGHT_STALE_AFTER = float(os.getenv('SINGLEFLIGHT_STALE_AFTER', '180'))  # leader presumed dead
+SINGLEFLIGHT_REUSE_SECONDS = float(os.getenv('SINGLEFLIGHT_REUSE_SECONDS', '10'))  # double-clicks after completion
+# How long a stored response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_KEY_TTL = float(os.getenv('IDEMPOTENCY_KEY_TTL', str(24 * 60 * 60)))
+
+# Per-user admission control on expensive endpoints (generate, submit answer, resume upload)
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'True').lower() == 'true'
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '2'))
+ADMISSION_RATE_PER_MINUTE = float(os.getenv('ADMISSION_RATE_PER_MINUTE', '30'))
+ADMISSION_BURST = int(os.getenv('ADMISSION_BURST', '10'))
+ADMISSION_LEASE_SECONDS = int(os.getenv('ADMISSION_LEASE_SECONDS', '300'))
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '2'))  # seconds, when at the concurrency cap
+
+# Load-shedding degradation levels (see interview_core/degradation.py). Each list
+# holds the threshold for levels 1-4: cheaper evaluation model, brief evaluation,
+# question bank reuse, typed answers only.
+def _thresholds(env_name, default):
+    return [float(value) for value in os.getenv(env_name, default).split(',')]
+
+DEGRADE_QUEUE_DEPTH = _thresholds('DEGRADE_QUEUE_DEPTH', '20,40,60,80')  # in-flight expensive requests
+DEGRADE_LATENCY_P95 = _thresholds('DEGRADE_LATENCY_P95', '20,30,45,60')  # seconds
+DEGRADE_RECOVERY_RATIO = float(os.getenv('DEGRADE_RECOVERY_RATIO', '0.7'))
+DEGRADE_HOLD_SECONDS = float(os.getenv('DEGRADE_HOLD_SECONDS', '30'))
+# Pin a level (0-4) instead of measuring load, e.g. for drills or load tests
+DEGRADATION_LEVEL = int(os.getenv('DEGRADATION_LEVEL')) if os.getenv('DEGRADATION_LEVEL') else None
+
+# Per-stage timing: Server-Timing headers and the Prometheus /metrics endpoint.
+# METRICS_TOKEN lets a scraper in with "Authorization: Bearer <token>"; staff
+# users can always view it. Set METRICS_DIR to a directory shared by the
+# gunicorn workers to aggregate their metrics into one scrape.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+# Server-Timing headers are on by default only with DEBUG; outside DEBUG the
+# LLM model names in their desc are only shown to staff
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)).lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+
+# On-demand request profiling (staff with ?_profile=1, or a token from
+# `manage.py profile_token`). When disabled the middleware is not installed at all.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(BASE_DIR / 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '50'))  # ring buffer size
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))  # seconds between stack samples
+PROFILE_TOKEN_MAX_AGE = int(os.getenv('PROFILE_TOKEN_MAX_AGE', '3600'))
+
+# Worker memory watchdog (started by gunicorn.conf.py). A worker whose PSS passes
+# MEMORY_CEILING_MB restarts gracefully; 0 disables the ceiling but keeps sampling.
+MEMORY_WATCHDOG = os.getenv('MEMORY_WATCHDOG', 'True').lower() == 'true'
+MEMORY_WATCHDOG_INTERVAL = float(os.getenv('MEMORY_WATCHDOG_INTERVAL', '30'))
+MEMORY_CEILING_MB = float(os.getenv('MEMORY_CEILING_MB', '0'))
+# tracemalloc slows allocation-heavy code noticeably; enable while hunting a leak
+MEMORY_TRACEMALLOC = os.getenv('MEMORY_TRACEMALLOC', 'False').lower() == 'true'
+MEMORY_TRACEMALLOC_FRAMES = int(os.getenv('MEMORY_TRACEMALLOC_FRAMES', '1'))
+
+# Data retention for `manage.py purge_retention`: rows older than this many days
+# are deleted per policy (0 keeps them forever). Deletes run in primary key
+# batches of RETENTION_BATCH_SIZE with RETENTION_BATCH_SLEEP seconds between them.
+RETENTION_DAYS = {
+    'answers': int(os.getenv('RETENTION_ANSWERS_DAYS', '0')),
+    'unsaved_questions': int(os.getenv('RETENTION_UNSAVED_QUESTIONS_DAYS', '90')),  # never answered or saved
+    'resumes': int(os.getenv('RETENTION_RESUMES_DAYS', '180')),  # superseded by a newer upload
+    'coalesced_calls': int(os.getenv('RETENTION_COALESCED_CALLS_DAYS', '2')),  # at least IDEMPOTENCY_KEY_TTL
+    'request_profiles': int(os.getenv('RETENTION_REQUEST_PROFILES_DAYS', '14')),
+}
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_BATCH_SLEEP = float(os.getenv('RETENTION_BATCH_SLEEP', '0.2'))
+
+# Cold archive (`manage.py archive_history`): questions and answers older than
+# ARCHIVE_AFTER_DAYS move to compressed JSON-lines files under ARCHIVE_DIR, one
+# directory per month, split into ARCHIVE_USER_BUCKETS files by user id.
+# ARCHIVE_COMPRESSION is 'gzip' or 'zstd' (needs the zstandard package).
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_USER_BUCKETS = int(os.getenv('ARCHIVE_USER_BUCKETS', '16'))
+ARCHIVE_COMPRESSION = os.getenv('ARCHIVE_COMPRESSION', 'gzip').lower()
+
+# DEBUG/INFO records are kept for this fraction of requests; warnings always are
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '1.0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'sampled': {'()': 'interview_core.logsampling.SampledFilter'},
+    },
+    'formatters': {
+        'standard': {'format': '%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'standard',
+            'filters': ['sampled'],
+        },
+    },
+    'loggers': {
+        'interview_core': {'handlers': ['console'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
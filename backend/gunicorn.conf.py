@@ -0,0 +1,86 @@
+"""
+Gunicorn configuration for the backend.
+
+Gunicorn reads ./gunicorn.conf.py automatically, so `gunicorn` alone starts
+backend.wsgi:application with these settings.
+
+Set PRELOAD_TRANSCRIBER=True to load the Whisper model once in the master
+process before workers fork. Workers then share the weight pages copy-on-write
+instead of each loading its own copy, so more workers fit in the same RAM.
+Each worker logs its RSS/PSS/shared/private memory after boot; run
+`python manage.py memory_report` for a live per-worker breakdown.
+
+Set SERVER_MODE=asgi to serve backend.asgi:application with uvicorn workers
+instead. The async endpoints (/api/async/..., /async/upload-resume/) then wait
+on the LLM without holding a thread, so a single worker can keep hundreds of
+OpenRouter calls in flight.
+
+Set MEMORY_CEILING_MB to have each worker restart itself gracefully (finishing
+in-flight requests first) once its PSS passes the ceiling; see
+interview_core/watchdog.py.
+
+Set METRICS_DIR to a directory for the workers' metric snapshots so /metrics
+reports the whole server; it is emptied when gunicorn starts.
+"""
+
+import logging
+import os
+import sys
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi').lower()
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# Slow startups (e.g. transformers/torch) and LLM calls need a generous timeout
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '180'))
+pidfile = os.getenv('GUNICORN_PIDFILE', '/tmp/gunicorn.pid')
+
+PRELOAD_TRANSCRIBER = os.getenv('PRELOAD_TRANSCRIBER', 'False').lower() == 'true'
+
+# The app must be imported in the master for the model loaded there to be inherited
+preload_app = PRELOAD_TRANSCRIBER
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def on_starting(server):
+    """Drop metric snapshots left by a previous run"""
+    metrics_dir = os.getenv('METRICS_DIR')
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for filename in os.listdir(metrics_dir):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(metrics_dir, filename))
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before any worker forks"""
+    if not PRELOAD_TRANSCRIBER:
+        return
+
+    from interview_core.memory import process_memory, format_memory
+    from interview_core.services import preload_transcriber
+
+    if preload_transcriber():
+        server.log.info("Preloaded transcription model in master: %s", format_memory(process_memory()))
+    else:
+        server.log.warning("PRELOAD_TRANSCRIBER is set but the transcription model could not be loaded")
+
+
+def post_fork(server, worker):
+    # torch's intra-op thread pool does not survive fork; keep workers single-threaded
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(int(os.getenv('TORCH_NUM_THREADS', '1')))
+
+
+def post_worker_init(worker):
+    from interview_core.memory import process_memory, format_memory
+    from interview_core.watchdog import start_watchdog
+
+    worker.log.info("Worker %s booted: %s", worker.pid, format_memory(process_memory()))
+    # Recycles the worker gracefully once it passes MEMORY_CEILING_MB
+    start_watchdog()
@@ -1,2 +1,59 @@
 from django.contrib import admin
-# Register your models here.
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import RequestProfile
+from .profiling import hottest_functions
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'samples', 'user', 'download_link')
+    list_filter = ('method', 'status_code')
+    list_select_related = ('user',)
+    search_fields = ('path',)
+    readonly_fields = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'samples', 'user',
+                       'download_link', 'hottest')
+    exclude = ('file_name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='interview_core_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        try:
+            handle = open(profile.file_path, 'rb')
+        except FileNotFoundError:
+            raise Http404("Profile file is no longer on disk")
+        return FileResponse(handle, as_attachment=True, filename=profile.file_name, content_type='text/plain')
+
+    @admin.display(description='Collapsed stacks')
+    def download_link(self, obj):
+        url = reverse('admin:interview_core_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, obj.file_name)
+
+    @admin.display(description='Hottest functions (self samples)')
+    def hottest(self, obj):
+        rows = hottest_functions(obj)
+        if not rows:
+            return '-'
+        return format_html('<pre>{}</pre>', format_html_join('\n', '{:>6}  {}', ((count, frame) for frame, count in rows)))
+
+    def delete_model(self, request, obj):
+        obj.delete_file()
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        for profile in queryset:
+            profile.delete_file()
+        super().delete_queryset(request, queryset)
@@ -0,0 +1,153 @@
+"""Per-user admission control for the expensive (LLM and Whisper) endpoints.
+
+Each user gets ADMISSION_MAX_CONCURRENT concurrent-request slots, held as
+AdmissionLease rows, plus a per-user token bucket refilled at
+ADMISSION_RATE_PER_MINUTE. Both live in the database, so the limits hold
+across every thread and worker. A request over either limit gets an
+immediate 429 with Retry-After rather than queueing behind the user's own
+backlog.
+"""
+import functools
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from .degradation import controller
+from .models import AdmissionLease
+from .ratelimit import TokenBucket
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+class AdmissionDenied(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def admission_stats():
+    """Per-process counts of admitted and rejected requests, by outcome"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def _take_slot(user, scope):
+    """Claim a free or expired concurrency slot; return the lease or None when all are busy"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.ADMISSION_LEASE_SECONDS)
+    held = {slot: expiry for slot, expiry in AdmissionLease.objects.filter(user=user).values_list('slot', 'expires_at')}
+
+    for slot in range(settings.ADMISSION_MAX_CONCURRENT):
+        if slot not in held:
+            try:
+                with transaction.atomic():
+                    return AdmissionLease.objects.create(
+                        user=user, slot=slot, scope=scope, acquired_at=now, expires_at=expires_at
+                    )
+            except IntegrityError:
+                continue
+        elif held[slot] < now:
+            # The holder never released it (e.g. its worker was killed); reclaim with compare-and-set
+            if AdmissionLease.objects.filter(user=user, slot=slot, expires_at=held[slot]).update(
+                scope=scope, acquired_at=now, expires_at=expires_at
+            ):
+                return AdmissionLease(user=user, slot=slot, scope=scope, acquired_at=now, expires_at=expires_at)
+    return None
+
+
+def acquire(user, scope):
+    """Admit a request from user or raise AdmissionDenied; returns the lease to release afterwards"""
+    lease = _take_slot(user, scope)
+    if lease is None:
+        _count('rejected_concurrency')
+        raise AdmissionDenied('Too many requests in progress', settings.ADMISSION_RETRY_AFTER)
+
+    bucket = TokenBucket(f'user:{user.pk}', settings.ADMISSION_RATE_PER_MINUTE / 60, settings.ADMISSION_BURST)
+    wait = bucket.try_acquire()
+    if wait > 0:
+        release(lease)
+        _count('rejected_rate')
+        raise AdmissionDenied('Rate limit exceeded', math.ceil(wait))
+
+    _count('admitted')
+    return lease
+
+
+def release(lease):
+    AdmissionLease.objects.filter(user=lease.user, slot=lease.slot, acquired_at=lease.acquired_at).delete()
+
+
+@contextmanager
+def admitted(user, scope):
+    lease = acquire(user, scope)
+    started = time.monotonic()
+    try:
+        yield lease
+    finally:
+        # Admitted request durations feed the load-shedding controller
+        controller.record_latency(time.monotonic() - started)
+        release(lease)
+
+
+@asynccontextmanager
+async def aadmitted(user, scope):
+    lease = await sync_to_async(acquire)(user, scope)
+    started = time.monotonic()
+    try:
+        yield lease
+    finally:
+        controller.record_latency(time.monotonic() - started)
+        await sync_to_async(release)(lease)
+
+
+def too_many_requests(denied):
+    response = JsonResponse({"error": f"{denied.reason}. Please retry shortly."}, status=429)
+    response['Retry-After'] = str(denied.retry_after)
+    return response
+
+
+def admission_control(scope):
+    """Decorate a view (sync or async) that runs with request.user already authenticated.
+
+    Use django.utils.decorators.method_decorator for APIView methods. Anonymous
+    requests pass through so the view's own authentication rejects them.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @functools.wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser()
+                if not settings.ADMISSION_CONTROL or not user.is_authenticated:
+                    return await view_func(request, *args, **kwargs)
+                try:
+                    async with aadmitted(user, scope):
+                        return await view_func(request, *args, **kwargs)
+                except AdmissionDenied as denied:
+                    return too_many_requests(denied)
+            return async_wrapper
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not settings.ADMISSION_CONTROL or not request.user.is_authenticated:
+                return view_func(request, *args, **kwargs)
+            try:
+                with admitted(request.user, scope):
+                    return view_func(request, *args, **kwargs)
+            except AdmissionDenied as denied:
+                return too_many_requests(denied)
+        return wrapper
+    return decorator
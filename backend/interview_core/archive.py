@@ -0,0 +1,240 @@
+"""Cold archive: old questions and their answers moved from the hot tables to files.
+
+Questions created before a cutoff are written, each with its answers, as one
+JSON line to ARCHIVE_DIR/<YYYY-MM>/b<NN>of<MM>-<run>.jsonl.gz (or .jsonl.zst).
+Files are partitioned by the question's month, then bucketed by user id so that
+a user's history is in a few files per month rather than spread over all of
+them. The name records the bucket count it was written with, so changing
+ARCHIVE_USER_BUCKETS later does not hide older files from the read path. Every
+line starts with the user id, which lets the read path skip other users' lines
+without parsing them.
+
+A month's files are written under a .partial name, read back and checked
+against the rows that were written, and only then renamed and the rows
+deleted in primary key batches. A crash before the rename leaves the rows in
+the hot tables and a .partial file that readers ignore; a crash after it leaves
+rows in both places, which readers resolve in favour of the hot tables.
+
+Saved questions, questions answered on or after the cutoff and questions
+answered by another user are kept in the hot tables. Score rollups and topic
+histograms are aggregates and keep covering archived answers.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .exceptions import ArchiveError
+from .models import InterviewQuestion, UserAnswer, SavedQuestion
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+QUESTION_COLUMNS = [field.attname for field in InterviewQuestion._meta.concrete_fields]
+ANSWER_COLUMNS = [field.attname for field in UserAnswer._meta.concrete_fields]
+
+# b<bucket>of<buckets>-<run>; files from before the count was recorded are b<bucket>-<run>
+FILE_NAME = re.compile(r'b(\d+)(?:of(\d+))?-')
+
+
+def _open(path, mode, compression=None):
+    """Open an archive file as text; the compression comes from the extension unless given"""
+    if compression is None:
+        compression = 'zstd' if str(path).endswith(EXTENSIONS['zstd']) else 'gzip'
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ArchiveError("ARCHIVE_COMPRESSION=zstd needs the zstandard package (pip install zstandard)")
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    raise ArchiveError(f"Unknown archive compression '{compression}'; use one of: {', '.join(EXTENSIONS)}")
+
+
+def cutoff_for(days=None):
+    return timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def archivable(cutoff):
+    """Questions created before `cutoff` whose whole history can leave the hot tables"""
+    return InterviewQuestion.objects.filter(created_at__lt=cutoff).exclude(
+        Exists(SavedQuestion.objects.filter(question=OuterRef('pk')))
+    ).exclude(
+        Exists(UserAnswer.objects.filter(question=OuterRef('pk'), created_at__gte=cutoff))
+    ).exclude(
+        Exists(UserAnswer.objects.filter(question=OuterRef('pk')).exclude(user=OuterRef('user')))
+    )
+
+
+def _bucket(user_id):
+    buckets = settings.ARCHIVE_USER_BUCKETS
+    return f'b{user_id % buckets:02d}of{buckets:02d}'
+
+
+def _holds_user(path, user_id):
+    """Whether the archive file at `path` is the bucket `user_id` was written to"""
+    match = FILE_NAME.match(path.name)
+    if not match:
+        return False
+    buckets = int(match.group(2) or settings.ARCHIVE_USER_BUCKETS)
+    return int(match.group(1)) == user_id % buckets
+
+
+def _encode(row):
+    # user_id goes first so readers can filter lines on their prefix
+    return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def _line_prefix(user_id):
+    return f'{{"user_id": {user_id},'
+
+
+def _read_back(paths, compression):
+    """Question ids and the answer count in a month's written files"""
+    question_ids, answers = [], 0
+    for path in paths:
+        with _open(path, 'r', compression) as f:
+            for line in f:
+                row = json.loads(line)
+                question_ids.append(row['question']['id'])
+                answers += len(row['answers'])
+    return question_ids, answers
+
+
+def _write_month(queryset, month_dir, run, batch_size, compression):
+    """Write `queryset`'s questions and answers to .partial files; returns (paths, questions, answers)"""
+    writers = {}
+    questions = answers = 0
+    last_pk = 0
+    try:
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by('pk').values(*QUESTION_COLUMNS)[:batch_size])
+            if not batch:
+                break
+            by_question = {}
+            for answer in UserAnswer.objects.filter(
+                question_id__in=[row['id'] for row in batch]
+            ).order_by('pk').values(*ANSWER_COLUMNS):
+                by_question.setdefault(answer['question_id'], []).append(answer)
+
+            for row in batch:
+                bucket = _bucket(row['user_id'])
+                if bucket not in writers:
+                    month_dir.mkdir(parents=True, exist_ok=True)
+                    path = month_dir / f'{bucket}-{run}{EXTENSIONS[compression]}.partial'
+                    writers[bucket] = (path, _open(path, 'w', compression))
+                row_answers = by_question.get(row['id'], [])
+                writers[bucket][1].write(_encode({'user_id': row['user_id'], 'question': row, 'answers': row_answers}))
+                questions += 1
+                answers += len(row_answers)
+            last_pk = batch[-1]['id']
+            if len(batch) < batch_size:
+                break
+    finally:
+        for _, f in writers.values():
+            f.close()
+    return [path for path, _ in writers.values()], questions, answers
+
+
+def _delete(question_ids, cutoff, batch_size, sleep):
+    """Delete archived questions (and their answers by cascade) in short transactions"""
+    deleted = {InterviewQuestion._meta.label: 0, UserAnswer._meta.label: 0}
+    for start in range(0, len(question_ids), batch_size):
+        with transaction.atomic():
+            # Re-checked, so a question saved or answered since it was written stays hot
+            _, per_model = archivable(cutoff).filter(pk__in=question_ids[start:start + batch_size]).delete()
+        for label in deleted:
+            deleted[label] += per_model.get(label, 0)
+        if sleep and start + batch_size < len(question_ids):
+            time.sleep(sleep)
+    return deleted[InterviewQuestion._meta.label], deleted[UserAnswer._meta.label]
+
+
+def archive(cutoff, batch_size=None, sleep=None, compression=None, dry_run=False):
+    """Archive and delete the history before `cutoff` month by month.
+
+    Returns a list of (month, questions, answers); with dry_run the counts are
+    what would be archived and nothing is written or deleted.
+    """
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    sleep = settings.RETENTION_BATCH_SLEEP if sleep is None else sleep
+    compression = compression or settings.ARCHIVE_COMPRESSION
+    if compression not in EXTENSIONS:
+        raise ArchiveError(f"Unknown archive compression '{compression}'; use one of: {', '.join(EXTENSIONS)}")
+
+    root = Path(settings.ARCHIVE_DIR)
+    run = f'{timezone.now():%Y%m%dT%H%M%S}-{os.getpid()}'
+    results = []
+    for month in archivable(cutoff).datetimes('created_at', 'month'):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        queryset = archivable(cutoff).filter(created_at__gte=month, created_at__lt=next_month)
+        label = f'{month:%Y-%m}'
+        if dry_run:
+            results.append((label, queryset.count(),
+                            UserAnswer.objects.filter(question__in=queryset.values('pk')).count()))
+            continue
+
+        paths, questions, answers = _write_month(queryset, root / label, run, batch_size, compression)
+        question_ids, read_answers = _read_back(paths, compression)
+        if (len(question_ids), read_answers) != (questions, answers):
+            raise ArchiveError(
+                f"Archive of {label} failed verification: wrote {questions} questions and {answers} answers, "
+                f"read back {len(question_ids)} and {read_answers}; left {', '.join(map(str, paths))} in place"
+            )
+        for path in paths:
+            os.replace(path, path.with_name(path.name[:-len('.partial')]))
+
+        deleted_questions, deleted_answers = _delete(question_ids, cutoff, batch_size, sleep)
+        logger.info("Archived %s: %d questions and %d answers written, %d and %d deleted",
+                    label, questions, answers, deleted_questions, deleted_answers)
+        results.append((label, questions, answers))
+    return results
+
+
+def iter_archived(user):
+    """Yield the user's archived questions, newest month first, each with an `archived_answers` list.
+
+    Instances are rebuilt from the files and are not saved; a question that is
+    archived more than once (see the module docstring) is yielded once.
+    """
+    root = Path(settings.ARCHIVE_DIR)
+    if not root.is_dir():
+        return
+    prefix = _line_prefix(user.id)
+    seen = set()
+    paths = sorted((path for pattern in EXTENSIONS.values() for path in root.glob(f'*/b*-*{pattern}')
+                    if _holds_user(path, user.id)), reverse=True)
+    for path in paths:
+        with _open(path, 'r') as f:
+            for line in f:
+                if not line.startswith(prefix):
+                    continue
+                row = json.loads(line)
+                if row['question']['id'] in seen:
+                    continue
+                seen.add(row['question']['id'])
+                question = _rebuild(InterviewQuestion, row['question'])
+                question.archived_answers = []
+                for values in row['answers']:
+                    answer = _rebuild(UserAnswer, values)
+                    answer.user = user
+                    answer.question = question
+                    question.archived_answers.append(answer)
+                yield question
+
+
+def _rebuild(model, values):
+    return model(**{
+        field.attname: field.to_python(values[field.attname])
+        for field in model._meta.concrete_fields if field.attname in values
+    })
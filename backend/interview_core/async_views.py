@@ -0,0 +1,263 @@
+"""Async variants of the LLM-bound endpoints.
+
+Under an ASGI server these views await the OpenRouter calls on the event loop
+instead of parking a worker thread on `requests.post` for up to 30s, so one
+worker process can hold hundreds of in-flight LLM waits. ORM work is the only
+thing pushed to a thread via sync_to_async. They also run under WSGI, where
+Django drives each one on its own event loop; there each request gets its own
+HTTP client for LLM calls, closed when the view returns.
+"""
+import asyncio
+import functools
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from . import degradation, llm
+from .admission import admission_control
+from .models import InterviewQuestion, Resume
+from .serializers import InterviewQuestionSerializer, UserAnswerSerializer
+from .services import InterviewService, InterviewSessionService
+from .singleflight import SingleFlightError, idempotency_key, arun_idempotent
+from .template_views import redirect_to_session
+
+logger = logging.getLogger(__name__)
+
+
+async def authenticate_jwt(request):
+    """Return the user for a Bearer token, or None; the token's user lookup runs in a thread"""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def jwt_required(view_func):
+    """Authenticate a Bearer token and expose the user as request.user / request.auser()"""
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user = await authenticate_jwt(request)
+        if user is None:
+            return unauthorized()
+
+        async def auser():
+            return user
+
+        request.user, request.auser = user, auser
+        return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def per_request_http_client(view_func):
+    """Under WSGI, run the view with an LLM HTTP client that is closed when it returns.
+
+    Under ASGI the event loop outlives the request, so the view keeps using the
+    loop's shared client and its pooled connections.
+    """
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            return await view_func(request, *args, **kwargs)
+        async with llm.scoped_async_http_client():
+            return await view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def unauthorized():
+    return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+
+def request_data(request):
+    """Form fields or a JSON object body, whichever the client sent"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+@admission_control('generate')
+@per_request_http_client
+async def generate_questions_api(request):
+    user = request.user
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    topic = data.get('topic')
+    difficulty = data.get('difficulty', 'medium')
+
+    if not topic:
+        return JsonResponse({"error": "Topic is required"}, status=400)
+
+    try:
+        count = InterviewService.clean_count(data.get('count'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        session_service = InterviewSessionService()
+        interview_session = await session_service.astart_once(
+            user, [topic, count, difficulty], topic,
+            lambda: InterviewService().acreate_questions(user, topic, count, difficulty)
+        )
+        questions = await sync_to_async(session_service.get_questions)(interview_session)
+    except Exception as e:
+        logger.error(f"Failed to generate questions for topic {topic}: {str(e)}")
+        return JsonResponse({"error": "Failed to generate questions. Please try again later."}, status=500)
+
+    return JsonResponse({
+        "session_id": interview_session.id,
+        "questions": InterviewQuestionSerializer(questions, many=True).data,
+    }, status=201)
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+@admission_control('answer')
+@per_request_http_client
+async def submit_answer_api(request):
+    user = request.user
+    audio_file = request.FILES.get('audio_file')
+    question_id = request.POST.get('question_id')
+    try:
+        answer_text = InterviewService.clean_answer_text(request.POST.get('answer_text'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if not (audio_file or answer_text) or not question_id:
+        return JsonResponse({"error": "Missing question ID, or an audio file or answer text"}, status=400)
+
+    if answer_text is None and await degradation.controller.alevel() >= degradation.TEXT_ONLY:
+        response = JsonResponse({"error": degradation.AUDIO_UNAVAILABLE_MESSAGE}, status=503)
+        response['Retry-After'] = str(degradation.AUDIO_RETRY_AFTER)
+        return response
+
+    async def submit():
+        answer = await InterviewService().aprocess_answer(user, question_id, audio_file, answer_text)
+        # Serializing may touch answer.user, so it runs with the ORM work in a thread
+        data = await sync_to_async(lambda: UserAnswerSerializer(answer).data)()
+        data['topic_percentile'] = answer.topic_percentile
+        return data
+
+    key = idempotency_key(request)
+    try:
+        if key is None:
+            data, replayed = await submit(), False
+        else:
+            data, replayed = await arun_idempotent('answer', [user.id, str(question_id), key], submit)
+    except SingleFlightError as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except Exception as e:
+        logger.error(f"Failed to process answer for question {question_id}: {str(e)}")
+        return JsonResponse({"error": "Failed to process your answer. Please try again."}, status=500)
+
+    response = JsonResponse(data, status=201)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+async def _category_questions(interview_service, user, category, items, count, difficulty):
+    """Generate questions for one resume category, falling back to a generic question"""
+    topic_context = f"{category}: {', '.join(items)}"
+    try:
+        return await interview_service.acreate_questions(user, topic_context, count, difficulty)
+    except Exception as e:
+        logger.warning("Question generation failed for resume category %s: %s", category, e)
+        fallback_question = await InterviewQuestion.objects.acreate(
+            user=user,
+            topic="Resume-Based",
+            question=f"Tell me about your experience with {category.lower()}.",
+            answer=f"Describe your background and expertise in {category.lower()}."
+        )
+        return [fallback_question]
+
+
+@require_POST
+@admission_control('resume')
+@per_request_http_client
+async def upload_resume_async_view(request):
+    """Async resume upload: parses the resume and generates every category's questions concurrently"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    resume_file = request.FILES.get('resume')
+    difficulty = request.POST.get('difficulty', 'medium')
+    try:
+        count = InterviewService.clean_count(request.POST.get('count'))
+    except ValueError:
+        messages.error(request, 'Number of questions must be a positive whole number.')
+        return redirect('dashboard')
+
+    # Store count in session for interview view
+    await sync_to_async(request.session.__setitem__)('interview_count', count)
+
+    if not resume_file:
+        messages.error(request, 'Please upload a resume file.')
+        return redirect('dashboard')
+
+    try:
+        from .resume_parser import ResumeParser
+        parsed_data = await ResumeParser().aprocess_resume(resume_file)
+
+        resume = await Resume.objects.acreate(
+            user=user,
+            extracted_text=parsed_data['extracted_text'],
+            skills=parsed_data['skills'],
+            experience=parsed_data['experience'],
+            projects=parsed_data['projects']
+        )
+
+        categories = {
+            'Skills': parsed_data['skills'][:3],  # Top 3 skills
+            'Experience': parsed_data['experience'][:2],  # Top 2 experiences
+            'Projects': parsed_data['projects'][:2]  # Top 2 projects
+        }
+        categories = {category: items for category, items in categories.items() if items}
+        questions_per_category = max(1, count // max(1, len(categories)))
+
+        interview_service = InterviewService()
+        results = await asyncio.gather(*(
+            _category_questions(interview_service, user, category, items, questions_per_category, difficulty)
+            for category, items in categories.items()
+        ))
+        all_questions = [question for questions in results for question in questions]
+
+        if all_questions:
+            messages.success(request, f'Generated {len(all_questions)} personalized questions based on your resume!')
+        else:
+            all_questions.append(await InterviewQuestion.objects.acreate(
+                user=user,
+                topic="Resume-Based",
+                question="Tell me about your most significant project and the technologies you used.",
+                answer="Describe the project scope, your role, technical challenges, and key achievements."
+            ))
+            messages.success(request, 'Generated personalized questions based on your resume!')
+
+        # Delete resume data after questions are generated
+        await resume.adelete()
+
+        interview_session = await sync_to_async(InterviewSessionService().start)(user, 'Resume-Based', all_questions)
+        return redirect_to_session(interview_session)
+
+    except Exception as e:
+        logger.exception("Failed to process resume upload")
+        messages.error(request, f'Failed to process resume: {str(e)}')
+        return redirect('dashboard')
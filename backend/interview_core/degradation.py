@@ -0,0 +1,145 @@
+"""Adaptive load shedding for the LLM and Whisper bound endpoints.
+
+The controller watches two signals: the number of expensive requests in
+flight across all workers (live AdmissionLease rows) and this process's p95
+latency for those requests. Past the configured thresholds it raises the
+degradation level:
+
+    1  evaluate answers with the cheaper LLM_DEGRADED_EVALUATE_MODELS chain
+    2  brief evaluation: accuracy and a one-line verdict, no sub-scores or written breakdown
+    3  serve new questions from previously generated ones on the same topic
+    4  reject audio answers in favour of typed answers
+
+Levels go up as soon as a threshold is crossed. They come down one at a time
+once both signals have stayed under DEGRADE_RECOVERY_RATIO of the current
+level's thresholds for DEGRADE_HOLD_SECONDS.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from .models import AdmissionLease
+
+logger = logging.getLogger(__name__)
+
+NORMAL, CHEAP_MODEL, BRIEF_EVALUATION, QUESTION_BANK, TEXT_ONLY = range(5)
+
+LEVEL_NAMES = {
+    NORMAL: 'normal',
+    CHEAP_MODEL: 'cheap_model',
+    BRIEF_EVALUATION: 'brief_evaluation',
+    QUESTION_BANK: 'question_bank',
+    TEXT_ONLY: 'text_only',
+}
+
+# How often the in-flight count is re-read, and how much latency history counts
+CHECK_INTERVAL = 2.0
+LATENCY_WINDOW = 100
+LATENCY_MAX_AGE = 120.0
+
+AUDIO_UNAVAILABLE_MESSAGE = (
+    "Audio answers are temporarily unavailable under heavy load. "
+    "Please type your answer instead (send it as answer_text)."
+)
+AUDIO_RETRY_AFTER = 30
+
+
+def _level_for(value, thresholds, scale=1.0):
+    """Highest level whose threshold (times scale) the value reaches"""
+    return sum(1 for threshold in thresholds if value >= threshold * scale)
+
+
+class DegradationController:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._level = NORMAL
+        self._recovering_since = None
+        self._checked_at = None
+        self.in_flight = 0
+
+    def record_latency(self, seconds):
+        """Record the duration of one expensive request"""
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def p95_latency(self):
+        cutoff = time.monotonic() - LATENCY_MAX_AGE
+        with self._lock:
+            samples = sorted(seconds for at, seconds in self._latencies if at >= cutoff)
+        if not samples:
+            return 0.0
+        return samples[max(0, math.ceil(0.95 * len(samples)) - 1)]
+
+    def _due(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= CHECK_INTERVAL
+
+    def _count_in_flight(self):
+        return AdmissionLease.objects.filter(expires_at__gt=timezone.now()).count()
+
+    def _update(self, in_flight):
+        """Apply new signals to the level with hysteresis"""
+        p95 = self.p95_latency()
+        target = max(
+            _level_for(in_flight, settings.DEGRADE_QUEUE_DEPTH),
+            _level_for(p95, settings.DEGRADE_LATENCY_P95),
+        )
+        # Both signals clearly below the current level's thresholds
+        recovered = max(
+            _level_for(in_flight, settings.DEGRADE_QUEUE_DEPTH, settings.DEGRADE_RECOVERY_RATIO),
+            _level_for(p95, settings.DEGRADE_LATENCY_P95, settings.DEGRADE_RECOVERY_RATIO),
+        )
+        with self._lock:
+            now = time.monotonic()
+            self.in_flight = in_flight
+            self._checked_at = now
+            previous = self._level
+            if target > previous:
+                self._level = target
+            if recovered < self._level:
+                # Step down only after every sample for DEGRADE_HOLD_SECONDS has been recovered
+                if self._recovering_since is None:
+                    self._recovering_since = now
+                if now - self._recovering_since >= settings.DEGRADE_HOLD_SECONDS:
+                    self._level -= 1
+                    self._recovering_since = None
+            else:
+                self._recovering_since = None
+            if self._level != previous:
+                logger.warning(
+                    "Degradation level %s -> %s (in flight %d, p95 %.1fs)",
+                    LEVEL_NAMES[previous], LEVEL_NAMES[self._level], in_flight, p95
+                )
+            return self._level
+
+    def level(self):
+        """Current level, re-reading the in-flight count at most every CHECK_INTERVAL seconds"""
+        if settings.DEGRADATION_LEVEL is not None:
+            return settings.DEGRADATION_LEVEL
+        if self._due():
+            return self._update(self._count_in_flight())
+        return self._level
+
+    async def alevel(self):
+        """Async level(); the count query runs in a thread"""
+        if settings.DEGRADATION_LEVEL is not None:
+            return settings.DEGRADATION_LEVEL
+        if self._due():
+            return self._update(await sync_to_async(self._count_in_flight)())
+        return self._level
+
+    def state(self):
+        level = self.level()
+        return {
+            'level': level,
+            'name': LEVEL_NAMES[level],
+            'in_flight': self.in_flight,
+            'p95_latency': round(self.p95_latency(), 3),
+        }
+
+
+controller = DegradationController()
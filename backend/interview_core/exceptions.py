@@ -12,4 +12,8 @@ class AudioProcessingError(InterviewServiceError):
 
 class QuestionNotFoundError(InterviewServiceError):
     """Exception when question is not found"""
-    pass
\ No newline at end of file
+    pass
+
+class ArchiveError(InterviewServiceError):
+    """Exception when history can't be archived or an archive file can't be read"""
+    pass
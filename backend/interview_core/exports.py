@@ -0,0 +1,75 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from .archive import iter_archived
+from .models import InterviewQuestion, UserAnswer
+
+EXPORT_CHUNK_SIZE = 500
+
+QUESTION_FIELDS = ['id', 'topic', 'question', 'answer', 'is_answered', 'created_at']
+ANSWER_FIELDS = ['id', 'user_text', 'accuracy', 'feedback', 'strengths', 'improvements',
+                 'missing_points', 'clarity_score', 'completeness_score',
+                 'technical_accuracy_score', 'created_at']
+
+CSV_HEADER = [f'question_{name}' for name in QUESTION_FIELDS] + [f'answer_{name}' for name in ANSWER_FIELDS]
+
+
+class Echo:
+    """Pseudo-buffer whose write() hands the row back, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def _report_row(question, answer):
+    return {
+        'question': {name: getattr(question, name) for name in QUESTION_FIELDS},
+        'answer': {name: getattr(answer, name) for name in ANSWER_FIELDS} if answer else None,
+    }
+
+
+def iter_report_rows(user, chunk_size=EXPORT_CHUNK_SIZE, include_archived=False):
+    """Yield one {"question": ..., "answer": ...} record per question of the user.
+
+    Questions are read with a server-side cursor in chunks, and each chunk's
+    answers are fetched with one extra query, so memory stays bounded by the
+    chunk size regardless of how much history the user has. With
+    include_archived, the user's archived questions follow, skipping any that
+    are still in the hot tables.
+    """
+    questions = InterviewQuestion.objects.filter(user=user).order_by('id').prefetch_related(
+        Prefetch(
+            'user_answers',
+            queryset=UserAnswer.objects.filter(user=user),
+            to_attr='user_answer_list'
+        )
+    )
+    hot_ids = set()
+    for question in questions.iterator(chunk_size=chunk_size):
+        if include_archived:
+            hot_ids.add(question.id)
+        yield _report_row(question, question.user_answer_list[0] if question.user_answer_list else None)
+
+    if include_archived:
+        for question in iter_archived(user):
+            if question.id not in hot_ids:
+                yield _report_row(question, question.archived_answers[0] if question.archived_answers else None)
+
+
+def stream_ndjson(rows):
+    """Encode report records as newline-delimited JSON"""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(rows):
+    """Encode report records as CSV with one flattened row per question"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    empty_answer = [''] * len(ANSWER_FIELDS)
+    for row in rows:
+        question_values = [row['question'][name] for name in QUESTION_FIELDS]
+        answer = row['answer']
+        answer_values = [answer[name] for name in ANSWER_FIELDS] if answer else empty_answer
+        yield writer.writerow(question_values + answer_values)
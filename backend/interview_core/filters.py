@@ -3,6 +3,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Count, Avg, Q
 from .models import InterviewQuestion, UserAnswer
+from .histograms import ScoreHistogramService
 
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
@@ -22,10 +23,24 @@ class DashboardStatsView(APIView):
             answered=Count('id', filter=Q(is_answered=True))
         )
         
+        # Percentile rank of the user's average accuracy per topic
+        topic_accuracy = UserAnswer.objects.filter(user=user).values('question__topic').annotate(
+            avg_acc=Avg('accuracy')
+        ).order_by()
+        topic_accuracy = {row['question__topic']: row['avg_acc'] for row in topic_accuracy}
+        topic_stats = list(topic_stats)
+        percentiles = ScoreHistogramService().percentiles(
+            [(row['topic'], topic_accuracy.get(row['topic'])) for row in topic_stats]
+        )
+        for row, percentile in zip(topic_stats, percentiles):
+            avg_acc = topic_accuracy.get(row['topic'])
+            row['average_accuracy'] = round(avg_acc, 1) if avg_acc is not None else None
+            row['percentile'] = percentile
+        
         return Response({
             'total_questions': total_questions,
             'answered_questions': answered_questions,
             'completion_rate': (answered_questions / total_questions * 100) if total_questions > 0 else 0,
             'average_accuracy': round(avg_accuracy, 1),
-            'topic_stats': list(topic_stats)
+            'topic_stats': topic_stats
         })
\ No newline at end of file
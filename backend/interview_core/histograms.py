@@ -0,0 +1,83 @@
+import re
+from django.db import transaction
+from django.db.models import F
+from .models import UserAnswer, TopicScoreBin
+
+HISTOGRAM_BINS = 20
+SCORE_MAX = 100.0
+BIN_WIDTH = SCORE_MAX / HISTOGRAM_BINS
+
+
+def normalize_topic(topic):
+    """Normalize a topic so 'Python', ' python ' and 'PYTHON' share one histogram"""
+    return re.sub(r'\s+', ' ', (topic or '').strip().lower())[:100]
+
+
+def score_bin(score):
+    """Map a 0-100 score to its histogram bin index"""
+    score = min(max(float(score or 0), 0.0), SCORE_MAX)
+    return min(int(score // BIN_WIDTH), HISTOGRAM_BINS - 1)
+
+
+def percentile_from_bins(counts, score):
+    """Percentile rank of a score given a {bin: count} mapping, in O(bins).
+
+    Scores sharing the candidate's bin count as half below, the usual
+    mid-rank convention for binned data.
+    """
+    total = sum(counts.values())
+    if not total or score is None:
+        return None
+    target = score_bin(score)
+    below = sum(count for bin_index, count in counts.items() if bin_index < target)
+    return round((below + counts.get(target, 0) / 2) / total * 100, 1)
+
+
+class ScoreHistogramService:
+    """Service for maintaining per-topic accuracy histograms and percentile lookups"""
+
+    def record(self, topic, score, previous_score=None):
+        """Add a new score to the topic histogram, moving it out of its old bin if re-scored"""
+        topic = normalize_topic(topic)
+        new_bin = score_bin(score)
+        old_bin = score_bin(previous_score) if previous_score is not None else None
+        if old_bin == new_bin:
+            return
+
+        with transaction.atomic():
+            if old_bin is not None:
+                TopicScoreBin.objects.filter(topic=topic, bin=old_bin, count__gt=0).update(count=F('count') - 1)
+            TopicScoreBin.objects.get_or_create(topic=topic, bin=new_bin)
+            TopicScoreBin.objects.filter(topic=topic, bin=new_bin).update(count=F('count') + 1)
+
+    def percentile(self, topic, score):
+        """Percentile rank (0-100) of a score among all answers for the topic"""
+        return self.percentiles([(topic, score)])[0]
+
+    def percentiles(self, pairs):
+        """Percentile ranks for a list of (topic, score) pairs using a single query"""
+        topics = {normalize_topic(topic) for topic, _ in pairs}
+        histograms = {topic: {} for topic in topics}
+        for topic, bin_index, count in TopicScoreBin.objects.filter(topic__in=topics).values_list('topic', 'bin', 'count'):
+            histograms[topic][bin_index] = count
+        return [percentile_from_bins(histograms[normalize_topic(topic)], score) for topic, score in pairs]
+
+    def rebuild(self):
+        """Rebuild every histogram from UserAnswer history; returns the number of bins written"""
+        counts = {}
+        rows = (
+            UserAnswer.objects.exclude(accuracy__isnull=True)
+            .values_list('question__topic', 'accuracy')
+            .iterator(chunk_size=2000)
+        )
+        for topic, accuracy in rows:
+            key = (normalize_topic(topic), score_bin(accuracy))
+            counts[key] = counts.get(key, 0) + 1
+
+        with transaction.atomic():
+            TopicScoreBin.objects.all().delete()
+            TopicScoreBin.objects.bulk_create(
+                [TopicScoreBin(topic=topic, bin=bin_index, count=count) for (topic, bin_index), count in counts.items()],
+                batch_size=1000
+            )
+        return len(counts)
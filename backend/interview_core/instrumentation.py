@@ -0,0 +1,63 @@
+import re
+import time
+from collections import Counter
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalize SQL so queries differing only in literal values compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _IN_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Record SQL executed on a connection: count, total time and duplicate fingerprints.
+
+    Usable as a context manager in tests and by QueryInstrumentationMiddleware:
+
+        with QueryRecorder() as queries:
+            client.get('/api/questions/')
+        assert queries.count <= 3
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.queries = []
+        self._wrapper = None
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        """Total time spent in the database, in seconds"""
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Return {fingerprint: count} for query shapes executed more than once"""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {sql: count for sql, count in counts.items() if count > 1}
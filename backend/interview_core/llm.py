@@ -0,0 +1,332 @@
+"""OpenRouter chat completions with a per-operation model fallback chain.
+
+Each operation (generate, evaluate, parse_resume) has an ordered model list in
+settings.LLM_MODELS. A call starts on the first model whose circuit breaker is
+closed. Once the call has run longer than that model's recent p95 latency, a
+hedged request goes to the next model in the chain, or to the same model when
+it is the last one, and the first success wins. If both fail, the chain moves
+on to the next model.
+
+LLM_TRANSPORT=record/replay saves completions to, or serves them from, a local
+fixture file instead of OpenRouter (see llm_fixtures.py).
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from django.conf import settings
+from django.db import connections
+from .exceptions import AIServiceError
+from .ratelimit import RateLimitExceeded, send_rate_limited, asend_rate_limited
+from . import llm_fixtures, timing
+
+logger = logging.getLogger(__name__)
+
+# Successful-call latencies kept per (operation, model), and the minimum before p95 is trusted
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+_async_http_clients = weakref.WeakKeyDictionary()
+_scoped_async_http_client = contextvars.ContextVar('scoped_async_http_client', default=None)
+
+
+def _new_async_http_client():
+    import httpx
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=500, max_keepalive_connections=50))
+
+
+def get_async_http_client():
+    """httpx.AsyncClient for LLM calls: the scoped one if set, else one shared per running event loop"""
+    client = _scoped_async_http_client.get()
+    if client is not None:
+        return client
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = _new_async_http_client()
+        _async_http_clients[loop] = client
+    return client
+
+
+@contextlib.asynccontextmanager
+async def scoped_async_http_client():
+    """Send this context's LLM calls through their own client, closed on exit.
+
+    For event loops that end soon after, like the one Django creates per async
+    view under WSGI: a per-loop client there would never be reused and would
+    leave its sockets to the garbage collector.
+    """
+    client = _new_async_http_client()
+    token = _scoped_async_http_client.set(client)
+    try:
+        yield client
+    finally:
+        _scoped_async_http_client.reset(token)
+        await client.aclose()
+
+
+class LLMRequestError(AIServiceError):
+    """Every model in an operation's chain failed or is skipped by its circuit breaker"""
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, excluding rate limit queueing"""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key, pct):
+        """The pct-th percentile latency, or None until MIN_LATENCY_SAMPLES calls have been seen"""
+        with self._lock:
+            samples = sorted(self._samples[key])
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+
+class CircuitBreaker:
+    """Per-process breaker per model.
+
+    Opens after LLM_BREAKER_FAILURES consecutive failures and lets calls through
+    again once LLM_BREAKER_COOLDOWN has passed; one more failure re-opens it and
+    a success closes it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = defaultdict(int)
+        self._opened_at = {}
+
+    def allow(self, model):
+        with self._lock:
+            if self._failures[model] < settings.LLM_BREAKER_FAILURES:
+                return True
+            return time.monotonic() - self._opened_at[model] >= settings.LLM_BREAKER_COOLDOWN
+
+    def record_success(self, model):
+        with self._lock:
+            self._failures.pop(model, None)
+            self._opened_at.pop(model, None)
+
+    def record_failure(self, model):
+        with self._lock:
+            self._failures[model] += 1
+            if self._failures[model] >= settings.LLM_BREAKER_FAILURES:
+                if model not in self._opened_at:
+                    logger.warning("Circuit breaker opened for %s after %d failures", model, self._failures[model])
+                self._opened_at[model] = time.monotonic()
+
+    def state(self):
+        with self._lock:
+            return {model: ('open' if model in self._opened_at else 'closed', failures)
+                    for model, failures in self._failures.items()}
+
+
+latency_tracker = LatencyTracker()
+circuit_breaker = CircuitBreaker()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # Created lazily so a preloading gunicorn master never forks with live threads
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_THREADS, thread_name_prefix='llm')
+    return _executor
+
+
+class LLMClient:
+    """Chat completion client for one operation's model chain"""
+
+    def __init__(self, operation, api_key=None):
+        self.operation = operation
+        self.models = settings.LLM_MODELS[operation]
+        self.api_key = api_key or os.getenv('OPENROUTER_API_KEY')
+        self.base_url = f"{settings.OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
+        # Seconds spent queued for rate limit tokens, and the model that answered last
+        self.queue_wait = 0.0
+        self.last_model = None
+
+    def _available_models(self):
+        models = [model for model in self.models if circuit_breaker.allow(model)]
+        if not models:
+            raise LLMRequestError(f"All models for '{self.operation}' are failing: {', '.join(self.models)}")
+        return deque(models)
+
+    def _hedge_delay(self, model):
+        """Seconds before hedging a call to `model`, or None when hedging is off"""
+        if not settings.LLM_HEDGE:
+            return None
+        p95 = latency_tracker.percentile((self.operation, model), 95)
+        if p95 is None:
+            return settings.LLM_HEDGE_DEFAULT_DELAY
+        return max(settings.LLM_HEDGE_MIN_DELAY, p95)
+
+    def _request_parts(self, model, prompt, params):
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": "http://localhost",
+            "Content-Type": "application/json"
+        }
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **params}
+        return headers, payload
+
+    def _content(self, model, response, started, queued, payload):
+        """Extract the completion, updating the breaker and latency window for `model`"""
+        timing.record('llm_queue', queued)
+        timing.record('llm_request', max(0.0, time.monotonic() - started - queued), model)
+        if response.status_code != 200:
+            circuit_breaker.record_failure(model)
+            raise LLMRequestError(f"API request failed: {response.status_code} - {response.text[:500]}")
+        try:
+            content = response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            circuit_breaker.record_failure(model)
+            raise LLMRequestError(f"Malformed response from {model}")
+
+        circuit_breaker.record_success(model)
+        latency = time.monotonic() - started - queued
+        latency_tracker.record((self.operation, model), latency)
+        if llm_fixtures.recording():
+            llm_fixtures.get_store().add(self.operation, payload, response.json(), latency)
+        return content
+
+    def _attempt(self, model, prompt, params):
+        headers, payload = self._request_parts(model, prompt, params)
+        started = time.monotonic()
+        if llm_fixtures.replaying():
+            return self._content(model, llm_fixtures.replay(self.operation, payload), started, 0.0, payload)
+        try:
+            response, queued = send_rate_limited(lambda: requests.post(
+                self.base_url, headers=headers, json=payload, timeout=settings.LLM_REQUEST_TIMEOUT
+            ))
+        except requests.RequestException as e:
+            circuit_breaker.record_failure(model)
+            raise LLMRequestError(f"{model}: {e}")
+        finally:
+            # Executor threads outlive the request; don't leave their DB connections open
+            connections.close_all()
+        self.queue_wait += queued
+        return self._content(model, response, started, queued, payload)
+
+    async def _aattempt(self, model, prompt, params):
+        import httpx
+        headers, payload = self._request_parts(model, prompt, params)
+        started = time.monotonic()
+        if llm_fixtures.replaying():
+            response = await llm_fixtures.areplay(self.operation, payload)
+            return self._content(model, response, started, 0.0, payload)
+        client = get_async_http_client()
+        try:
+            response, queued = await asend_rate_limited(lambda: client.post(
+                self.base_url, headers=headers, json=payload, timeout=settings.LLM_REQUEST_TIMEOUT
+            ))
+        except httpx.HTTPError as e:
+            circuit_breaker.record_failure(model)
+            raise LLMRequestError(f"{model}: {e}")
+        self.queue_wait += queued
+        return self._content(model, response, started, queued, payload)
+
+    def _failed(self, errors, rate_limited):
+        if rate_limited is not None:
+            raise rate_limited
+        raise LLMRequestError(f"All models for '{self.operation}' failed: {'; '.join(errors)}")
+
+    def _submit(self, executor, model, prompt, params):
+        # Run in a copy of the caller's context so the attempt's stage timings reach its request
+        return executor.submit(contextvars.copy_context().run, self._attempt, model, prompt, params)
+
+    def complete(self, prompt, **params):
+        """Return the completion text for `prompt`; extra params go into the request payload"""
+        models = self._available_models()
+        errors, rate_limited = [], None
+        executor = _get_executor()
+
+        while models:
+            primary = models.popleft()
+            in_flight = {self._submit(executor, primary, prompt, params): primary}
+            hedge_delay = self._hedge_delay(primary)
+            hedge_at = None if hedge_delay is None else time.monotonic() + hedge_delay
+
+            while in_flight:
+                timeout = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    hedge_model = models.popleft() if models else primary
+                    logger.info("Hedging %s call to %s after %.1fs", self.operation, hedge_model, hedge_delay)
+                    in_flight[self._submit(executor, hedge_model, prompt, params)] = hedge_model
+                    hedge_at = None
+                    continue
+
+                for future in done:
+                    model = in_flight.pop(future)
+                    try:
+                        content = future.result()
+                    except RateLimitExceeded as e:
+                        # Every model shares the limiter, so falling back would only queue again
+                        rate_limited = e
+                        models.clear()
+                    except Exception as e:
+                        errors.append(f"{model}: {e}")
+                    else:
+                        # A losing hedge can't be interrupted; it finishes in the background
+                        self.last_model = model
+                        return content
+
+        self._failed(errors, rate_limited)
+
+    async def acomplete(self, prompt, **params):
+        """Async complete; the losing hedged request is cancelled"""
+        models = self._available_models()
+        errors, rate_limited = [], None
+
+        while models:
+            primary = models.popleft()
+            in_flight = {asyncio.ensure_future(self._aattempt(primary, prompt, params)): primary}
+            hedge_delay = self._hedge_delay(primary)
+            hedge_at = None if hedge_delay is None else time.monotonic() + hedge_delay
+
+            try:
+                while in_flight:
+                    timeout = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+                    done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        hedge_model = models.popleft() if models else primary
+                        logger.info("Hedging %s call to %s after %.1fs", self.operation, hedge_model, hedge_delay)
+                        in_flight[asyncio.ensure_future(self._aattempt(hedge_model, prompt, params))] = hedge_model
+                        hedge_at = None
+                        continue
+
+                    for task in done:
+                        model = in_flight.pop(task)
+                        try:
+                            content = task.result()
+                        except RateLimitExceeded as e:
+                            rate_limited = e
+                            models.clear()
+                        except Exception as e:
+                            errors.append(f"{model}: {e}")
+                        else:
+                            self.last_model = model
+                            return content
+            finally:
+                for task in in_flight:
+                    task.cancel()
+
+        self._failed(errors, rate_limited)
@@ -0,0 +1,147 @@
+"""Record/replay store for LLM completions.
+
+With LLM_TRANSPORT=record, every successful chat completion is appended to
+LLM_FIXTURES_PATH, keyed by a hash of the request payload (model, messages and
+parameters; never the API key). With LLM_TRANSPORT=replay, completions are
+served from that file instead of OpenRouter. Replay makes no network calls,
+needs no API key and skips the rate limiter. A request with no recording fails
+like an unavailable model, so the fallback chain moves on to the next one.
+
+The file is gzip-compressed JSON lines. Each recording is appended as its own
+gzip member in a single write, so several workers can record at once.
+`manage.py llm_fixtures --compact` rewrites it as one member without duplicates.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from django.conf import settings
+
+LIVE, RECORD, REPLAY = 'live', 'record', 'replay'
+TRANSPORTS = (LIVE, RECORD, REPLAY)
+
+
+def request_key(payload):
+    """Stable hash of a chat completion request"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+class ReplayedResponse:
+    """Enough of a requests/httpx response for LLMClient._content"""
+
+    def __init__(self, body):
+        self.status_code = 200
+        self._body = body
+        self.text = json.dumps(body)
+
+    def json(self):
+        return self._body
+
+
+class FixtureStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def entries(self):
+        """key -> recording, loaded on first use; a later line for the same key wins"""
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                if os.path.exists(self.path):
+                    with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                        for line in f:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._entries[entry['key']] = entry
+            return self._entries
+
+    def get(self, payload):
+        return self.entries().get(request_key(payload))
+
+    def add(self, operation, payload, body, latency):
+        """Append one recording; requests already in the store are not written again"""
+        key = request_key(payload)
+        entries = self.entries()
+        with self._lock:
+            if key in entries:
+                return
+            entry = {
+                'key': key,
+                'operation': operation,
+                'model': payload.get('model'),
+                'latency': round(latency, 3),
+                'recorded_at': time.time(),
+                'response': body,
+            }
+            entries[key] = entry
+            member = gzip.compress((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # O_APPEND plus one unbuffered write keeps members from different workers whole
+            with open(self.path, 'ab', buffering=0) as f:
+                f.write(member)
+
+    def compact(self):
+        """Rewrite the file as a single gzip member, one line per request; returns the line count"""
+        with self._lock:
+            self._entries = None
+        entries = self.entries()
+        temp_path = f'{self.path}.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for key in sorted(entries):
+                f.write(json.dumps(entries[key], ensure_ascii=False) + '\n')
+        os.replace(temp_path, self.path)
+        return len(entries)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """This process's store for LLM_FIXTURES_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != settings.LLM_FIXTURES_PATH:
+            _store = FixtureStore(settings.LLM_FIXTURES_PATH)
+        return _store
+
+
+def recording():
+    return settings.LLM_TRANSPORT == RECORD
+
+
+def replaying():
+    return settings.LLM_TRANSPORT == REPLAY
+
+
+def lookup(operation, payload):
+    """The recording for `payload` and its simulated latency in seconds"""
+    from .llm import LLMRequestError
+
+    entry = get_store().get(payload)
+    if entry is None:
+        raise LLMRequestError(
+            f"No recorded {operation} response from {payload.get('model')} (key {request_key(payload)}) "
+            f"in {settings.LLM_FIXTURES_PATH}; record one with LLM_TRANSPORT=record"
+        )
+    return ReplayedResponse(entry['response']), entry['latency'] * settings.LLM_REPLAY_LATENCY_SCALE
+
+
+def replay(operation, payload):
+    response, delay = lookup(operation, payload)
+    if delay:
+        time.sleep(delay)
+    return response
+
+
+async def areplay(operation, payload):
+    import asyncio
+    response, delay = lookup(operation, payload)
+    if delay:
+        await asyncio.sleep(delay)
+    return response
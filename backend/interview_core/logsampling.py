@@ -0,0 +1,21 @@
+import logging
+import random
+from django.conf import settings
+from .timing import current
+
+
+class SampledFilter(logging.Filter):
+    """Keep every WARNING and above, but only LOG_SAMPLE_RATE of DEBUG/INFO records.
+
+    Sampling is decided once per request, so a sampled request keeps all of
+    its log lines and the others keep none. Outside a request each record is
+    sampled on its own.
+    """
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or settings.LOG_SAMPLE_RATE >= 1:
+            return True
+        timings = current()
+        if timings is not None:
+            return timings.log_sampled
+        return random.random() < settings.LOG_SAMPLE_RATE
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from interview_core.archive import EXTENSIONS, archive, cutoff_for
+from interview_core.exceptions import ArchiveError
+
+class Command(BaseCommand):
+    help = 'Move old questions and their answers to compressed monthly files under ARCHIVE_DIR'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help=f'Archive questions older than this many days (default: {settings.ARCHIVE_AFTER_DAYS})'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RETENTION_BATCH_SIZE,
+            help=f'Questions read and deleted per batch (default: {settings.RETENTION_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.RETENTION_BATCH_SLEEP,
+            help=f'Seconds to pause between delete batches (default: {settings.RETENTION_BATCH_SLEEP})'
+        )
+        parser.add_argument(
+            '--compression',
+            choices=sorted(EXTENSIONS),
+            default=settings.ARCHIVE_COMPRESSION,
+            help=f'File compression; zstd needs the zstandard package (default: {settings.ARCHIVE_COMPRESSION})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows each month would archive'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        cutoff = cutoff_for(options['days'])
+        try:
+            results = archive(cutoff, options['batch_size'], options['sleep'],
+                              options['compression'], options['dry_run'])
+        except ArchiveError as e:
+            raise CommandError(str(e))
+
+        if not results:
+            self.stdout.write(f'Nothing to archive before {cutoff:%Y-%m-%d %H:%M}')
+            return
+        for month, questions, answers in results:
+            if options['dry_run']:
+                self.stdout.write(f'{month}: {questions} questions and {answers} answers would be archived')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{month}: archived {questions} questions and {answers} answers to {settings.ARCHIVE_DIR}'
+                ))
@@ -0,0 +1,46 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from interview_core.rollups import ScoreRollupService
+
+class Command(BaseCommand):
+    help = 'Rebuild daily score rollups from existing answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Only rebuild rollups for this username'
+        )
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only rebuild rollups from this day onwards (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows written per batch (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        since = None
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        written = ScoreRollupService().rebuild(user=user, since=since, batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {written} daily score rollups')
+        )
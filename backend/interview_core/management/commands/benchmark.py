@@ -0,0 +1,342 @@
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import timeit
+from datetime import timedelta
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+from rest_framework.test import force_authenticate
+from interview_core.models import InterviewQuestion, UserAnswer, SavedQuestion
+
+TOPICS = ['Python', 'Django', 'PostgreSQL', 'System Design', 'Docker', 'REST APIs',
+          'Algorithms', 'Networking', 'Kubernetes', 'React', 'Security', 'Testing']
+GROUPS = ('parse', 'resume', 'serialize', 'dashboard')
+PAGE_COUNTS = (1, 10, 50)
+LINES_PER_PAGE = 40
+RESUME_LINE = 'Led the migration of a billing service to Django and PostgreSQL, cutting p95 latency by 40%.'
+
+
+# -------------------- Fixtures --------------------
+
+def _model_questions(count=10):
+    return json.dumps([
+        {'question': f'How does {topic} handle concurrency in production systems? ({i})',
+         'answer': f'{topic} relies on a combination of isolation, queuing and careful resource limits. ' * 3}
+        for i, topic in enumerate(TOPICS[:count])
+    ], indent=2)
+
+
+def parse_inputs():
+    """Model output the parser sees: clean JSON, JSON wrapped in chatter, and hostile near-JSON"""
+    clean = _model_questions()
+    noisy = (
+        "<s> Sure! Here are the interview questions you asked for:\n\n```json\n"
+        f"{clean}\n```\n\nLet me know if you would like them harder.</s>"
+    )
+    # Unbalanced brackets and braces make the fallback regexes scan and backtrack before giving up
+    adversarial = 'Here you go: [' + '{"question": "What is {x}?", "answer": [1, {2' * 400 + ' and that is all.'
+    return {'clean': clean, 'noisy': noisy, 'adversarial': adversarial}
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def pdf_bytes(pages):
+    """A text PDF with LINES_PER_PAGE lines per page, written by hand to avoid a PDF writer dependency"""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for page in range(pages):
+        lines = ''.join(
+            f'({_pdf_escape(f"{page + 1}.{line + 1} {RESUME_LINE}")}) Tj T* '
+            for line in range(LINES_PER_PAGE)
+        )
+        stream = f'BT /F1 9 Tf 11 TL 40 800 Td {lines}ET'.encode()
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % len(objects))
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {pages} >>'.encode()
+
+    output = io.BytesIO()
+    output.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = output.tell()
+    output.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b'%010d 00000 n \n' % offset)
+    output.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+def docx_bytes(pages):
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    document = Document()
+    for page in range(pages):
+        for line in range(LINES_PER_PAGE):
+            document.add_paragraph(f'{page + 1}.{line + 1} {RESUME_LINE}')
+        document.paragraphs[-1].add_run().add_break(WD_BREAK.PAGE)
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def seed_history(rows, days=180):
+    """One user with `rows` answered and saved questions spread over `days`, plus rollups and histograms"""
+    from interview_core.histograms import ScoreHistogramService
+    from interview_core.rollups import ScoreRollupService
+
+    rng = random.Random(0)
+    user = User.objects.create_user('benchmark', 'benchmark@example.com', 'benchmark')
+    questions = InterviewQuestion.objects.bulk_create([
+        InterviewQuestion(user=user, topic=rng.choice(TOPICS), is_answered=True,
+                          question=f'Question {i}: explain a trade-off you made recently.',
+                          answer='A reference answer describing the trade-off and its consequences.')
+        for i in range(rows)
+    ], batch_size=1000)
+    answers = UserAnswer.objects.bulk_create([
+        UserAnswer(user=user, question=question, user_text='I chose consistency over latency because...',
+                   accuracy=rng.uniform(20, 100), clarity_score=rng.uniform(20, 100),
+                   completeness_score=rng.uniform(20, 100), technical_accuracy_score=rng.uniform(20, 100),
+                   feedback='Solid answer.', strengths='Structure.', improvements='Examples.',
+                   missing_points='Edge cases.')
+        for question in questions
+    ], batch_size=1000)
+    SavedQuestion.objects.bulk_create([SavedQuestion(user=user, question=question) for question in questions],
+                                      batch_size=1000)
+
+    # auto_now_add stamps every row with now; spread the answers over the period instead
+    now = timezone.now()
+    by_day = {}
+    for answer in answers:
+        by_day.setdefault(rng.randrange(days), []).append(answer.pk)
+    for day, pks in by_day.items():
+        UserAnswer.objects.filter(pk__in=pks).update(created_at=now - timedelta(days=day))
+
+    ScoreRollupService().rebuild(user=user)
+    ScoreHistogramService().rebuild()
+    return user
+
+
+# -------------------- Benchmarks --------------------
+
+def parse_benchmarks():
+    from interview_core.services import AIService
+
+    # The parser needs no API client, so skip __init__ and its OPENROUTER_API_KEY check
+    service = AIService.__new__(AIService)
+    return {
+        f'parse_json.{name}': (lambda content=content: service._parse_json_response(content))
+        for name, content in parse_inputs().items()
+    }
+
+
+def resume_benchmarks(directory):
+    from interview_core.resume_parser import ResumeParser
+
+    parser = ResumeParser()
+    benchmarks = {}
+    for pages in PAGE_COUNTS:
+        for extension, build, extract in (
+            ('pdf', pdf_bytes, parser.extract_text_from_pdf),
+            ('docx', docx_bytes, parser.extract_text_from_docx),
+        ):
+            path = os.path.join(directory, f'resume-{pages}.{extension}')
+            with open(path, 'wb') as f:
+                f.write(build(pages))
+            benchmarks[f'resume.{extension}_{pages}p'] = lambda extract=extract, path=path: extract(path)
+    return benchmarks
+
+
+def serialize_benchmarks(user):
+    from django.db.models import Prefetch
+    from interview_core.serializers import UserAnswerSerializer, SavedQuestionSerializer
+
+    # Rows are loaded once up front so only serialization is timed
+    answers = list(UserAnswer.objects.filter(user=user).select_related('user', 'question'))
+    saved = list(SavedQuestion.objects.filter(user=user).select_related('question').prefetch_related(
+        Prefetch('question__user_answers', queryset=UserAnswer.objects.filter(user=user),
+                 to_attr='user_answer_list')
+    ))
+    return {
+        'serialize.user_answers': lambda: UserAnswerSerializer(answers, many=True).data,
+        'serialize.saved_questions': lambda: SavedQuestionSerializer(saved, many=True).data,
+    }
+
+
+def dashboard_benchmarks(user):
+    from interview_core.filters import DashboardStatsView
+    from interview_core.template_views import dashboard_view
+    from interview_core.views import ScoreTrendView
+
+    factory = RequestFactory()
+    today = timezone.localdate()
+
+    def api(view, path, **params):
+        def call():
+            request = factory.get(path, params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            assert response.status_code == 200, response.status_code
+        return call
+
+    def page():
+        request = factory.get('/dashboard/')
+        request.user = user
+        assert dashboard_view(request).status_code == 200
+
+    return {
+        'dashboard.stats_api': api(DashboardStatsView.as_view(), '/api/dashboard-stats/'),
+        'dashboard.score_trend_week': api(ScoreTrendView.as_view(), '/api/score-trends/', bucket='week',
+                                          start=(today - timedelta(days=179)).isoformat()),
+        'dashboard.page': page,
+    }
+
+
+def measure(function, repeat):
+    """timeit with autorange loops per run; per-call seconds of every run"""
+    timer = timeit.Timer(function)
+    loops, _ = timer.autorange()
+    return loops, [total / loops for total in timer.repeat(repeat=repeat, number=loops)]
+
+
+def compare(results, baseline, threshold):
+    """(name, baseline ms, current ms, ratio, regressed) for benchmarks present in both runs"""
+    rows = []
+    for name, result in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if previous is None:
+            continue
+        ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else 1.0
+        rows.append((name, previous['median_ms'], result['median_ms'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark JSON parsing, resume extraction, serialization and dashboard aggregations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group',
+            action='append',
+            choices=GROUPS,
+            help='Benchmark group to run; repeat for several (default: all)'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Answers and saved questions seeded for the serialize and dashboard groups (default: 10000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per benchmark; the median is compared (default: 5)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Compare against results previously written with --output'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Fail when a median is this fraction slower than the baseline (default: 0.2)'
+        )
+
+    def handle(self, *args, **options):
+        groups = options['group'] or list(GROUPS)
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        benchmarks = {}
+        with tempfile.TemporaryDirectory() as directory:
+            if 'parse' in groups:
+                benchmarks.update(parse_benchmarks())
+            if 'resume' in groups:
+                benchmarks.update(resume_benchmarks(directory))
+
+            old_config = None
+            if 'serialize' in groups or 'dashboard' in groups:
+                # Seeded rows go to a throwaway test database, never the configured one
+                old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                if old_config is not None:
+                    self.stderr.write(f"Seeding {options['rows']} answers...")
+                    user = seed_history(options['rows'])
+                    if 'serialize' in groups:
+                        benchmarks.update(serialize_benchmarks(user))
+                    if 'dashboard' in groups:
+                        benchmarks.update(dashboard_benchmarks(user))
+                results = self.run_benchmarks(benchmarks, options)
+            finally:
+                if old_config is not None:
+                    teardown_databases(old_config, verbosity=0)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            self.report_comparison(results, baseline, options['threshold'])
+
+    def run_benchmarks(self, benchmarks, options):
+        results = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'machine': platform.machine(),
+                'rows': options['rows'],
+            },
+            'benchmarks': {},
+        }
+        self.stdout.write(f"{'benchmark':<32}{'median ms':>12}{'min ms':>12}{'loops':>8}")
+        for name, function in benchmarks.items():
+            loops, runs = measure(function, max(1, options['repeat']))
+            result = {
+                'median_ms': round(statistics.median(runs) * 1000, 4),
+                'min_ms': round(min(runs) * 1000, 4),
+                'loops': loops,
+                'runs': len(runs),
+            }
+            results['benchmarks'][name] = result
+            self.stdout.write(f"{name:<32}{result['median_ms']:>12.3f}{result['min_ms']:>12.3f}{loops:>8}")
+        return results
+
+    def report_comparison(self, results, baseline, threshold):
+        rows = compare(results, baseline, threshold)
+        self.stdout.write(f"\n{'benchmark':<32}{'baseline ms':>12}{'now ms':>12}{'change':>9}")
+        for name, previous, current, ratio, regressed in rows:
+            line = f"{name:<32}{previous:>12.3f}{current:>12.3f}{ratio - 1:>+9.1%}"
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            raise CommandError(f"Slower than the baseline by more than {threshold:.0%}: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS(f"No benchmark regressed by more than {threshold:.0%}"))
@@ -1,32 +1,19 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from datetime import timedelta
-import os
-from interview_core.models import UserAnswer
 
 class Command(BaseCommand):
-    help = 'Clean up old audio files older than specified days'
+    help = 'Deprecated: answers no longer store audio files. Use purge_retention instead'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--days',
             type=int,
             default=30,
-            help='Delete files older than this many days (default: 30)'
+            help='Ignored; kept so existing cron entries keep working'
         )
 
     def handle(self, *args, **options):
-        days = options['days']
-        cutoff_date = timezone.now() - timedelta(days=days)
-        
-        old_answers = UserAnswer.objects.filter(created_at__lt=cutoff_date)
-        deleted_count = 0
-        
-        for answer in old_answers:
-            if answer.audio_file and os.path.exists(answer.audio_file.path):
-                os.remove(answer.audio_file.path)
-                deleted_count += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully deleted {deleted_count} old audio files')
-        )
\ No newline at end of file
+        # Audio is transcribed in memory and never saved (UserAnswer.audio_file was dropped in 0004)
+        self.stderr.write(self.style.WARNING(
+            'cleanup_old_files is deprecated and does nothing: audio files are no longer stored. '
+            'Use `manage.py purge_retention` to remove old data.'
+        ))
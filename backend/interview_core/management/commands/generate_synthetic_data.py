@@ -0,0 +1,338 @@
+import io
+import itertools
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from interview_core.models import InterviewQuestion, UserAnswer, SavedQuestion, Resume, InterviewSession
+
+BASE_TOPICS = [
+    'Python', 'JavaScript', 'Django', 'React', 'SQL', 'PostgreSQL', 'System Design', 'Data Structures',
+    'Algorithms', 'Docker', 'Kubernetes', 'AWS', 'REST APIs', 'GraphQL', 'Machine Learning', 'Git',
+    'Linux', 'Networking', 'Security', 'Testing', 'TypeScript', 'Java', 'Go', 'Redis', 'Microservices',
+    'Operating Systems', 'Concurrency', 'CI/CD', 'Node.js', 'Behavioral',
+]
+QUESTION_TEMPLATES = [
+    'What is the difference between {a} and {b} in {topic}?',
+    'How would you debug a slow {a} in a {topic} application?',
+    'Explain how {a} works in {topic} and when you would avoid it.',
+    'Design a {b} for a high-traffic {topic} service. What are the trade-offs?',
+    'Describe a production incident involving {a} in {topic} and how you resolved it.',
+]
+TERMS = ['caching', 'indexing', 'queue', 'connection pool', 'transaction', 'lock', 'retry policy',
+         'serializer', 'middleware', 'scheduler', 'rate limiter', 'load balancer', 'migration', 'thread pool']
+ANSWER_SNIPPETS = [
+    'It depends on the access pattern, so I would measure first.',
+    'The main trade-off is consistency against latency.',
+    'I would add an index on the filtered columns and check the query plan.',
+    'Batching the writes reduces round trips considerably.',
+    'A circuit breaker stops the failure from cascading.',
+    'I am not completely sure, but I think it is related to the garbage collector.',
+]
+SKILLS = ['Python', 'Django', 'React', 'PostgreSQL', 'Docker', 'AWS', 'Kubernetes', 'Go', 'Redis', 'Java',
+          'TypeScript', 'GraphQL', 'Terraform', 'Kafka', 'Spark', 'Pandas', 'FastAPI', 'Celery']
+DIFFICULTY_OFFSET = {'easy': 10, 'medium': 0, 'hard': -12}
+
+
+def topic_names(count):
+    """The first names are real topics; past those, numbered sub-areas keep the long tail distinct"""
+    names = BASE_TOPICS[:count]
+    for index in range(count - len(names)):
+        base = BASE_TOPICS[index % len(BASE_TOPICS)]
+        names.append(f'{base} {index // len(BASE_TOPICS) + 2}')
+    return names
+
+
+def zipf_cum_weights(count, exponent):
+    """Cumulative weights for rank k ∝ 1 / k**exponent, for random.choices"""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at values instead of stamping now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _copy_value(value):
+    """One field in PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class RowWriter:
+    """Writes model instances with preassigned ids: COPY on PostgreSQL, bulk_create elsewhere"""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.postgres = connection.vendor == 'postgresql'
+        self.next_ids = {}
+        self.written = {}
+
+    def allocate(self, model, count):
+        """Ids for `count` new rows, taken from the sequence on PostgreSQL so later inserts never collide"""
+        if self.postgres:
+            table = model._meta.db_table
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+                    [table, model._meta.pk.column, count]
+                )
+                return [row[0] for row in cursor.fetchall()]
+        if model not in self.next_ids:
+            self.next_ids[model] = (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+        start = self.next_ids[model]
+        self.next_ids[model] = start + count
+        return list(range(start, start + count))
+
+    def write(self, model, objects):
+        if not objects:
+            return
+        if self.postgres:
+            # COPY bypasses the column default, so every row needs its id up front
+            missing = [obj for obj in objects if obj.pk is None]
+            for obj, pk in zip(missing, self.allocate(model, len(missing)) if missing else []):
+                obj.pk = pk
+            self._copy(model, objects)
+        else:
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.written[model] = self.written.get(model, 0) + len(objects)
+
+    def _copy(self, model, objects):
+        fields = model._meta.concrete_fields
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        sql = f'COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN'
+        buffer = io.StringIO()
+        for obj in objects:
+            buffer.write('\t'.join(_copy_value(getattr(obj, field.attname)) for field in fields))
+            buffer.write('\n')
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                buffer.seek(0)
+                raw.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+
+class SyntheticDataGenerator:
+    """Builds users with power-law activity over Zipf-distributed topics, deterministically from a seed"""
+
+    def __init__(self, writer, options):
+        self.writer = writer
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.topics = topic_names(options['topics'])
+        self.topic_weights = zipf_cum_weights(len(self.topics), options['zipf'])
+        self.end = timezone.make_aware(datetime.combine(options['end_date'], datetime.min.time()))
+        self.start = self.end - timedelta(days=options['days'])
+        self.password = make_password(options['password'])
+
+    def activity(self):
+        """Questions for one user: Pareto-distributed so a few heavy users own much of the data"""
+        alpha = self.options['activity_alpha']
+        scale = self.options['questions_per_user'] * (alpha - 1) / alpha
+        return min(self.options['max_questions_per_user'], max(1, round(scale * self.rng.paretovariate(alpha))))
+
+    def moment(self, after):
+        return after + (self.end - after) * self.rng.random()
+
+    def build_users(self, first_index, count):
+        rng = self.rng
+        users = []
+        for index, pk in zip(range(first_index, first_index + count), self.writer.allocate(User, count)):
+            username = f"{self.options['prefix']}{index:07d}"
+            joined = self.start + (self.end - self.start) * rng.random()
+            users.append(User(
+                pk=pk, username=username, email=f'{username}@example.com', password=self.password,
+                date_joined=joined, last_login=self.moment(joined),
+            ))
+        return users
+
+    def build_activity(self, users):
+        rng = self.rng
+        plans = [(user, self.activity()) for user in users]
+        question_ids = iter(self.writer.allocate(InterviewQuestion, sum(total for _, total in plans)))
+        rows = {InterviewQuestion: [], UserAnswer: [], SavedQuestion: [], InterviewSession: [], Resume: []}
+
+        for user, total in plans:
+            skill = rng.gauss(65, 12)
+            remaining = total
+            while remaining:
+                size = min(remaining, rng.randint(3, 10))
+                remaining -= size
+                topic = rng.choices(self.topics, cum_weights=self.topic_weights)[0]
+                difficulty = rng.choice(('easy', 'medium', 'medium', 'hard'))
+                started = self.moment(user.date_joined)
+                session_questions = []
+                answered = 0
+                for position in range(size):
+                    # Sessions are mostly finished front to back; some are abandoned part way
+                    is_answered = rng.random() < self.options['answer_ratio']
+                    asked_at = started + timedelta(seconds=position * rng.randint(60, 300))
+                    question = InterviewQuestion(
+                        pk=next(question_ids), user_id=user.pk, topic=topic, is_answered=is_answered,
+                        question=rng.choice(QUESTION_TEMPLATES).format(
+                            a=rng.choice(TERMS), b=rng.choice(TERMS), topic=topic),
+                        answer=' '.join(rng.sample(ANSWER_SNIPPETS, 3)),
+                        created_at=asked_at, updated_at=asked_at,
+                    )
+                    rows[InterviewQuestion].append(question)
+                    session_questions.append(question.pk)
+                    if is_answered:
+                        answered += 1
+                        rows[UserAnswer].append(self.build_answer(user, question, skill, difficulty))
+                    if rng.random() < self.options['saved_ratio']:
+                        rows[SavedQuestion].append(SavedQuestion(
+                            user_id=user.pk, question_id=question.pk, saved_at=asked_at + timedelta(minutes=5)))
+                finished = answered == size
+                rows[InterviewSession].append(InterviewSession(
+                    user_id=user.pk, topic=topic, question_ids=session_questions, current_index=answered,
+                    created_at=started, updated_at=started,
+                    completed_at=started + timedelta(minutes=size * 4) if finished else None,
+                ))
+
+            if rng.random() < self.options['resume_ratio']:
+                uploaded = self.moment(user.date_joined)
+                skills = rng.sample(SKILLS, rng.randint(3, 8))
+                rows[Resume].append(Resume(
+                    user_id=user.pk, skills=skills, uploaded_at=uploaded,
+                    experience=[f'{rng.choice(SKILLS)} Developer at Company {rng.randint(1, 500)}'
+                                for _ in range(rng.randint(1, 4))],
+                    projects=[f'{rng.choice(TERMS).title()} service in {rng.choice(skills)}'
+                              for _ in range(rng.randint(1, 3))],
+                    extracted_text=f"Skills: {', '.join(skills)}",
+                ))
+        return rows
+
+    def build_answer(self, user, question, skill, difficulty):
+        rng = self.rng
+
+        def score():
+            return round(min(100.0, max(0.0, rng.gauss(skill + DIFFICULTY_OFFSET[difficulty], 15))), 1)
+
+        accuracy = score()
+        return UserAnswer(
+            user_id=user.pk, question_id=question.pk, user_text=' '.join(rng.sample(ANSWER_SNIPPETS, 2)),
+            accuracy=accuracy, clarity_score=score(), completeness_score=score(), technical_accuracy_score=score(),
+            feedback='Good structure.' if accuracy >= 60 else 'Covers part of the expected answer.',
+            strengths='Clear reasoning.', improvements='Add a concrete example.', missing_points='Edge cases.',
+            created_at=question.created_at + timedelta(seconds=rng.randint(30, 240)),
+        )
+
+    def generate_chunk(self, first_index, count):
+        users = self.build_users(first_index, count)
+        rows = self.build_activity(users)
+        with transaction.atomic():
+            self.writer.write(User, users)
+            for model in (InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession, Resume):
+                self.writer.write(model, rows[model])
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, realistic and reproducible dataset of users, questions, answers, saved questions and resumes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create (default: 1000)')
+        parser.add_argument('--questions-per-user', type=float, default=40,
+                            help='Mean questions per user (default: 40)')
+        parser.add_argument('--max-questions-per-user', type=int, default=5000,
+                            help='Cap for the heaviest users (default: 5000)')
+        parser.add_argument('--activity-alpha', type=float, default=1.5,
+                            help='Pareto shape of per-user activity; lower means heavier heavy users (default: 1.5)')
+        parser.add_argument('--topics', type=int, default=200, help='Distinct topics (default: 200)')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Zipf exponent of topic popularity (default: 1.1)')
+        parser.add_argument('--answer-ratio', type=float, default=0.75,
+                            help='Share of questions that get an answer (default: 0.75)')
+        parser.add_argument('--saved-ratio', type=float, default=0.05,
+                            help='Share of questions the user saves (default: 0.05)')
+        parser.add_argument('--resume-ratio', type=float, default=0.3,
+                            help='Share of users with an uploaded resume (default: 0.3)')
+        parser.add_argument('--days', type=int, default=365, help='History length in days (default: 365)')
+        parser.add_argument('--end-date', type=date.fromisoformat, default=None,
+                            help='Last day of the history, YYYY-MM-DD (default: today); fix it for identical reruns')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (default: 1)')
+        parser.add_argument('--prefix', default='synthetic_', help="Username prefix (default: 'synthetic_')")
+        parser.add_argument('--password', default='synthetic-password',
+                            help='Password shared by every generated user')
+        parser.add_argument('--chunk-users', type=int, default=200,
+                            help='Users generated and written per transaction (default: 200)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows per bulk_create batch (default: 5000)')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously generated users (matching --prefix) and their data first')
+        parser.add_argument('--skip-aggregates', action='store_true',
+                            help='Do not rebuild score rollups and topic histograms afterwards')
+
+    def handle(self, *args, **options):
+        if options['activity_alpha'] <= 1:
+            raise CommandError('--activity-alpha must be above 1 for the mean to exist')
+        if not 0 < options['topics']:
+            raise CommandError('--topics must be positive')
+        options['end_date'] = options['end_date'] or timezone.localdate()
+
+        if options['clear']:
+            self.clear(options['prefix'])
+        elif User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users named {options['prefix']}* already exist; pass --clear to replace them")
+
+        writer = RowWriter(options['batch_size'])
+        generator = SyntheticDataGenerator(writer, options)
+        started = time.monotonic()
+        with explicit_timestamps(User, InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession, Resume):
+            for first in range(0, options['users'], options['chunk_users']):
+                generator.generate_chunk(first, min(options['chunk_users'], options['users'] - first))
+                rows = sum(writer.written.values())
+                self.stdout.write(
+                    f"{first + min(options['chunk_users'], options['users'] - first)}/{options['users']} users, "
+                    f"{rows} rows ({rows / (time.monotonic() - started):.0f} rows/s)"
+                )
+
+        if not options['skip_aggregates']:
+            self.stdout.write('Rebuilding score rollups and topic histograms...')
+            from interview_core.histograms import ScoreHistogramService
+            from interview_core.rollups import ScoreRollupService
+            ScoreRollupService().rebuild(batch_size=options['batch_size'])
+            ScoreHistogramService().rebuild()
+
+        summary = ', '.join(f'{count} {model._meta.verbose_name_plural}' for model, count in writer.written.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {summary} in {time.monotonic() - started:.1f}s "
+            f"({'COPY' if writer.postgres else 'bulk_create'})"
+        ))
+
+    def clear(self, prefix):
+        ids = list(User.objects.filter(username__startswith=prefix).values_list('pk', flat=True))
+        # Small chunks keep the cascade collector's memory bounded for users with large histories
+        for start in range(0, len(ids), 200):
+            User.objects.filter(pk__in=ids[start:start + 200]).delete()
+        if ids:
+            self.stdout.write(f'Deleted {len(ids)} generated users and their data')
@@ -0,0 +1,29 @@
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from interview_core.llm_fixtures import get_store
+
+class Command(BaseCommand):
+    help = 'Summarize or compact the recorded LLM responses used by LLM_TRANSPORT=replay'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--compact',
+            action='store_true',
+            help='Rewrite the file as a single gzip stream with one line per request'
+        )
+
+    def handle(self, *args, **options):
+        store = get_store()
+        if options['compact']:
+            count = store.compact()
+            self.stdout.write(self.style.SUCCESS(f'Compacted {settings.LLM_FIXTURES_PATH} to {count} recordings'))
+
+        entries = store.entries()
+        if not entries:
+            self.stdout.write(f'No recordings in {settings.LLM_FIXTURES_PATH}; record some with LLM_TRANSPORT=record')
+            return
+        counts = Counter((entry['operation'], entry['model']) for entry in entries.values())
+        self.stdout.write(f'{len(entries)} recordings in {settings.LLM_FIXTURES_PATH}')
+        for (operation, model), count in sorted(counts.items()):
+            self.stdout.write(f'  {operation:<18} {model:<40} {count:>6}')
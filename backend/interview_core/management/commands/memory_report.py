@@ -0,0 +1,60 @@
+import json
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from interview_core.memory import process_memory, child_pids, gunicorn_master_pid, gunicorn_pidfile
+
+class Command(BaseCommand):
+    help = 'Report RSS/PSS and shared vs private memory for the gunicorn master and each worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pid',
+            type=int,
+            help='Gunicorn master pid (default: read from GUNICORN_PIDFILE or /tmp/gunicorn.pid)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        master_pid = options['pid']
+        if master_pid is None:
+            master_pid = gunicorn_master_pid()
+            if master_pid is None:
+                raise CommandError(f'Could not read a gunicorn pid from {gunicorn_pidfile()}; pass --pid')
+
+        master = process_memory(master_pid)
+        if master is None:
+            raise CommandError(f'No readable process with pid {master_pid}')
+
+        report = {
+            'master': {'pid': master_pid, **master},
+            'workers': [{'pid': pid, **(process_memory(pid) or {})} for pid in child_pids(master_pid)],
+        }
+        report['total_pss_mb'] = round(
+            sum(entry.get('pss_mb', 0) for entry in [report['master'], *report['workers']]), 1
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        columns = ('rss_mb', 'pss_mb', 'shared_mb', 'private_mb')
+        self.stdout.write(f"{'process':<16}" + ''.join(f"{column[:-3].upper():>11}" for column in columns))
+        for label, entry in [('master', report['master'])] + [('worker', worker) for worker in report['workers']]:
+            self.stdout.write(
+                f"{label + ' ' + str(entry['pid']):<16}" + ''.join(f"{entry.get(column, 0):>9.1f}MB" for column in columns)
+            )
+        self.stdout.write(f"Total PSS: {report['total_pss_mb']} MB")
+
+        ceiling = settings.MEMORY_CEILING_MB
+        if ceiling:
+            over = [worker['pid'] for worker in report['workers'] if worker.get('pss_mb', 0) > ceiling]
+            if over:
+                self.stdout.write(self.style.WARNING(
+                    f"Over the {ceiling:g}MB ceiling (recycling): {', '.join(map(str, over))}"
+                ))
+            else:
+                self.stdout.write(f"All workers under the {ceiling:g}MB ceiling")
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from interview_core.profiling import make_token, TOKEN_HEADER, QUERY_PARAM
+
+class Command(BaseCommand):
+    help = 'Print a signed token that lets one request be profiled without a staff login'
+
+    def handle(self, *args, **options):
+        token = make_token()
+        if not settings.PROFILING_ENABLED:
+            self.stderr.write(self.style.WARNING('PROFILING_ENABLED is off; the token has no effect until it is on'))
+        self.stdout.write(token)
+        self.stdout.write(
+            f'Valid for {settings.PROFILE_TOKEN_MAX_AGE}s. Send it as a {TOKEN_HEADER} header '
+            f'or ?{QUERY_PARAM}=<token>; the profile appears under Request profiles in the admin.'
+        )
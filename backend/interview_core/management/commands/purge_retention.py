@@ -0,0 +1,59 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from interview_core.retention import POLICIES, cutoff_for, purge
+
+class Command(BaseCommand):
+    help = 'Delete rows past their retention age in small primary key batches (see RETENTION_DAYS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policy',
+            action='append',
+            choices=sorted(POLICIES),
+            help='Policy to run; repeat for several (default: every policy with a retention age)'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Override the retention age in days for the selected policies'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RETENTION_BATCH_SIZE,
+            help=f'Rows deleted per transaction (default: {settings.RETENTION_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.RETENTION_BATCH_SLEEP,
+            help=f'Seconds to pause between batches (default: {settings.RETENTION_BATCH_SLEEP})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows each policy would delete'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        for policy in options['policy'] or sorted(POLICIES):
+            cutoff = cutoff_for(policy, options['days'])
+            if cutoff is None:
+                self.stdout.write(f'{policy}: kept forever (RETENTION_DAYS is 0)')
+                continue
+
+            started = time.monotonic()
+            count = purge(policy, cutoff, options['batch_size'], options['sleep'], options['dry_run'])
+            if options['dry_run']:
+                self.stdout.write(f'{policy}: {count} rows older than {cutoff:%Y-%m-%d %H:%M} would be deleted')
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{policy}: deleted {count} rows older than {cutoff:%Y-%m-%d %H:%M} '
+                    f'in {time.monotonic() - started:.1f}s'
+                ))
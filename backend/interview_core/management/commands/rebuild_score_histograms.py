@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from interview_core.histograms import ScoreHistogramService
+
+class Command(BaseCommand):
+    help = 'Rebuild per-topic accuracy histograms used for percentile rankings'
+
+    def handle(self, *args, **options):
+        written = ScoreHistogramService().rebuild()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {written} histogram bins')
+        )
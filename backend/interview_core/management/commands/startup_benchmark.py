@@ -0,0 +1,121 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Entry point name -> argv run in a fresh interpreter from the project root
+ENTRY_POINTS = {
+    'wsgi': ['-c', 'import backend.wsgi, backend.urls'],
+    'asgi': ['-c', 'import backend.asgi, backend.urls'],
+    'check': ['manage.py', 'check'],
+    'migrate': ['manage.py', 'migrate', '--plan'],
+    'collectstatic': ['manage.py', 'collectstatic', '--noinput', '--dry-run'],
+    'purge_retention': ['manage.py', 'purge_retention', '--help'],
+}
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$')
+
+
+def run_entry_point(argv, import_time=False):
+    """Run one entry point in a subprocess; return (seconds, max RSS in MB, stderr)"""
+    command = [sys.executable]
+    if import_time:
+        command += ['-X', 'importtime']
+    command += argv
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    stderr = process.stderr.read()
+    process.stderr.close()
+    # wait4 reports resource usage for this child only, unlike RUSAGE_CHILDREN
+    _, exit_status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(exit_status)
+
+    if process.returncode != 0:
+        raise CommandError(f"'{' '.join(argv)}' exited with {process.returncode}:\n{stderr[-2000:]}")
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return elapsed, max_rss, stderr
+
+
+def slowest_imports(stderr, limit):
+    """Parse `-X importtime` output into the top (cumulative ms, module) pairs"""
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            imports.append((int(match.group(2)) / 1000, match.group(3).strip()))
+    return sorted(imports, reverse=True)[:limit]
+
+
+class Command(BaseCommand):
+    help = 'Measure startup time and peak memory of the web worker and management entry points'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry',
+            action='append',
+            choices=sorted(ENTRY_POINTS),
+            help='Entry point to measure; repeat for several (default: all)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per entry point; the fastest run is reported (default: 3)'
+        )
+        parser.add_argument(
+            '--imports',
+            type=int,
+            default=0,
+            help='Also list the N slowest imports (cumulative) per entry point'
+        )
+        parser.add_argument(
+            '--budget',
+            type=float,
+            help='Fail if any entry point takes longer than this many seconds'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        entries = options['entry'] or list(ENTRY_POINTS)
+        results = {}
+
+        for name in entries:
+            runs = [run_entry_point(ENTRY_POINTS[name]) for _ in range(max(1, options['repeat']))]
+            elapsed, max_rss, _ = min(runs, key=lambda run: run[0])
+            result = {'seconds': round(elapsed, 3), 'max_rss_mb': round(max_rss, 1)}
+
+            if options['imports']:
+                _, _, stderr = run_entry_point(ENTRY_POINTS[name], import_time=True)
+                result['slowest_imports'] = [
+                    {'module': module, 'cumulative_ms': round(ms, 1)}
+                    for ms, module in slowest_imports(stderr, options['imports'])
+                ]
+            results[name] = result
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for name, result in results.items():
+                self.stdout.write(f"{name:<20} {result['seconds']:>7.3f}s  {result['max_rss_mb']:>8.1f} MB")
+                for entry in result.get('slowest_imports', []):
+                    self.stdout.write(f"    {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+
+        if options['budget'] is not None:
+            over = [name for name, result in results.items() if result['seconds'] > options['budget']]
+            if over:
+                raise CommandError(f"Over the {options['budget']}s startup budget: {', '.join(over)}")
+            self.stdout.write(self.style.SUCCESS(f"All entry points started within {options['budget']}s"))
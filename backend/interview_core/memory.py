@@ -0,0 +1,72 @@
+import os
+import resource
+import sys
+
+SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+}
+
+
+def process_memory(pid='self'):
+    """Memory of a process in MB: RSS, PSS and its shared/private split.
+
+    PSS divides every shared page between the processes mapping it, so summing
+    PSS across gunicorn workers gives the real footprint while RSS double-counts
+    model weights shared copy-on-write with the master. Linux only for other
+    pids; elsewhere the current process falls back to peak RSS.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as smaps:
+            report = {}
+            for line in smaps:
+                key, _, value = line.partition(':')
+                if key in SMAPS_FIELDS:
+                    report[SMAPS_FIELDS[key]] = round(int(value.split()[0]) / 1024, 1)
+        report['shared_mb'] = round(report.get('shared_clean_mb', 0) + report.get('shared_dirty_mb', 0), 1)
+        report['private_mb'] = round(report.get('private_clean_mb', 0) + report.get('private_dirty_mb', 0), 1)
+        return report
+    except OSError:
+        if pid != 'self' and pid != os.getpid():
+            return None
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {'rss_mb': round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)}
+
+
+def child_pids(pid):
+    """Direct children of a process (e.g. the workers of a gunicorn master), Linux only"""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as handle:
+                children.extend(int(child) for child in handle.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def gunicorn_pidfile():
+    return os.getenv('GUNICORN_PIDFILE', '/tmp/gunicorn.pid')
+
+
+def gunicorn_master_pid():
+    """Pid gunicorn.conf.py wrote to GUNICORN_PIDFILE, or None when there is none to read"""
+    try:
+        with open(gunicorn_pidfile()) as handle:
+            return int(handle.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def format_memory(report):
+    """One-line summary of a process_memory() report"""
+    if not report:
+        return 'memory unavailable'
+    return ', '.join(f"{key[:-3]}={value}MB" for key, value in report.items() if key in (
+        'rss_mb', 'pss_mb', 'shared_mb', 'private_mb'
+    ))
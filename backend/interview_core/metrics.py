@@ -0,0 +1,196 @@
+"""In-process metrics rendered in the Prometheus text format at /metrics.
+
+Histograms and counters live in this process. With METRICS_DIR set, each
+worker also writes a snapshot of its own series to METRICS_DIR/<pid>.json
+(at most every METRICS_FLUSH_SECONDS) and /metrics sums the snapshots of
+every worker, so a scrape that lands on any worker sees the whole server.
+Gauges (degradation level, circuit breakers, memory) describe the serving process.
+"""
+import json
+import os
+import threading
+import time
+from django.conf import settings
+
+# Seconds; covers sub-millisecond DB writes up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+_lock = threading.Lock()
+_histograms = {}
+_flushed_at = 0.0
+
+
+class Histogram:
+    """Latency histogram keyed by a fixed set of label names"""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series = {}
+        with _lock:
+            _histograms[name] = self
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with _lock:
+            return {json.dumps(key): list(series) for key, series in self._series.items()}
+
+
+stage_duration = Histogram(
+    'interview_stage_duration_seconds',
+    'Time spent in each hot-path stage (upload_read, decode, transcribe, llm_queue, llm_request, json_parse, db_write, ...)',
+    ['stage', 'model'],
+)
+request_duration = Histogram(
+    'interview_http_request_duration_seconds',
+    'Request latency by URL route',
+    ['route', 'method', 'status'],
+)
+
+
+def _counters():
+    """Per-process cumulative counters kept by the rate limiter and admission control"""
+    from .admission import admission_stats
+    from .ratelimit import queue_wait_stats
+
+    counters = {}
+    for key, value in queue_wait_stats().items():
+        if key != 'wait_seconds_max':
+            counters[f'interview_openrouter_{key}_total'] = value
+    for outcome, value in admission_stats().items():
+        counters[f'interview_admission_{outcome}_total'] = value
+    return counters
+
+
+def _snapshot():
+    return {
+        'histograms': {name: histogram.snapshot() for name, histogram in list(_histograms.items())},
+        'counters': _counters(),
+    }
+
+
+def flush(force=False):
+    """Write this worker's snapshot to METRICS_DIR, at most every METRICS_FLUSH_SECONDS"""
+    global _flushed_at
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed_at < settings.METRICS_FLUSH_SECONDS:
+        return
+    _flushed_at = now
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(_snapshot(), f)
+    os.replace(temp_path, path)
+
+
+def _merged_snapshot():
+    """Sum the snapshots of every worker, or return this process's alone without METRICS_DIR"""
+    if not settings.METRICS_DIR:
+        return _snapshot()
+
+    flush(force=True)
+    merged = {'histograms': {}, 'counters': {}}
+    for filename in os.listdir(settings.METRICS_DIR):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, series in snapshot['histograms'].items():
+            target = merged['histograms'].setdefault(name, {})
+            for key, values in series.items():
+                if key in target:
+                    target[key] = [a + b for a, b in zip(target[key], values)]
+                else:
+                    target[key] = values
+        for name, value in snapshot['counters'].items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+    return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def _render_histogram(histogram, series, lines):
+    lines.append(f'# HELP {histogram.name} {histogram.documentation}')
+    lines.append(f'# TYPE {histogram.name} histogram')
+    for key, values in sorted(series.items()):
+        pairs = list(zip(histogram.labelnames, json.loads(key)))
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float('inf'),), values[:-1]):
+            cumulative += count
+            lines.append(f'{histogram.name}_bucket{_labels(pairs + [("le", _format_bound(bound))])} {cumulative}')
+        lines.append(f'{histogram.name}_sum{_labels(pairs)} {values[-1]}')
+        lines.append(f'{histogram.name}_count{_labels(pairs)} {cumulative}')
+
+
+def _gauges():
+    """Point-in-time state of the serving process"""
+    from .degradation import controller
+    from .llm import circuit_breaker
+    from .memory import process_memory
+    from .ratelimit import queue_wait_stats
+
+    state = controller.state()
+    yield 'interview_degradation_level', 'Current load-shedding level (0 = normal)', [([], state['level'])]
+    yield 'interview_in_flight_requests', 'Admitted expensive requests in flight across workers', [([], state['in_flight'])]
+    yield 'interview_admitted_latency_p95_seconds', 'p95 duration of admitted requests in this worker', \
+        [([], state['p95_latency'])]
+    yield 'interview_openrouter_wait_seconds_max', 'Longest rate limit queue wait in this worker', \
+        [([], queue_wait_stats()['wait_seconds_max'])]
+    memory = process_memory() or {}
+    yield 'interview_worker_memory_mb', 'Memory of the serving worker', \
+        [([('kind', key[:-3])], value) for key, value in memory.items() if key in ('rss_mb', 'pss_mb', 'private_mb')]
+    yield 'interview_llm_circuit_open', '1 while a model\'s circuit breaker is open', \
+        [([('model', model)], int(breaker == 'open')) for model, (breaker, _) in circuit_breaker.state().items()]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    snapshot = _merged_snapshot()
+    lines = []
+    for name, series in snapshot['histograms'].items():
+        histogram = _histograms.get(name)
+        if histogram is not None:
+            _render_histogram(histogram, series, lines)
+
+    for name, value in sorted(snapshot['counters'].items()):
+        lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name} {value}')
+
+    for name, documentation, samples in _gauges():
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} gauge')
+        for pairs, value in samples:
+            lines.append(f'{name}{_labels(pairs)} {value}')
+    return '\n'.join(lines) + '\n'
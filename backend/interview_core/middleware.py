@@ -0,0 +1,138 @@
+import logging
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from . import metrics, profiling, timing
+from .instrumentation import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class QueryInstrumentationMiddleware:
+    """Report per-request SQL query count, DB time and duplicate queries as response headers.
+
+    Only active when DEBUG is on; in production Django drops it at startup so
+    there is no per-request cost.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryRecorder() as queries:
+            response = self.get_response(request)
+
+        duplicates = queries.duplicates()
+        response['X-DB-Query-Count'] = str(queries.count)
+        response['X-DB-Query-Time-Ms'] = f"{queries.total_time * 1000:.1f}"
+        response['X-DB-Duplicate-Queries'] = str(sum(count - 1 for count in duplicates.values()))
+
+        if duplicates:
+            logger.warning(
+                "%s %s repeated %d query shape(s): %s",
+                request.method, request.path, len(duplicates),
+                '; '.join(f"{count}x {sql[:200]}" for sql, count in duplicates.items())
+            )
+        return response
+
+
+def _shows_models(request):
+    """Whether Server-Timing may name upstream LLM models: only in DEBUG or for staff (may load request.user)"""
+    if settings.DEBUG:
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+class ServerTimingMiddleware:
+    """Time each request's stages, add a Server-Timing header and feed the /metrics histograms.
+
+    Works in both sync and async chains so async views are not adapted to
+    threads. Disabled entirely with METRICS_ENABLED=False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = timing.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = timing.end(token)
+        with_models = timings.used_models() and _shows_models(request)
+        return self._finish(request, response, timings, with_models)
+
+    async def __acall__(self, request):
+        token = timing.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = timing.end(token)
+        with_models = timings.used_models() and await sync_to_async(_shows_models)(request)
+        return self._finish(request, response, timings, with_models)
+
+    def _finish(self, request, response, timings, with_models):
+        match = request.resolver_match
+        metrics.request_duration.observe(
+            time.perf_counter() - timings.started,
+            # The route pattern, not the path, so ids don't explode the series count
+            route=match.route if match else 'unmatched',
+            method=request.method,
+            status=f'{response.status_code // 100}xx',
+        )
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timings.header(with_models)
+        metrics.flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Profile single requests on demand; see interview_core/profiling.py.
+
+    Dropped at startup unless PROFILING_ENABLED, so normal traffic pays nothing.
+    Must come after AuthenticationMiddleware to recognise staff users.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = profiling.requested_token(request)
+        if not token or not profiling.allowed(request, token):
+            return self.get_response(request)
+        profiler = profiling.RequestProfiler()
+        response = self.get_response(request)
+        profile = profiler.finish(request, response)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
+
+    async def __acall__(self, request):
+        token = profiling.requested_token(request)
+        if not token or not await sync_to_async(profiling.allowed)(request, token):
+            return await self.get_response(request)
+        # Samples the event loop thread, so concurrent requests on this worker show up too
+        profiler = profiling.RequestProfiler()
+        response = await self.get_response(request)
+        profile = await sync_to_async(profiler.finish)(request, response)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0007_remove_resume_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('accuracy_sum', models.FloatField(default=0)),
+                ('accuracy_min', models.FloatField(blank=True, null=True)),
+                ('accuracy_max', models.FloatField(blank=True, null=True)),
+                ('clarity_sum', models.FloatField(default=0)),
+                ('clarity_min', models.FloatField(blank=True, null=True)),
+                ('clarity_max', models.FloatField(blank=True, null=True)),
+                ('completeness_sum', models.FloatField(default=0)),
+                ('completeness_min', models.FloatField(blank=True, null=True)),
+                ('completeness_max', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='interview_c_user_id_ec6fad_idx')],
+                'unique_together': {('user', 'topic', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0008_dailyscorerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicScoreBin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('bin', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['topic', 'bin'],
+                'unique_together': {('topic', 'bin')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0009_topicscorebin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interviewquestion',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='interview_c_user_id_a96655_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0011_interviewsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField(help_text='Unix time of the last refill')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
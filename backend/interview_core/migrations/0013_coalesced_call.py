@@ -0,0 +1,28 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0012_rate_limit_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoalescedCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('scope', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['started_at'], name='interview_c_started_3c5c82_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0013_coalesced_call'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('scope', models.CharField(max_length=50)),
+                ('acquired_at', models.DateTimeField()),
+                ('expires_at', models.DateTimeField(help_text='Slot is reclaimable after this, in case the worker died')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='admission_leases', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:47
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def count_existing_scores(apps, schema_editor):
+    # Answers evaluated so far always got every score; backfill_score_rollups recounts exactly
+    DailyScoreRollup = apps.get_model('interview_core', 'DailyScoreRollup')
+    DailyScoreRollup.objects.update(
+        accuracy_count=F('answer_count'),
+        clarity_count=F('answer_count'),
+        completeness_count=F('answer_count'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interview_core', '0016_request_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyscorerollup',
+            name='accuracy_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyscorerollup',
+            name='clarity_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dailyscorerollup',
+            name='completeness_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_scores, migrations.RunPython.noop),
+    ]
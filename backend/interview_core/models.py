@@ -1,3 +1,5 @@
+import os
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
@@ -16,6 +18,8 @@ class InterviewQuestion(models.Model):
         indexes = [
             models.Index(fields=['user', 'topic']),
             models.Index(fields=['user', 'is_answered']),
+            models.Index(fields=['user', 'created_at', 'id']),
+            models.Index(fields=['topic', 'id']),
         ]
     
     def __str__(self):
@@ -76,4 +80,152 @@ class Resume(models.Model):
         ordering = ['-uploaded_at']
     
     def __str__(self):
-        return f"{self.user.username} - Resume ({self.uploaded_at.date()})"
\ No newline at end of file
+        return f"{self.user.username} - Resume ({self.uploaded_at.date()})"
+
+class DailyScoreRollup(models.Model):
+    """Per-user, per-topic daily aggregate of answer scores used for trend charts"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="score_rollups")
+    topic = models.CharField(max_length=100)
+    day = models.DateField()
+    answer_count = models.PositiveIntegerField(default=0)
+
+    accuracy_sum = models.FloatField(default=0)
+    accuracy_min = models.FloatField(null=True, blank=True)
+    accuracy_max = models.FloatField(null=True, blank=True)
+    accuracy_count = models.PositiveIntegerField(default=0)
+    clarity_sum = models.FloatField(default=0)
+    clarity_min = models.FloatField(null=True, blank=True)
+    clarity_max = models.FloatField(null=True, blank=True)
+    clarity_count = models.PositiveIntegerField(default=0)
+    completeness_sum = models.FloatField(default=0)
+    completeness_min = models.FloatField(null=True, blank=True)
+    completeness_max = models.FloatField(null=True, blank=True)
+    completeness_count = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day']
+        unique_together = ('user', 'topic', 'day')
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.topic} - {self.day} ({self.answer_count})"
+
+
+class TopicScoreBin(models.Model):
+    """One fixed-width accuracy bin of the answer score histogram for a normalized topic"""
+    topic = models.CharField(max_length=100)
+    bin = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['topic', 'bin']
+        unique_together = ('topic', 'bin')
+
+    def __str__(self):
+        return f"{self.topic} [{self.bin}]: {self.count}"
+
+
+class InterviewSession(models.Model):
+    """An interview run with its question order frozen at creation time"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="interview_sessions")
+    topic = models.CharField(max_length=100)
+    question_ids = models.JSONField(default=list)
+    current_index = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    @property
+    def total_questions(self):
+        return len(self.question_ids)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.topic} ({self.current_index}/{self.total_questions})"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket state shared by every worker process; updated with compare-and-set on version"""
+    name = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField(help_text="Unix time of the last refill")
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.2f} tokens"
+
+
+class CoalescedCall(models.Model):
+    """Claim and result of a single-flight call, shared by every thread and worker"""
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    key = models.CharField(max_length=64, unique=True)
+    scope = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    result = models.JSONField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key[:12]} ({self.status})"
+
+
+class AdmissionLease(models.Model):
+    """One of a user's concurrent-request slots on expensive endpoints, held for the request's duration"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="admission_leases")
+    slot = models.PositiveSmallIntegerField()
+    scope = models.CharField(max_length=50)
+    acquired_at = models.DateTimeField()
+    expires_at = models.DateTimeField(help_text="Slot is reclaimable after this, in case the worker died")
+
+    class Meta:
+        unique_together = ('user', 'slot')
+
+    def __str__(self):
+        return f"{self.user.username} slot {self.slot} ({self.scope})"
+
+
+class RequestProfile(models.Model):
+    """A sampled profile of one request; the collapsed stacks are stored in PROFILE_DIR"""
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="request_profiles")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    file_name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def file_path(self):
+        return os.path.join(settings.PROFILE_DIR, self.file_name)
+
+    def delete_file(self):
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f}ms)"
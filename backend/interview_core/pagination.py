@@ -1,6 +1,105 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+from datetime import datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+def encode_cursor(value, pk):
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe token"""
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor token back into (timestamp, id); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(value), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def keyset_page(queryset, field, cursor=None, page_size=10):
+    """Return (items, next_cursor) for a queryset walked newest-first on (field, id).
+
+    The position is applied as `field <= value` minus the ties already seen, so
+    the database seeks straight into the (user, field) index instead of scanning
+    and discarding an OFFSET, and no COUNT(*) is issued. Page cost is the same
+    at any depth.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(**{f'{field}__lte': value}).exclude(**{field: value, 'id__gte': pk})
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only cursor pagination over (ordering_field, id), newest first"""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_field = 'created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            items, self.next_cursor = keyset_page(
+                queryset,
+                self.ordering_field,
+                cursor=request.query_params.get(self.cursor_query_param),
+                page_size=self.get_page_size(request)
+            )
+        except ValueError:
+            raise ParseError('Invalid cursor')
+        return items
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SavedQuestionKeysetPagination(KeysetPagination):
+    ordering_field = 'saved_at'
@@ -0,0 +1,147 @@
+"""On-demand sampling profiler for single requests.
+
+A profiled request runs while a background thread samples the request
+thread's stack every PROFILE_INTERVAL seconds. The samples are written as
+collapsed stacks (one "frame;frame;frame count" line per distinct stack),
+the input format of flamegraph.pl and speedscope. Profiles live in
+PROFILE_DIR as a ring buffer of at most PROFILE_MAX_FILES files, indexed by
+RequestProfile rows shown in the admin.
+
+Only staff users (with ?_profile=1) or holders of a token from
+`python manage.py profile_token` can trigger a profile.
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from django.conf import settings
+from django.core import signing
+from .models import RequestProfile
+
+TOKEN_SALT = 'interview_core.profiling'
+TOKEN_HEADER = 'X-Profile-Token'
+QUERY_PARAM = '_profile'
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def requested_token(request):
+    """The profile token or ?_profile=1 flag on this request, if any; cheap enough for every request"""
+    return request.headers.get(TOKEN_HEADER) or request.GET.get(QUERY_PARAM)
+
+
+def allowed(request, token):
+    """Whether a request carrying `token` may be profiled (may load request.user)"""
+    if token == '1':
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_staff)
+    return valid_token(token)
+
+
+def _frame_label(code):
+    # Function plus the last two path components keeps labels short but unambiguous
+    path = '/'.join(code.co_filename.split(os.sep)[-2:])
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+class StackSampler:
+    """Sample one thread's stack on a timer and count the collapsed stacks"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+
+class RequestProfiler:
+    """Profile the calling thread until finish() stores the result"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(threading.get_ident(), settings.PROFILE_INTERVAL).start()
+
+    def finish(self, request, response):
+        stacks = self.sampler.stop()
+        duration_ms = (time.perf_counter() - self.started) * 1000
+        file_name = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.collapsed'
+
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(settings.PROFILE_DIR, file_name), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+        user = getattr(request, 'user', None)
+        profile = RequestProfile.objects.create(
+            user=user if user is not None and user.is_authenticated else None,
+            method=request.method,
+            path=request.path[:500],
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            samples=sum(stacks.values()),
+            file_name=file_name,
+        )
+        trim()
+        return profile
+
+
+def trim():
+    """Keep only the newest PROFILE_MAX_FILES profiles, deleting older files and rows"""
+    stale = list(RequestProfile.objects.order_by('-created_at', '-id')[settings.PROFILE_MAX_FILES:])
+    for profile in stale:
+        profile.delete_file()
+    RequestProfile.objects.filter(pk__in=[profile.pk for profile in stale]).delete()
+
+
+def read_stacks(profile):
+    """(stack, count) pairs from a stored profile, hottest first; empty if the file is gone"""
+    try:
+        with open(profile.file_path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    pairs = []
+    for line in lines:
+        stack, _, count = line.rpartition(' ')
+        pairs.append((stack, int(count)))
+    return pairs
+
+
+def hottest_functions(profile, limit=20):
+    """Functions ranked by samples where they were on top of the stack (self time)"""
+    self_samples = Counter()
+    for stack, count in read_stacks(profile):
+        self_samples[stack.rsplit(';', 1)[-1]] += count
+    return self_samples.most_common(limit)
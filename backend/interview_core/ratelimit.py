@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from .exceptions import AIServiceError
+from .models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+# Compare-and-set retries before treating the bucket as contended and backing off
+CAS_ATTEMPTS = 5
+DEFAULT_RETRY_AFTER = 1.0
+
+_stats_lock = threading.Lock()
+_stats = {
+    'acquired': 0,
+    'queued': 0,
+    'rejected': 0,
+    'throttled': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+}
+
+
+class RateLimitExceeded(AIServiceError):
+    """No token became available within the allowed queue wait"""
+
+    def __init__(self, name, waited):
+        super().__init__(f"Rate limit '{name}' still exhausted after waiting {waited:.1f}s")
+        self.waited = waited
+
+
+def _record(waited=None, rejected=False, throttled=False):
+    with _stats_lock:
+        if rejected:
+            _stats['rejected'] += 1
+        if throttled:
+            _stats['throttled'] += 1
+        if waited is not None:
+            _stats['acquired'] += 1
+            if waited > 0:
+                _stats['queued'] += 1
+                _stats['wait_seconds_total'] += waited
+                _stats['wait_seconds_max'] = max(_stats['wait_seconds_max'], waited)
+
+
+def queue_wait_stats():
+    """Per-process totals: tokens acquired, how many had to queue, queue wait, rejections and upstream 429s"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class TokenBucket:
+    """Token bucket shared across threads and worker processes through a RateLimitBucket row.
+
+    Refills `rate` tokens per second up to `capacity`. Every update is a
+    compare-and-set on the row's version, so it is safe on SQLite and Postgres
+    without holding a lock across the caller's HTTP request.
+    """
+
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    def _bucket(self, now):
+        bucket, _ = RateLimitBucket.objects.get_or_create(
+            name=self.name, defaults={'tokens': self.capacity, 'updated_at': now}
+        )
+        return bucket
+
+    def _available(self, bucket, now):
+        return min(self.capacity, bucket.tokens + max(0.0, now - bucket.updated_at) * self.rate)
+
+    def _compare_and_set(self, bucket, tokens, now):
+        return RateLimitBucket.objects.filter(pk=bucket.pk, version=bucket.version).update(
+            tokens=tokens, updated_at=now, version=F('version') + 1
+        )
+
+    def try_acquire(self):
+        """Take a token if one is available; return 0, or the seconds until one will be"""
+        for _ in range(CAS_ATTEMPTS):
+            now = time.time()
+            bucket = self._bucket(now)
+            available = self._available(bucket, now)
+            if available < 1:
+                return (1 - available) / self.rate
+            if self._compare_and_set(bucket, available - 1, now):
+                return 0
+        # Lost every race: other workers are draining the bucket right now
+        return 1 / self.rate
+
+    def penalize(self, retry_after):
+        """Empty the bucket so that no worker gets a token for `retry_after` seconds"""
+        for _ in range(CAS_ATTEMPTS):
+            now = time.time()
+            bucket = self._bucket(now)
+            tokens = min(self._available(bucket, now), 1 - retry_after * self.rate)
+            if self._compare_and_set(bucket, tokens, now):
+                return
+
+    def _sleep_for(self, wait):
+        # Jitter spreads out waiters that computed the same refill time
+        return wait * random.uniform(1.0, 1.2)
+
+    def acquire(self, max_wait):
+        """Block until a token is taken; return the seconds spent queued.
+
+        Raises RateLimitExceeded as soon as the next token cannot arrive within `max_wait`.
+        """
+        start = time.monotonic()
+        while True:
+            wait = self.try_acquire()
+            waited = time.monotonic() - start
+            if wait == 0:
+                _record(waited=waited)
+                return waited
+            if waited + wait > max_wait:
+                _record(rejected=True)
+                raise RateLimitExceeded(self.name, waited)
+            time.sleep(self._sleep_for(wait))
+
+    async def aacquire(self, max_wait):
+        """Async acquire; waits on the event loop and only the row update runs in a thread"""
+        start = time.monotonic()
+        while True:
+            wait = await sync_to_async(self.try_acquire)()
+            waited = time.monotonic() - start
+            if wait == 0:
+                _record(waited=waited)
+                return waited
+            if waited + wait > max_wait:
+                _record(rejected=True)
+                raise RateLimitExceeded(self.name, waited)
+            await asyncio.sleep(self._sleep_for(wait))
+
+
+def openrouter_bucket():
+    return TokenBucket('openrouter', settings.OPENROUTER_RATE_LIMIT, settings.OPENROUTER_BURST)
+
+
+def retry_after_seconds(response):
+    """Seconds from a 429's Retry-After header (delta-seconds or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+def _log_wait(waited):
+    if waited > 0:
+        logger.info("Queued %.0fms for an OpenRouter rate limit token", waited * 1000)
+
+
+def send_rate_limited(send, bucket=None, max_wait=None):
+    """Call send() once a token is available, retrying upstream 429s within the same wait budget.
+
+    `send` performs the HTTP request and returns a requests/httpx response.
+    Returns (response, seconds spent queued).
+    """
+    bucket = bucket or openrouter_bucket()
+    max_wait = settings.OPENROUTER_MAX_QUEUE_WAIT if max_wait is None else max_wait
+    start = time.monotonic()
+    queued = 0.0
+    while True:
+        queued += bucket.acquire(max_wait - (time.monotonic() - start))
+        response = send()
+        if response.status_code != 429:
+            _log_wait(queued)
+            return response, queued
+        _record(throttled=True)
+        bucket.penalize(retry_after_seconds(response))
+
+
+async def asend_rate_limited(send, bucket=None, max_wait=None):
+    """Async send_rate_limited; `send` is a coroutine function"""
+    bucket = bucket or openrouter_bucket()
+    max_wait = settings.OPENROUTER_MAX_QUEUE_WAIT if max_wait is None else max_wait
+    start = time.monotonic()
+    queued = 0.0
+    while True:
+        queued += await bucket.aacquire(max_wait - (time.monotonic() - start))
+        response = await send()
+        if response.status_code != 429:
+            _log_wait(queued)
+            return response, queued
+        _record(throttled=True)
+        await sync_to_async(bucket.penalize)(retry_after_seconds(response))
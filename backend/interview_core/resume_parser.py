@@ -1,15 +1,15 @@
 import PyPDF2
 import docx
 import json
-import requests
 import os
+from asgiref.sync import sync_to_async
+from .llm import LLMClient
+from .timing import stage
 # from django.core.files.storage import default_storage  # Not needed anymore
 
 class ResumeParser:
     def __init__(self):
-        self.api_key = os.getenv('OPENROUTER_API_KEY')
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "mistralai/mistral-7b-instruct"
+        self.llm = LLMClient('parse_resume')
     
     def extract_text_from_pdf(self, file_path):
         """Extract text from PDF file"""
@@ -39,7 +39,7 @@ class ResumeParser:
         import tempfile
         
         # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{resume_file.name.split(".")[-1]}') as temp_file:
+        with stage('upload_read'), tempfile.NamedTemporaryFile(delete=False, suffix=f'.{resume_file.name.split(".")[-1]}') as temp_file:
             # Write file content to temp file
             for chunk in resume_file.chunks():
                 temp_file.write(chunk)
@@ -48,12 +48,13 @@ class ResumeParser:
         try:
             file_extension = resume_file.name.lower().split('.')[-1]
             
-            if file_extension == 'pdf':
-                text = self.extract_text_from_pdf(temp_path)
-            elif file_extension == 'docx':
-                text = self.extract_text_from_docx(temp_path)
-            else:
-                raise Exception("Unsupported file format")
+            with stage('decode'):
+                if file_extension == 'pdf':
+                    text = self.extract_text_from_pdf(temp_path)
+                elif file_extension == 'docx':
+                    text = self.extract_text_from_docx(temp_path)
+                else:
+                    raise Exception("Unsupported file format")
             
             # Clean up temporary file
             os.unlink(temp_path)
@@ -65,9 +66,9 @@ class ResumeParser:
                 os.unlink(temp_path)
             raise e
     
-    def parse_resume_with_ai(self, resume_text):
-        """Use AI to parse resume and extract structured data"""
-        prompt = f"""
+    def _parse_prompt(self, resume_text):
+        """Build the structured-extraction prompt for a resume"""
+        return f"""
 Analyze this resume and extract structured information. Return ONLY valid JSON in this exact format:
 
 {{
@@ -86,56 +87,50 @@ Resume text:
 
 Return only the JSON object, no other text.
 """
-        
+    
+    def _fallback_data(self):
+        return {
+            "skills": ["General Programming", "Problem Solving"],
+            "experience": ["Software Development"],
+            "projects": ["Various Projects"]
+        }
+    
+    @stage('json_parse')
+    def _parsed_result(self, ai_response):
+        """Turn the model's reply into skills/experience/projects, falling back on bad output"""
+        # Try to parse JSON from response
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "HTTP-Referer": "http://localhost",
-                "Content-Type": "application/json"
-            }
+            # Clean the response and extract JSON
+            cleaned_response = ai_response.strip()
+            if cleaned_response.startswith('```json'):
+                cleaned_response = cleaned_response.replace('```json', '').replace('```', '')
             
-            payload = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}]
-            }
+            parsed_data = json.loads(cleaned_response)
             
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+            # Validate structure
+            if not all(key in parsed_data for key in ['skills', 'experience', 'projects']):
+                raise ValueError("Missing required keys")
             
-            if response.status_code != 200:
-                raise Exception(f"AI API request failed: {response.status_code}")
+            return parsed_data
             
-            ai_response = response.json()['choices'][0]['message']['content']
-            
-            # Try to parse JSON from response
-            try:
-                # Clean the response and extract JSON
-                cleaned_response = ai_response.strip()
-                if cleaned_response.startswith('```json'):
-                    cleaned_response = cleaned_response.replace('```json', '').replace('```', '')
-                
-                parsed_data = json.loads(cleaned_response)
-                
-                # Validate structure
-                if not all(key in parsed_data for key in ['skills', 'experience', 'projects']):
-                    raise ValueError("Missing required keys")
-                
-                return parsed_data
-                
-            except (json.JSONDecodeError, ValueError):
-                # Fallback: return basic structure
-                return {
-                    "skills": ["General Programming", "Problem Solving"],
-                    "experience": ["Software Development"],
-                    "projects": ["Various Projects"]
-                }
-                
+        except (json.JSONDecodeError, ValueError):
+            # Fallback: return basic structure
+            return self._fallback_data()
+    
+    def parse_resume_with_ai(self, resume_text):
+        """Use AI to parse resume and extract structured data"""
+        try:
+            return self._parsed_result(self.llm.complete(self._parse_prompt(resume_text)))
         except Exception as e:
             # Fallback parsing
-            return {
-                "skills": ["General Programming", "Problem Solving"],
-                "experience": ["Software Development"],
-                "projects": ["Various Projects"]
-            }
+            return self._fallback_data()
+    
+    async def aparse_resume_with_ai(self, resume_text):
+        """Async variant of parse_resume_with_ai using the shared httpx client"""
+        try:
+            return self._parsed_result(await self.llm.acomplete(self._parse_prompt(resume_text)))
+        except Exception as e:
+            return self._fallback_data()
     
     def process_resume(self, resume_file):
         """Complete resume processing pipeline"""
@@ -150,4 +145,17 @@ Return only the JSON object, no other text.
             'skills': parsed_data.get('skills', []),
             'experience': parsed_data.get('experience', []),
             'projects': parsed_data.get('projects', [])
-        }
\ No newline at end of file
+        }
+    
+    async def aprocess_resume(self, resume_file):
+        """Async resume pipeline: text extraction runs in a worker thread, the AI call on the event loop"""
+        extracted_text = await sync_to_async(self.extract_text_from_resume, thread_sensitive=False)(resume_file)
+        
+        parsed_data = await self.aparse_resume_with_ai(extracted_text)
+        
+        return {
+            'extracted_text': extracted_text,
+            'skills': parsed_data.get('skills', []),
+            'experience': parsed_data.get('experience', []),
+            'projects': parsed_data.get('projects', [])
+        }
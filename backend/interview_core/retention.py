@@ -0,0 +1,130 @@
+"""Data retention: batched, throttled deletion of old rows per policy.
+
+Each policy selects the rows of one model that are past their retention age
+(settings.RETENTION_DAYS). Rows are deleted in primary key order, at most
+batch_size per short transaction: the next batch starts after the last key of
+the previous one, so a purge never scans from the start again and never holds
+locks for long. A pause between batches keeps a large backlog from saturating
+the database.
+
+Score rollups and topic histograms are aggregates and are left alone, so trend
+charts and percentiles keep covering purged answers.
+"""
+import logging
+import time
+from datetime import timedelta
+from functools import partial
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .models import UserAnswer, InterviewQuestion, SavedQuestion, Resume, RequestProfile
+from .singleflight import finished_before
+
+logger = logging.getLogger(__name__)
+
+
+def _answers(cutoff):
+    return UserAnswer.objects.filter(created_at__lt=cutoff)
+
+
+def _unsaved_questions(cutoff):
+    # Only questions nobody answered or saved; anything with history is kept. Answers are
+    # checked directly rather than through is_answered, which purged answers used to leave set
+    return InterviewQuestion.objects.filter(created_at__lt=cutoff).exclude(
+        Exists(SavedQuestion.objects.filter(question=OuterRef('pk')))
+    ).exclude(
+        Exists(UserAnswer.objects.filter(question=OuterRef('pk')))
+    )
+
+
+def _resumes(cutoff):
+    # A user's latest resume is kept however old it is
+    return Resume.objects.filter(uploaded_at__lt=cutoff).filter(
+        Exists(Resume.objects.filter(user=OuterRef('user'), uploaded_at__gt=OuterRef('uploaded_at')))
+    )
+
+
+def _coalesced_calls(cutoff):
+    # Stored results back idempotent replays, so never go below IDEMPOTENCY_KEY_TTL
+    return finished_before(min(cutoff, timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)))
+
+
+def _request_profiles(cutoff):
+    return RequestProfile.objects.filter(created_at__lt=cutoff)
+
+
+def _reset_answered(rows):
+    # A question whose last answer is gone counts as unanswered again
+    question_ids = {answer.question_id for answer in rows}
+    InterviewQuestion.objects.filter(pk__in=question_ids, is_answered=True).exclude(
+        Exists(UserAnswer.objects.filter(question=OuterRef('pk')))
+    ).update(is_answered=False)
+
+
+def _delete_profile_files(rows):
+    for profile in rows:
+        profile.delete_file()
+
+
+# Policy name -> (rows past a cutoff datetime, fix-up run on a batch's deleted rows in its
+# transaction, cleanup run on them once it commits)
+POLICIES = {
+    'answers': (_answers, _reset_answered, None),
+    'unsaved_questions': (_unsaved_questions, None, None),
+    'resumes': (_resumes, None, None),
+    'coalesced_calls': (_coalesced_calls, None, None),
+    'request_profiles': (_request_profiles, None, _delete_profile_files),
+}
+
+
+def cutoff_for(policy, days=None):
+    """The datetime before which `policy` deletes rows, or None when it keeps them forever"""
+    days = settings.RETENTION_DAYS.get(policy, 0) if days is None else days
+    if not days:
+        return None
+    return timezone.now() - timedelta(days=days)
+
+
+def expired(policy, cutoff):
+    return POLICIES[policy][0](cutoff)
+
+
+def purge(policy, cutoff, batch_size=None, sleep=None, dry_run=False):
+    """Delete `policy`'s rows older than `cutoff` in primary key batches; returns the rows deleted
+
+    With dry_run, returns how many rows would be deleted without touching them.
+    """
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    sleep = settings.RETENTION_BATCH_SLEEP if sleep is None else sleep
+    if dry_run:
+        return expired(policy, cutoff).count()
+
+    _, after_delete, cleanup = POLICIES[policy]
+    deleted = 0
+    last_pk = None
+    while True:
+        with transaction.atomic():
+            batch = expired(policy, cutoff).order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            # The policy filter is applied again, so a row that stopped matching is kept
+            rows = expired(policy, cutoff).filter(pk__in=pks)
+            batch_rows = list(rows) if after_delete or cleanup else None
+            if cleanup is not None:
+                transaction.on_commit(partial(cleanup, batch_rows))
+            _, per_model = rows.delete()
+            count = per_model.get(rows.model._meta.label, 0)
+            if after_delete is not None:
+                after_delete(batch_rows)
+        deleted += count
+        last_pk = pks[-1]
+        logger.info("Retention %s: deleted %d rows up to pk %s (%d so far)", policy, count, last_pk, deleted)
+        if len(pks) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+    return deleted
@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Sum, Min, Max
+from django.db.models.functions import TruncDate, TruncDay, TruncWeek, TruncMonth
+from django.utils import timezone
+from .models import UserAnswer, DailyScoreRollup
+
+# Rollup column prefix -> UserAnswer score field
+SCORE_FIELDS = {
+    'accuracy': 'accuracy',
+    'clarity': 'clarity_score',
+    'completeness': 'completeness_score',
+}
+
+BUCKET_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _score_aggregates():
+    """Aggregate expressions over UserAnswer rows matching the rollup columns"""
+    aggregates = {'answer_count': Count('id')}
+    for prefix, field in SCORE_FIELDS.items():
+        # Per-score counts: a brief evaluation stores no sub-scores, and those answers don't count towards averages
+        aggregates[f'{prefix}_count'] = Count(field)
+        aggregates[f'{prefix}_sum'] = Sum(field)
+        aggregates[f'{prefix}_min'] = Min(field)
+        aggregates[f'{prefix}_max'] = Max(field)
+    return aggregates
+
+
+def _day_bounds(day):
+    """Return the aware [start, end) datetimes covering a local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+class ScoreRollupService:
+    """Service for maintaining and querying daily score rollups"""
+
+    def refresh_bucket(self, user, topic, day):
+        """Recompute a single (user, topic, day) rollup from its answers.
+
+        Recomputing the bucket instead of applying deltas keeps min/max correct
+        when an existing answer is re-scored; the scan is bounded to one day of
+        one user's answers through the (user, created_at) index.
+        """
+        start, end = _day_bounds(day)
+        totals = UserAnswer.objects.filter(
+            user=user,
+            question__topic=topic,
+            created_at__gte=start,
+            created_at__lt=end,
+        ).aggregate(**_score_aggregates())
+
+        if not totals['answer_count']:
+            DailyScoreRollup.objects.filter(user=user, topic=topic, day=day).delete()
+            return None
+
+        for prefix in SCORE_FIELDS:
+            totals[f'{prefix}_sum'] = totals[f'{prefix}_sum'] or 0
+
+        rollup, _ = DailyScoreRollup.objects.update_or_create(
+            user=user, topic=topic, day=day, defaults=totals
+        )
+        return rollup
+
+    def refresh_for_answer(self, answer):
+        """Refresh the rollup bucket an answer belongs to"""
+        day = timezone.localdate(answer.created_at)
+        return self.refresh_bucket(answer.user, answer.question.topic, day)
+
+    def rebuild(self, user=None, since=None, batch_size=1000):
+        """Rebuild rollups from UserAnswer history, optionally scoped to a user and start day.
+
+        Returns the number of rollup rows written.
+        """
+        answers = UserAnswer.objects.all()
+        rollups = DailyScoreRollup.objects.all()
+        if user is not None:
+            answers = answers.filter(user=user)
+            rollups = rollups.filter(user=user)
+        if since is not None:
+            answers = answers.filter(created_at__gte=_day_bounds(since)[0])
+            rollups = rollups.filter(day__gte=since)
+
+        grouped = (
+            answers.annotate(day=TruncDate('created_at'))
+            .values('user_id', 'question__topic', 'day')
+            .annotate(**_score_aggregates())
+            .order_by()
+        )
+
+        written = 0
+        with transaction.atomic():
+            rollups.delete()
+            batch = []
+            for row in grouped.iterator(chunk_size=batch_size):
+                for prefix in SCORE_FIELDS:
+                    row[f'{prefix}_sum'] = row[f'{prefix}_sum'] or 0
+                batch.append(DailyScoreRollup(
+                    user_id=row.pop('user_id'),
+                    topic=row.pop('question__topic'),
+                    **row
+                ))
+                if len(batch) >= batch_size:
+                    DailyScoreRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                DailyScoreRollup.objects.bulk_create(batch)
+                written += len(batch)
+        return written
+
+    def trend(self, user, start, end, bucket='day', topic=None):
+        """Return score series between two days (inclusive) grouped by day, week or month.
+
+        Reads only rollup rows, so cost scales with the number of buckets in the
+        range rather than the number of answers.
+        """
+        trunc = BUCKET_FUNCTIONS[bucket]
+        rollups = DailyScoreRollup.objects.filter(user=user, day__gte=start, day__lte=end)
+        if topic:
+            rollups = rollups.filter(topic=topic)
+
+        aggregates = {'count': Sum('answer_count')}
+        for prefix in SCORE_FIELDS:
+            aggregates[f'{prefix}_count'] = Sum(f'{prefix}_count')
+            aggregates[f'{prefix}_sum'] = Sum(f'{prefix}_sum')
+            aggregates[f'{prefix}_min'] = Min(f'{prefix}_min')
+            aggregates[f'{prefix}_max'] = Max(f'{prefix}_max')
+
+        rows = (
+            rollups.annotate(bucket=trunc('day'))
+            .values('bucket')
+            .annotate(**aggregates)
+            .order_by('bucket')
+        )
+
+        series = []
+        for row in rows:
+            count = row['count'] or 0
+            point = {'bucket': row['bucket'], 'count': count}
+            for prefix in SCORE_FIELDS:
+                total = row[f'{prefix}_sum'] or 0
+                scored = row[f'{prefix}_count'] or 0
+                point[prefix] = {
+                    'avg': round(total / scored, 1) if scored else None,
+                    'min': row[f'{prefix}_min'],
+                    'max': row[f'{prefix}_max'],
+                }
+            series.append(point)
+        return series
@@ -1,6 +1,7 @@
-from rest_framework import serializers, generics, permissions
+from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import InterviewQuestion, UserAnswer, SavedQuestion
+from .models import InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession
+from .services import InterviewSessionService
 
 # -------------------- Registration Serializer --------------------
 class RegisterSerializer(serializers.ModelSerializer):
@@ -53,23 +54,31 @@ class SavedQuestionSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'saved_at', 'answer']
 
     def get_answer(self, obj):
-        user = obj.user
-        question = obj.question
-        answer = UserAnswer.objects.filter(user=user, question=question).order_by('-created_at').first()
+        # Use the answers prefetched by the list view; fall back to a lookup for single objects
+        answers = getattr(obj.question, 'user_answer_list', None)
+        if answers is None:
+            answers = list(UserAnswer.objects.filter(user_id=obj.user_id, question_id=obj.question_id).order_by('-created_at')[:1])
+        answer = answers[0] if answers else None
         if answer:
             return {
                 "id": answer.id,
-                "audio_file": answer.audio_file.url if answer.audio_file else None,
+                "accuracy": answer.accuracy,
                 "feedback": answer.feedback,
                 "submitted_at": answer.created_at,
             }
         return None
 
-class ListSavedQuestionsView(generics.ListAPIView):
-    serializer_class = SavedQuestionSerializer
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get_queryset(self):
-        return SavedQuestion.objects.filter(user=self.request.user)
+# -------------------- Interview Session Serializer --------------------
+class InterviewSessionSerializer(serializers.ModelSerializer):
+    total_questions = serializers.ReadOnlyField()
+    questions = serializers.SerializerMethodField()
 
+    class Meta:
+        model = InterviewSession
+        fields = ['id', 'topic', 'question_ids', 'current_index', 'total_questions',
+                  'created_at', 'completed_at', 'questions']
+        read_only_fields = ['question_ids', 'created_at', 'completed_at']
 
+    def get_questions(self, obj):
+        questions = InterviewSessionService().get_questions(obj)
+        return InterviewQuestionSerializer(questions, many=True).data
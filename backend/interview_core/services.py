@@ -1,17 +1,103 @@
 import os
 import json
+import logging
 import re
-import requests
+import random
+import threading
+import time
+import importlib.util
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.files.storage import default_storage
-from .models import InterviewQuestion, UserAnswer
+from django.utils import timezone
+from .models import InterviewQuestion, UserAnswer, InterviewSession
+from .rollups import ScoreRollupService
+from .histograms import ScoreHistogramService
+from . import degradation, llm_fixtures
+from .llm import LLMClient
+from .singleflight import run_once, arun_once
+from .timing import stage
 
-try:
-    from transformers import pipeline
-    import librosa
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+logger = logging.getLogger(__name__)
+
+# transformers/torch and librosa are only imported on the first transcription, so
+# worker boot and management commands don't pay their import time and memory.
+TRANSFORMERS_AVAILABLE = all(
+    importlib.util.find_spec(module) is not None for module in ('transformers', 'librosa')
+)
+
+# Longest typed answer accepted; longer ones are rejected rather than sent to the LLM
+MAX_ANSWER_TEXT_LENGTH = 5000
+
+# Question bank rows fetched per requested question, to sample from under load
+BANK_CANDIDATES_PER_QUESTION = 5
+
+_transcriber = None
+_transcriber_failed = False
+_transcriber_lock = threading.Lock()
+
+
+class StubTranscriber:
+    """Stand-in for Whisper when TRANSCRIBER_BACKEND=stub, for load tests.
+
+    Holds the CPU for STUB_TRANSCRIBE_SECONDS, like inference would, instead of
+    sleeping, then returns a fixed transcript.
+    """
+    text = "A stubbed transcript of the candidate's recorded answer."
+    
+    def __call__(self, audio_bytes):
+        deadline = time.perf_counter() + settings.STUB_TRANSCRIBE_SECONDS
+        while time.perf_counter() < deadline:
+            pass
+        return {'text': self.text}
+
+
+def get_transcriber():
+    """Return the process-wide Whisper pipeline, loading it on first use"""
+    global _transcriber, _transcriber_failed
+    if settings.TRANSCRIBER_BACKEND == 'stub':
+        return StubTranscriber()
+    if _transcriber is not None or _transcriber_failed or not TRANSFORMERS_AVAILABLE:
+        return _transcriber
+    
+    with _transcriber_lock:
+        if _transcriber is None and not _transcriber_failed:
+            try:
+                from transformers import pipeline
+                _transcriber = pipeline(
+                    "automatic-speech-recognition",
+                    model="openai/whisper-tiny",
+                    device=-1  # Use CPU
+                )
+            except Exception as e:
+                _transcriber_failed = True
+                logger.warning("Failed to load Whisper model: %s", e)
+    return _transcriber
+
+
+def preload_transcriber():
+    """Load and freeze the Whisper pipeline so forked workers can share it copy-on-write.
+
+    Meant to run in the gunicorn master before workers fork. Weights are put in
+    inference mode with gradients disabled so nothing writes to them, and the
+    objects allocated so far are moved out of the garbage collector's reach so
+    collections in the workers don't dirty the shared pages.
+    """
+    if settings.TRANSCRIBER_BACKEND != 'whisper':
+        return False
+    transcriber = get_transcriber()
+    if transcriber is None:
+        return False
+    
+    model = transcriber.model
+    model.eval()
+    for parameter in model.parameters():
+        parameter.requires_grad_(False)
+    
+    import gc
+    gc.collect()
+    gc.freeze()
+    return True
 
 
 class AIService:
@@ -19,14 +105,21 @@ class AIService:
     
     def __init__(self):
         self.api_key = os.getenv('OPENROUTER_API_KEY')
-        if not self.api_key:
+        if not self.api_key and not llm_fixtures.replaying():
             raise ValueError("OPENROUTER_API_KEY environment variable is required")
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.model = "openai/gpt-3.5-turbo"
+        # Each operation walks its own model fallback chain from settings.LLM_MODELS
+        self.clients = {
+            operation: LLMClient(operation, self.api_key)
+            for operation in ('generate', 'evaluate', 'evaluate_degraded')
+        }
     
-    def generate_questions(self, topic, count=4, difficulty="medium"):
-        """Generate interview questions for a given topic with specified difficulty"""
-        
+    @property
+    def queue_wait(self):
+        """Seconds this instance spent queued for rate limit tokens"""
+        return sum(client.queue_wait for client in self.clients.values())
+    
+    def _generation_prompt(self, topic, count, difficulty):
+        """Build the question generation prompt"""
         difficulty_descriptions = {
             "easy": "basic concepts, simple definitions, and fundamental knowledge",
             "medium": "practical applications, problem-solving, and intermediate concepts", 
@@ -66,19 +159,50 @@ Validation rules:
 - The response MUST parse as valid JSON — no extra text, markdown, or commentary.
 - REMEMBER: Only {count} questions, not more!
 """
+        return prompt
+    
+    def generate_questions(self, topic, count=4, difficulty="medium"):
+        """Generate interview questions for a given topic with specified difficulty"""
+        prompt = self._generation_prompt(topic, count, difficulty)
         
-        print(f"DEBUG AIService: Requesting {count} questions for '{topic}'")
+        logger.debug("Requesting %d questions for '%s'", count, topic)
         
         try:
-            response = self._make_api_request(prompt)
+            response = self._make_api_request(prompt, 'generate')
             questions = self._parse_json_response(response)
-            print(f"DEBUG AIService: AI returned {len(questions)} questions, slicing to {count}")
+            logger.debug("AI returned %d questions, slicing to %d", len(questions), count)
             return questions[:count]  # Force exact count
         except Exception as e:
             raise Exception(f"Failed to generate questions: {str(e)}")
     
-    def compare_answers(self, reference_answer, user_answer, question_text=""):
-        """Compare user answer with reference answer and provide detailed feedback"""
+    async def agenerate_questions(self, topic, count=4, difficulty="medium"):
+        """Async variant of generate_questions that doesn't hold a thread while waiting on the LLM"""
+        prompt = self._generation_prompt(topic, count, difficulty)
+        
+        try:
+            response = await self._amake_api_request(prompt, 'generate')
+            return self._parse_json_response(response)[:count]  # Force exact count
+        except Exception as e:
+            raise Exception(f"Failed to generate questions: {str(e)}")
+    
+    def _comparison_prompt(self, reference_answer, user_answer, question_text, brief=False):
+        """Build the answer evaluation prompt"""
+        if brief:
+            # Under heavy load: one score and a one-line verdict, no sub-scores or written breakdown
+            return f"""
+You are an expert technical interviewer. Score this interview answer.
+
+Question: {question_text}
+Expected Answer: {reference_answer}
+Candidate's Answer: {user_answer}
+
+Return ONLY valid JSON in this format:
+{{
+  "accuracy": [score 0-100],
+  "feedback": "[one sentence overall assessment]"
+}}
+"""
+        
         prompt = f"""
 You are an expert technical interviewer. Analyze this interview answer and provide specific, detailed feedback.
 
@@ -106,56 +230,79 @@ IMPORTANT:
 - Focus on the technical accuracy and completeness relative to the expected answer
 - Provide actionable, specific feedback
 """
+        return prompt
+    
+    def _evaluation_plan(self, level):
+        """LLM operation and brief flag for answer evaluation at a degradation level"""
+        operation = 'evaluate_degraded' if level >= degradation.CHEAP_MODEL else 'evaluate'
+        return operation, level >= degradation.BRIEF_EVALUATION
+    
+    def compare_answers(self, reference_answer, user_answer, question_text=""):
+        """Compare user answer with reference answer and provide detailed feedback"""
+        operation, brief = self._evaluation_plan(degradation.controller.level())
+        prompt = self._comparison_prompt(reference_answer, user_answer, question_text, brief)
         
         try:
-            response = self._make_api_request(prompt)
-            result = json.loads(response)
-            
-            # Ensure all required fields exist with defaults
-            return {
-                "accuracy": result.get("accuracy", 0),
-                "feedback": result.get("feedback", "No feedback available"),
-                "strengths": result.get("strengths", "None identified"),
-                "improvements": result.get("improvements", "None suggested"),
-                "missing_points": result.get("missing_points", "None identified"),
-                "clarity_score": result.get("clarity_score", 0),
-                "completeness_score": result.get("completeness_score", 0),
-                "technical_accuracy_score": result.get("technical_accuracy_score", 0)
-            }
+            response = self._make_api_request(prompt, operation)
+            return self._comparison_result(response, brief)
         except Exception as e:
-            return {
-                "accuracy": 0,
-                "feedback": f"Analysis failed: {str(e)}",
-                "strengths": "Analysis unavailable",
-                "improvements": "Analysis unavailable",
-                "missing_points": "Analysis unavailable",
-                "clarity_score": 0,
-                "completeness_score": 0,
-                "technical_accuracy_score": 0
-            }
+            return self._comparison_failure(e)
     
-    def _make_api_request(self, prompt):
-        """Make API request to OpenRouter"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "http://localhost",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.1,
-            "max_tokens": 2000
-        }
+    async def acompare_answers(self, reference_answer, user_answer, question_text=""):
+        """Async variant of compare_answers"""
+        operation, brief = self._evaluation_plan(await degradation.controller.alevel())
+        prompt = self._comparison_prompt(reference_answer, user_answer, question_text, brief)
         
-        response = requests.post(self.base_url, headers=headers, json=payload, timeout=30)
+        try:
+            response = await self._amake_api_request(prompt, operation)
+            return self._comparison_result(response, brief)
+        except Exception as e:
+            return self._comparison_failure(e)
+    
+    @stage('json_parse')
+    def _comparison_result(self, response, brief=False):
+        """Parse an evaluation response, filling in any missing fields.
         
-        if response.status_code != 200:
-            raise Exception(f"API request failed: {response.status_code} - {response.text}")
+        A brief evaluation has no sub-scores: they are None, so score averages skip them.
+        """
+        result = json.loads(response)
+        skipped = "Not available: brief evaluation under heavy load" if brief else None
+        unscored = None if brief else 0
         
-        return response.json()['choices'][0]['message']['content']
+        # Ensure all required fields exist with defaults
+        return {
+            "accuracy": result.get("accuracy", 0),
+            "feedback": result.get("feedback", "No feedback available"),
+            "strengths": result.get("strengths", skipped or "None identified"),
+            "improvements": result.get("improvements", skipped or "None suggested"),
+            "missing_points": result.get("missing_points", skipped or "None identified"),
+            "clarity_score": result.get("clarity_score", unscored),
+            "completeness_score": result.get("completeness_score", unscored),
+            "technical_accuracy_score": result.get("technical_accuracy_score", unscored)
+        }
+    
+    def _comparison_failure(self, error):
+        """Zero-score evaluation returned when the LLM call or parsing fails"""
+        return {
+            "accuracy": 0,
+            "feedback": f"Analysis failed: {str(error)}",
+            "strengths": "Analysis unavailable",
+            "improvements": "Analysis unavailable",
+            "missing_points": "Analysis unavailable",
+            "clarity_score": 0,
+            "completeness_score": 0,
+            "technical_accuracy_score": 0
+        }
+    
+    def _make_api_request(self, prompt, operation):
+        """Make API request to OpenRouter through the operation's model chain"""
+        return self.clients[operation].complete(prompt, temperature=0.1, max_tokens=2000)
     
+    async def _amake_api_request(self, prompt, operation):
+        """Make API request to OpenRouter without blocking the event loop"""
+        return await self.clients[operation].acomplete(prompt, temperature=0.1, max_tokens=2000)
+    
+    @stage('json_parse')
     def _parse_json_response(self, raw_content):
         """Parse JSON from API response with better error handling"""
         # Clean the response
@@ -202,38 +349,38 @@ IMPORTANT:
 class AudioService:
     """Service for handling audio processing"""
     
-    def __init__(self):
-        self.transcriber = None
-        if TRANSFORMERS_AVAILABLE:
-            try:
-                self.transcriber = pipeline(
-                    "automatic-speech-recognition",
-                    model="openai/whisper-tiny",
-                    device=-1  # Use CPU
-                )
-            except Exception as e:
-                print(f"Failed to load Whisper model: {e}")
+    @property
+    def transcriber(self):
+        return get_transcriber()
     
     def transcribe_audio(self, audio_file):
         """Transcribe audio file to text using Hugging Face Whisper"""
         if not self.transcriber:
             return "Audio transcription unavailable. Please type your answer."
         
+        if settings.TRANSCRIBER_BACKEND == 'stub':
+            with stage('upload_read'):
+                audio_bytes = b''.join(audio_file.chunks())
+            with stage('transcribe'):
+                return self.transcriber(audio_bytes)['text']
+        
         try:
             import tempfile
-            import numpy as np
+            import librosa
             
             # Save audio to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
+            with stage('upload_read'), tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
                 for chunk in audio_file.chunks():
                     temp_file.write(chunk)
                 temp_path = temp_file.name
             
             # Load audio with librosa
-            audio_data, sample_rate = librosa.load(temp_path, sr=16000)
+            with stage('decode'):
+                audio_data, sample_rate = librosa.load(temp_path, sr=16000)
             
             # Transcribe using Hugging Face pipeline
-            result = self.transcriber(audio_data)
+            with stage('transcribe'):
+                result = self.transcriber(audio_data)
             
             # Clean up temp file
             os.unlink(temp_path)
@@ -241,6 +388,7 @@ class AudioService:
             return result['text']
             
         except Exception as e:
+            logger.warning("Transcription failed: %s", e)
             return f"Transcription failed: Please type your answer."
 
 
@@ -252,15 +400,46 @@ class InterviewService:
         try:
             self.audio_service = AudioService()
         except Exception as e:
-            print(f"AudioService initialization failed: {e}")
+            logger.warning("AudioService initialization failed: %s", e)
             self.audio_service = None
     
     def create_questions(self, user, topic, count=4, difficulty="medium"):
         """Create interview questions for a user with specified count and difficulty"""
-        questions_data = self.ai_service.generate_questions(topic, count, difficulty)
-        
-        print(f"DEBUG InterviewService: Creating {len(questions_data)} questions in database")
+        questions_data = []
+        if degradation.controller.level() >= degradation.QUESTION_BANK:
+            questions_data = self._bank_questions(user, topic, count)
+        if len(questions_data) < count:
+            questions_data += self.ai_service.generate_questions(topic, count - len(questions_data), difficulty)
+        return self._store_questions(user, topic, questions_data)
+    
+    async def acreate_questions(self, user, topic, count=4, difficulty="medium"):
+        """Async variant of create_questions; only the database work runs in a thread"""
+        questions_data = []
+        if await degradation.controller.alevel() >= degradation.QUESTION_BANK:
+            questions_data = await sync_to_async(self._bank_questions)(user, topic, count)
+        if len(questions_data) < count:
+            questions_data += await self.ai_service.agenerate_questions(topic, count - len(questions_data), difficulty)
+        return await sync_to_async(self._store_questions)(user, topic, questions_data)
+    
+    def _bank_questions(self, user, topic, count):
+        """Up to count earlier generated questions on this topic that the user hasn't been given yet.
         
+        Used instead of the LLM under heavy load; the scan is bounded to the
+        newest candidates through the (topic, id) index.
+        """
+        seen = InterviewQuestion.objects.filter(user=user, topic=topic).values('question')
+        candidates = (
+            InterviewQuestion.objects.filter(topic=topic)
+            .exclude(question__in=seen)
+            .order_by('-id')
+            .values('question', 'answer')[:count * BANK_CANDIDATES_PER_QUESTION]
+        )
+        unique = list({candidate['question']: candidate for candidate in candidates}.values())
+        return random.sample(unique, min(count, len(unique)))
+    
+    @stage('db_write')
+    def _store_questions(self, user, topic, questions_data):
+        """Persist generated question/answer pairs for a user"""
         created_questions = []
         for item in questions_data:
             question = InterviewQuestion.objects.create(
@@ -271,22 +450,70 @@ class InterviewService:
             )
             created_questions.append(question)
         
-        print(f"DEBUG InterviewService: Created {len(created_questions)} questions")
+        logger.debug("Created %d questions for topic '%s'", len(created_questions), topic)
         return created_questions
     
-    def process_answer(self, user, question_id, audio_file):
-        """Process user's audio answer"""
+    @staticmethod
+    def clean_answer_text(value):
+        """Normalize a typed answer from request data: None when absent or blank.
+        
+        Raises ValueError when it is longer than MAX_ANSWER_TEXT_LENGTH.
+        """
+        text = (value or '').strip()
+        if len(text) > MAX_ANSWER_TEXT_LENGTH:
+            raise ValueError(f"Answer text is limited to {MAX_ANSWER_TEXT_LENGTH} characters")
+        return text or None
+    
+    @staticmethod
+    def clean_count(value, default=4):
+        """Parse a requested question count; raises ValueError unless it is a positive integer"""
         try:
-            question = InterviewQuestion.objects.get(id=question_id, user=user)
+            count = int(default if value is None else value)
+        except (TypeError, ValueError):
+            count = 0
+        if count < 1:
+            raise ValueError("count must be a positive integer")
+        return count
+    
+    def _get_question(self, user, question_id):
+        try:
+            return InterviewQuestion.objects.get(id=question_id, user=user)
         except InterviewQuestion.DoesNotExist:
             raise Exception("Question not found")
+    
+    def process_answer(self, user, question_id, audio_file=None, answer_text=None):
+        """Process user's answer, either recorded audio or typed answer_text"""
+        question = self._get_question(user, question_id)
         
-        # Transcribe audio (temporary processing)
-        user_text = self.audio_service.transcribe_audio(audio_file)
+        if answer_text is not None:
+            # Typed answers skip the upload decode and Whisper entirely
+            user_text = answer_text
+        else:
+            # Transcribe audio (temporary processing)
+            user_text = self.audio_service.transcribe_audio(audio_file)
         
         # Compare with reference answer
         comparison = self.ai_service.compare_answers(question.answer, user_text, question.question)
         
+        return self._store_answer(user, question, user_text, comparison)
+    
+    async def aprocess_answer(self, user, question_id, audio_file=None, answer_text=None):
+        """Async variant of process_answer for ASGI workers"""
+        question = await sync_to_async(self._get_question)(user, question_id)
+        
+        if answer_text is not None:
+            user_text = answer_text
+        else:
+            # Transcription is CPU-bound; run it off the event loop and away from the ORM thread
+            user_text = await sync_to_async(self.audio_service.transcribe_audio, thread_sensitive=False)(audio_file)
+        
+        comparison = await self.ai_service.acompare_answers(question.answer, user_text, question.question)
+        
+        return await sync_to_async(self._store_answer)(user, question, user_text, comparison)
+    
+    @stage('db_write')
+    def _store_answer(self, user, question, user_text, comparison):
+        """Save an evaluated answer and update the score rollups and histograms"""
         # Mark question as answered
         question.is_answered = True
         question.save()
@@ -309,7 +536,9 @@ class InterviewService:
         )
         
         # Update existing answer if not created
+        previous_accuracy = None
         if not created:
+            previous_accuracy = answer.accuracy
             answer.user_text = user_text
             answer.accuracy = comparison.get("accuracy", 0)
             answer.feedback = comparison.get("feedback", "No feedback")
@@ -320,4 +549,86 @@ class InterviewService:
             answer.completeness_score = comparison.get("completeness_score", 0)
             answer.technical_accuracy_score = comparison.get("technical_accuracy_score", 0)
             answer.save()
-        return answer
\ No newline at end of file
+        
+        # Keep the daily trend rollup for this answer's bucket in sync
+        ScoreRollupService().refresh_for_answer(answer)
+        
+        # Update the topic histogram and rank this answer against it
+        histogram_service = ScoreHistogramService()
+        histogram_service.record(question.topic, answer.accuracy, previous_accuracy)
+        answer.topic_percentile = histogram_service.percentile(question.topic, answer.accuracy)
+        return answer
+
+
+class InterviewSessionService:
+    """Service for creating and navigating interview sessions with a frozen question order"""
+    
+    def start(self, user, topic, questions):
+        """Create a session over the given questions, in the given order"""
+        return InterviewSession.objects.create(
+            user=user,
+            topic=topic,
+            question_ids=[question.id for question in questions]
+        )
+    
+    def start_latest(self, user, topic, count):
+        """Freeze the questions a topic interview has always shown; None if there are none"""
+        questions = InterviewQuestion.objects.filter(user=user)
+        if topic in ('Mixed', 'Resume-Based'):
+            questions = questions.order_by('-created_at')
+        else:
+            questions = questions.filter(topic=topic).order_by('id')
+        
+        question_ids = list(questions.values_list('id', flat=True)[:count])
+        if not question_ids:
+            return None
+        return InterviewSession.objects.create(user=user, topic=topic, question_ids=question_ids)
+    
+    def start_once(self, user, key_parts, topic, build_questions):
+        """Start a session from build_questions(), coalescing identical concurrent requests.
+        
+        Double-clicks and retries with the same key parts wait for the first
+        request's session instead of generating their own questions.
+        """
+        started = []
+        
+        def build():
+            started.append(self.start(user, topic, build_questions()))
+            return {'session_id': started[0].id}
+        
+        result = run_once('generate', [user.id, *key_parts], build)
+        # Only followers need to load the leader's session
+        return started[0] if started else InterviewSession.objects.get(pk=result['session_id'])
+    
+    async def astart_once(self, user, key_parts, topic, abuild_questions):
+        """Async start_once; abuild_questions is a coroutine function"""
+        started = []
+        
+        async def build():
+            questions = await abuild_questions()
+            started.append(await sync_to_async(self.start)(user, topic, questions))
+            return {'session_id': started[0].id}
+        
+        result = await arun_once('generate', [user.id, *key_parts], build)
+        return started[0] if started else await InterviewSession.objects.aget(pk=result['session_id'])
+    
+    def get_questions(self, session):
+        """Return the session's questions in frozen order using a single query"""
+        by_id = InterviewQuestion.objects.filter(user_id=session.user_id).in_bulk(session.question_ids)
+        return [by_id[question_id] for question_id in session.question_ids if question_id in by_id]
+    
+    def move_to(self, session, index):
+        """Record the progress index, completing the session once it moves past the last question"""
+        index = max(0, min(index, session.total_questions))
+        updates = {}
+        if index != session.current_index:
+            updates['current_index'] = index
+        if index >= session.total_questions and session.completed_at is None:
+            updates['completed_at'] = timezone.now()
+        
+        if updates:
+            updates['updated_at'] = timezone.now()
+            InterviewSession.objects.filter(pk=session.pk).update(**updates)
+            for field, value in updates.items():
+                setattr(session, field, value)
+        return session
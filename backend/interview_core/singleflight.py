@@ -0,0 +1,197 @@
+"""Single-flight execution of identical calls across threads and worker processes.
+
+The first caller for a key claims a CoalescedCall row and runs the function.
+Concurrent callers with the same key poll the row and return the leader's
+JSON result instead of repeating the work. A finished result keeps being
+served for `reuse_for` seconds, so a double-click that lands just after the
+first request completes gets the same result too.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .exceptions import InterviewServiceError
+from .models import CoalescedCall
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.2
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_FIELD = 'submission_id'
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+RUNNING, DONE, FAILED = 'running', 'done', 'failed'
+
+
+class SingleFlightError(InterviewServiceError):
+    """The call this request was waiting on failed, or didn't finish in time"""
+
+
+def make_key(scope, parts):
+    """Stable hash of a scope and JSON-serializable key parts"""
+    raw = json.dumps([scope, parts], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _claim(key, scope, reuse_for, waited_on=None):
+    """Try to become the leader for key.
+
+    Returns (True, call) when this caller must run the function, otherwise
+    (False, call) with the current row, which may be None if it just vanished.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return True, CoalescedCall.objects.create(key=key, scope=scope, started_at=now)
+    except IntegrityError:
+        pass
+
+    call = CoalescedCall.objects.filter(key=key).first()
+    if call is None:
+        return False, None
+    if call.status == DONE and call.completed_at >= now - timedelta(seconds=reuse_for):
+        return False, call
+    if call.status == RUNNING and call.started_at >= now - timedelta(seconds=settings.SINGLEFLIGHT_STALE_AFTER):
+        return False, call
+    if call.status == FAILED and call.started_at == waited_on:
+        # The caller was following this attempt; it shares the failure rather than retrying
+        return False, call
+
+    # An old result, a failure or a leader that died: take over with compare-and-set
+    taken = CoalescedCall.objects.filter(pk=call.pk, status=call.status, started_at=call.started_at).update(
+        status=RUNNING, started_at=now, completed_at=None, result=None
+    )
+    if taken:
+        call.status, call.started_at, call.completed_at, call.result = RUNNING, now, None, None
+        return True, call
+    return False, call
+
+
+def _follow(call, waited_on):
+    """Return (done, result) for a follower; raise if the call it waited on failed"""
+    if call is not None and call.status == DONE:
+        return True, call.result
+    if call is not None and call.status == FAILED and call.started_at == waited_on:
+        raise SingleFlightError(f"Coalesced {call.scope} call failed")
+    return False, None
+
+
+def _finish(call, result):
+    CoalescedCall.objects.filter(pk=call.pk, started_at=call.started_at).update(
+        status=DONE, result=result, completed_at=timezone.now()
+    )
+
+
+def _fail(call):
+    CoalescedCall.objects.filter(pk=call.pk, started_at=call.started_at).update(
+        status=FAILED, completed_at=timezone.now()
+    )
+
+
+def run_once(scope, parts, fn, reuse_for=None, wait_timeout=None):
+    """Run fn() once for concurrent identical (scope, parts) calls and return its JSON-serializable result"""
+    key = make_key(scope, parts)
+    reuse_for = settings.SINGLEFLIGHT_REUSE_SECONDS if reuse_for is None else reuse_for
+    deadline = time.monotonic() + (settings.SINGLEFLIGHT_WAIT_TIMEOUT if wait_timeout is None else wait_timeout)
+    waited_on = None
+
+    while True:
+        claimed, call = _claim(key, scope, reuse_for, waited_on)
+        if claimed:
+            break
+        done, result = _follow(call, waited_on)
+        if done:
+            if waited_on is not None:
+                logger.info("Coalesced duplicate %s call onto an in-flight one", scope)
+            return result
+        if time.monotonic() > deadline:
+            raise SingleFlightError(f"Timed out waiting for a duplicate {scope} call")
+        waited_on = call.started_at if call is not None else waited_on
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        result = fn()
+    except BaseException:
+        _fail(call)
+        raise
+    _finish(call, result)
+    return result
+
+
+async def arun_once(scope, parts, afn, reuse_for=None, wait_timeout=None):
+    """Async run_once; afn is a coroutine function and followers wait on the event loop"""
+    key = make_key(scope, parts)
+    reuse_for = settings.SINGLEFLIGHT_REUSE_SECONDS if reuse_for is None else reuse_for
+    deadline = time.monotonic() + (settings.SINGLEFLIGHT_WAIT_TIMEOUT if wait_timeout is None else wait_timeout)
+    waited_on = None
+
+    while True:
+        claimed, call = await sync_to_async(_claim)(key, scope, reuse_for, waited_on)
+        if claimed:
+            break
+        done, result = _follow(call, waited_on)
+        if done:
+            if waited_on is not None:
+                logger.info("Coalesced duplicate %s call onto an in-flight one", scope)
+            return result
+        if time.monotonic() > deadline:
+            raise SingleFlightError(f"Timed out waiting for a duplicate {scope} call")
+        waited_on = call.started_at if call is not None else waited_on
+        await asyncio.sleep(POLL_INTERVAL)
+
+    try:
+        result = await afn()
+    except BaseException:
+        await sync_to_async(_fail)(call)
+        raise
+    await sync_to_async(_finish)(call, result)
+    return result
+
+
+def idempotency_key(request):
+    """Client-supplied key from the Idempotency-Key header or a submission_id form field"""
+    key = request.headers.get(IDEMPOTENCY_HEADER) or request.POST.get(IDEMPOTENCY_FIELD)
+    key = (key or '').strip()
+    return key[:MAX_IDEMPOTENCY_KEY_LENGTH] or None
+
+
+def run_idempotent(scope, parts, fn):
+    """run_once whose result is replayed for IDEMPOTENCY_KEY_TTL; returns (result, replayed)"""
+    ran = []
+
+    def call():
+        ran.append(True)
+        return fn()
+
+    result = run_once(scope, parts, call, reuse_for=settings.IDEMPOTENCY_KEY_TTL)
+    return result, not ran
+
+
+async def arun_idempotent(scope, parts, afn):
+    """Async run_idempotent"""
+    ran = []
+
+    async def call():
+        ran.append(True)
+        return await afn()
+
+    result = await arun_once(scope, parts, call, reuse_for=settings.IDEMPOTENCY_KEY_TTL)
+    return result, not ran
+
+
+def finished_before(older_than):
+    """Finished and failed calls completed before `older_than` (a datetime)"""
+    return CoalescedCall.objects.filter(status__in=[DONE, FAILED], completed_at__lt=older_than)
+
+
+def purge_finished(older_than):
+    """Delete finished and failed calls completed before `older_than`; returns the count"""
+    deleted, _ = finished_before(older_than).delete()
+    return deleted
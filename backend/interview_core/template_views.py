@@ -2,14 +2,34 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.db import models
-from .models import InterviewQuestion, UserAnswer, SavedQuestion
-from .services import InterviewService
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from .models import InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession
+from .services import InterviewService, InterviewSessionService
 from .serializers import RegisterSerializer
+from .pagination import keyset_page
+from . import degradation
+from .admission import admission_control
+from .singleflight import SingleFlightError, idempotency_key, run_idempotent
 import json
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SAVED_QUESTIONS_PAGE_SIZE = 10
+
+
+def redirect_to_session(interview_session, index=0):
+    """Redirect to a question of an interview session, the first one by default"""
+    url = reverse('interview', kwargs={'topic': interview_session.topic})
+    if index:
+        return redirect(f'{url}?s={interview_session.id}&q={index}')
+    return redirect(f'{url}?s={interview_session.id}')
 
 def login_view(request):
     if request.user.is_authenticated:
@@ -75,10 +95,15 @@ def dashboard_view(request):
     return render(request, 'interview_core/dashboard.html', context)
 
 @login_required
+@admission_control('generate')
 def generate_questions_view(request):
     if request.method == 'POST':
         topics_str = request.POST.get('topics')
-        count = int(request.POST.get('count', 4))
+        try:
+            count = InterviewService.clean_count(request.POST.get('count'))
+        except ValueError:
+            messages.error(request, 'Number of questions must be a positive whole number.')
+            return redirect('dashboard')
         difficulty = request.POST.get('difficulty', 'medium')
         
         # Store count in session for interview view
@@ -89,23 +114,31 @@ def generate_questions_view(request):
             if topics:
                 try:
                     interview_service = InterviewService()
-                    all_questions = []
                     
-                    # Generate questions for each topic
-                    questions_per_topic = max(1, count // len(topics))
-                    for topic in topics:
-                        questions = interview_service.create_questions(request.user, topic, questions_per_topic, difficulty)
-                        all_questions.extend(questions)
+                    def build_questions():
+                        all_questions = []
+                        
+                        # Generate questions for each topic
+                        questions_per_topic = max(1, count // len(topics))
+                        for topic in topics:
+                            questions = interview_service.create_questions(request.user, topic, questions_per_topic, difficulty)
+                            all_questions.extend(questions)
+                        
+                        # If we need more questions to reach the count
+                        remaining = count - len(all_questions)
+                        if remaining > 0:
+                            extra_questions = interview_service.create_questions(request.user, topics[0], remaining, difficulty)
+                            all_questions.extend(extra_questions)
+                        return all_questions
                     
-                    # If we need more questions to reach the count
-                    remaining = count - len(all_questions)
-                    if remaining > 0:
-                        extra_questions = interview_service.create_questions(request.user, topics[0], remaining, difficulty)
-                        all_questions.extend(extra_questions)
+                    # A double-submitted form waits for the first submission's session
+                    interview_session = InterviewSessionService().start_once(
+                        request.user, ['mixed', topics, count, difficulty], 'Mixed', build_questions
+                    )
                     
                     topics_display = ', '.join(topics)
-                    messages.success(request, f'Generated {len(all_questions)} questions for {topics_display}')
-                    return redirect('interview', topic='Mixed')
+                    messages.success(request, f'Generated {interview_session.total_questions} questions for {topics_display}')
+                    return redirect_to_session(interview_session)
                 except Exception as e:
                     messages.error(request, 'Failed to generate questions. Please try again.')
     
@@ -113,78 +146,106 @@ def generate_questions_view(request):
 
 @login_required
 def interview_view(request, topic):
-    # Get requested count from session or default to 4
-    requested_count = request.session.get('interview_count', 4)
+    session_service = InterviewSessionService()
     
-    # Optimized queries with select_related for foreign keys
-    if topic == 'Mixed':
-        questions = InterviewQuestion.objects.select_related('user').filter(
-            user=request.user
-        ).order_by('-created_at')[:requested_count]
-    elif topic == 'Resume-Based':
-        questions = InterviewQuestion.objects.select_related('user').filter(
-            user=request.user
-        ).order_by('-created_at')[:requested_count]
-    else:
-        questions = InterviewQuestion.objects.select_related('user').filter(
-            user=request.user, topic=topic
-        ).order_by('id')[:requested_count]
+    # The question order is frozen in the interview session carried by ?s=
+    interview_session = None
+    session_id = request.GET.get('s', '')
+    if session_id.isdigit():
+        interview_session = InterviewSession.objects.filter(id=session_id, user=request.user).first()
     
-    if not questions:
-        messages.error(request, f'No questions found for topic: {topic}')
-        return redirect('dashboard')
+    if interview_session is None:
+        # Links without a session: freeze the latest questions for this topic once
+        requested_count = request.session.get('interview_count', 4)
+        interview_session = session_service.start_latest(request.user, topic, requested_count)
+        if interview_session is None:
+            messages.error(request, f'No questions found for topic: {topic}')
+            return redirect('dashboard')
+        # Carry the new session in the URL so a refresh reuses it instead of starting another
+        return redirect_to_session(interview_session, request.GET.get('q', 0))
     
     # Get current question index
-    current_index = int(request.GET.get('q', 0))
+    current_index = max(0, int(request.GET.get('q', 0)))
+    session_service.move_to(interview_session, current_index)
     
-    if current_index >= len(questions):
+    if current_index >= interview_session.total_questions:
         messages.success(request, f'Interview completed!')
         return redirect('dashboard')
     
-    current_question = questions[current_index]
+    current_question = InterviewQuestion.objects.filter(
+        id=interview_session.question_ids[current_index], user=request.user
+    ).first()
+    if current_question is None:
+        messages.error(request, 'This question is no longer available.')
+        return redirect('dashboard')
     
     context = {
         'topic': topic,
+        'interview_session': interview_session,
         'current_question': current_question,
         'current_index': current_index,
-        'total_questions': len(questions),
+        'total_questions': interview_session.total_questions,
         'next_index': current_index + 1,
+        # One id per rendered question: retried submissions reuse it and get the stored feedback
+        'submission_id': uuid.uuid4().hex,
     }
     
     return render(request, 'interview_core/interview.html', context)
 
 @login_required
 @csrf_exempt
+@admission_control('answer')
 def submit_answer_view(request):
     if request.method == 'POST':
         try:
             question_id = request.POST.get('question_id')
             audio_file = request.FILES.get('audio_file')
+            try:
+                answer_text = InterviewService.clean_answer_text(request.POST.get('answer_text'))
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
             
-            print(f"DEBUG: question_id={question_id}, audio_file={audio_file}")
+            logger.debug("Answer for question %s: audio_file=%s, typed=%s", question_id, audio_file, answer_text is not None)
             
-            if not question_id or not audio_file:
+            if not question_id or not (audio_file or answer_text):
                 return JsonResponse({'error': 'Missing data'}, status=400)
             
-            interview_service = InterviewService()
-            answer = interview_service.process_answer(request.user, question_id, audio_file)
+            if answer_text is None and degradation.controller.level() >= degradation.TEXT_ONLY:
+                response = JsonResponse({'error': degradation.AUDIO_UNAVAILABLE_MESSAGE, 'text_only': True}, status=503)
+                response['Retry-After'] = str(degradation.AUDIO_RETRY_AFTER)
+                return response
             
-            return JsonResponse({
-                'accuracy': answer.accuracy,
-                'feedback': answer.feedback,
-                'strengths': answer.strengths,
-                'improvements': answer.improvements,
-                'missing_points': answer.missing_points,
-                'clarity_score': answer.clarity_score,
-                'completeness_score': answer.completeness_score,
-                'technical_accuracy_score': answer.technical_accuracy_score,
-                'success': True
-            })
+            def submit():
+                interview_service = InterviewService()
+                answer = interview_service.process_answer(request.user, question_id, audio_file, answer_text)
+                return {
+                    'accuracy': answer.accuracy,
+                    'feedback': answer.feedback,
+                    'strengths': answer.strengths,
+                    'improvements': answer.improvements,
+                    'missing_points': answer.missing_points,
+                    'clarity_score': answer.clarity_score,
+                    'completeness_score': answer.completeness_score,
+                    'technical_accuracy_score': answer.technical_accuracy_score,
+                    'topic_percentile': answer.topic_percentile,
+                    'success': True
+                }
+            
+            key = idempotency_key(request)
+            if key is None:
+                return JsonResponse(submit())
             
+            # A resubmitted recording gets the stored feedback instead of being re-evaluated
+            data, replayed = run_idempotent('answer', [request.user.id, str(question_id), key], submit)
+            response = JsonResponse(data)
+            if replayed:
+                response['Idempotent-Replayed'] = 'true'
+            return response
+            
+        except SingleFlightError as e:
+            return JsonResponse({'error': str(e)}, status=409)
         except Exception as e:
-            print(f"ERROR in submit_answer_view: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Failed to process answer for question %s", request.POST.get('question_id'))
             return JsonResponse({'error': str(e)}, status=500)
     
     return JsonResponse({'error': 'Invalid method'}, status=405)
@@ -203,6 +264,10 @@ def save_question_view(request, question_id):
     else:
         messages.info(request, 'Question already saved.')
     
+    # Return to the same step of the interview session the question was saved from
+    referer = request.META.get('HTTP_REFERER')
+    if referer and url_has_allowed_host_and_scheme(referer, allowed_hosts={request.get_host()}):
+        return redirect(referer)
     return redirect('interview', topic=question.topic)
 
 @login_required
@@ -216,38 +281,48 @@ def saved_questions_view(request):
             queryset=UserAnswer.objects.filter(user=request.user),
             to_attr='user_answer_list'
         )
-    ).filter(user=request.user).order_by('-saved_at')
+    ).filter(user=request.user)
+    
+    # Keyset pagination: each "load more" seeks from the last (saved_at, id) seen
+    try:
+        saved_questions, next_cursor = keyset_page(
+            saved_questions, 'saved_at', cursor=request.GET.get('cursor'), page_size=SAVED_QUESTIONS_PAGE_SIZE
+        )
+    except ValueError:
+        # Appending the first page again would duplicate cards, so "load more" gets an error
+        if request.GET.get('partial'):
+            return HttpResponseBadRequest('Invalid cursor')
+        saved_questions, next_cursor = keyset_page(saved_questions, 'saved_at', page_size=SAVED_QUESTIONS_PAGE_SIZE)
     
     # Set user_answer attribute for template compatibility
     for saved in saved_questions:
         saved.user_answer = saved.question.user_answer_list[0] if saved.question.user_answer_list else None
     
-    return render(request, 'interview_core/saved_questions.html', {'saved_questions': saved_questions})
+    context = {'saved_questions': saved_questions, 'next_cursor': next_cursor}
+    
+    # "Load more" requests only need the next batch of cards
+    if request.GET.get('partial'):
+        return render(request, 'interview_core/saved_question_cards.html', context)
+    
+    return render(request, 'interview_core/saved_questions.html', context)
 
 @login_required
+@admission_control('resume')
 def upload_resume_view(request):
-    print(f"DEBUG: Request method: {request.method}")
-    print(f"DEBUG: Request POST keys: {list(request.POST.keys())}")
-    print(f"DEBUG: Request FILES keys: {list(request.FILES.keys())}")
-    
     if request.method == 'POST':
-        print(f"DEBUG: POST data: {request.POST}")
-        print(f"DEBUG: FILES data: {request.FILES}")
-        
         resume_file = request.FILES.get('resume')
-        count = int(request.POST.get('count', 4))
+        try:
+            count = InterviewService.clean_count(request.POST.get('count'))
+        except ValueError:
+            messages.error(request, 'Number of questions must be a positive whole number.')
+            return redirect('dashboard')
         difficulty = request.POST.get('difficulty', 'medium')
         
-        print(f"DEBUG: resume_file={resume_file}")
-        print(f"DEBUG: count={count}")
-        print(f"DEBUG: difficulty={difficulty}")
+        logger.debug("Resume upload: file=%s, count=%d, difficulty=%s", resume_file, count, difficulty)
         
         # Store count in session for interview view
         request.session['interview_count'] = count
         
-        print(f"DEBUG: Checking if resume_file exists...")
-        print(f"DEBUG: About to start resume processing")
-        
         if resume_file:
             try:
                 from .resume_parser import ResumeParser
@@ -267,10 +342,8 @@ def upload_resume_view(request):
                 )
                 # File is automatically deleted after processing
                 
-                print(f"\n=== STEP 4: RESUME SAVED TO DATABASE ===")
-                print(f"DEBUG: Resume saved with ID: {resume.id}")
+                logger.debug("Resume saved with ID %s", resume.id)
                 
-                print(f"\n=== STEP 5: PREPARING KEYWORDS FOR AI MODEL ===")
                 # Generate questions based on resume
                 interview_service = InterviewService()
                 all_questions = []
@@ -282,15 +355,12 @@ def upload_resume_view(request):
                     'Projects': parsed_data['projects'][:2]  # Top 2 projects
                 }
                 
-                print(f"DEBUG: Categories prepared for AI: {categories}")
                 questions_per_category = max(1, count // len([c for c in categories.values() if c]))
-                print(f"DEBUG: Questions per category: {questions_per_category}")
+                logger.debug("Resume categories %s, %d questions each", categories, questions_per_category)
                 
-                print(f"\n=== STEP 6: GENERATING QUESTIONS WITH AI MODEL ===")
                 for category, items in categories.items():
                     if items:
                         topic_context = f"{category}: {', '.join(items)}"
-                        print(f"DEBUG: Sending to AI model - Topic: {topic_context}")
                         try:
                             questions = interview_service.create_questions(
                                 request.user, 
@@ -299,9 +369,9 @@ def upload_resume_view(request):
                                 difficulty
                             )
                             all_questions.extend(questions)
-                            print(f"DEBUG: AI SUCCESS - Generated {len(questions)} questions for {category}")
+                            logger.debug("Generated %d questions for %s", len(questions), category)
                         except Exception as e:
-                            print(f"DEBUG: AI FAILED for {category}: {str(e)}")
+                            logger.warning("Question generation failed for resume category %s: %s", category, e)
                             # Create fallback question for this category
                             from .models import InterviewQuestion
                             fallback_question = InterviewQuestion.objects.create(
@@ -311,14 +381,11 @@ def upload_resume_view(request):
                                 answer=f"Describe your background and expertise in {category.lower()}."
                             )
                             all_questions.append(fallback_question)
-                            print(f"DEBUG: Created fallback question for {category}")
                 
-                print(f"\n=== STEP 7: FINALIZING QUESTIONS ===")
                 if all_questions:
-                    print(f"DEBUG: SUCCESS - Total generated {len(all_questions)} questions")
                     messages.success(request, f'Generated {len(all_questions)} personalized questions based on your resume!')
                 else:
-                    print("DEBUG: No questions generated, creating fallback")
+                    logger.warning("No resume questions generated, using a fallback question")
                     # Create a fallback question if everything fails
                     from .models import InterviewQuestion
                     fallback_question = InterviewQuestion.objects.create(
@@ -327,20 +394,17 @@ def upload_resume_view(request):
                         question="Tell me about your most significant project and the technologies you used.",
                         answer="Describe the project scope, your role, technical challenges, and key achievements."
                     )
+                    all_questions.append(fallback_question)
                     messages.success(request, 'Generated personalized questions based on your resume!')
                 
-                print(f"\n=== STEP 8: REDIRECTING TO INTERVIEW ===")
-                
                 # Delete resume data after questions are generated
                 resume.delete()
-                print(f"DEBUG: Resume data deleted after question generation")
                 
-                return redirect('interview', topic='Resume-Based')
+                interview_session = InterviewSessionService().start(request.user, 'Resume-Based', all_questions)
+                return redirect_to_session(interview_session)
                 
             except Exception as e:
-                print(f"ERROR in upload_resume_view: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Failed to process resume upload")
                 messages.error(request, f'Failed to process resume: {str(e)}')
         else:
             messages.error(request, 'Please upload a resume file.')
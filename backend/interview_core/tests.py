@@ -0,0 +1,1277 @@
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.test import TestCase, Client, RequestFactory, AsyncRequestFactory, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from . import archive, degradation, llm, llm_fixtures, profiling, retention, timing, urls as api_urls, watchdog, web_urls
+from .instrumentation import QueryRecorder, fingerprint
+from .ratelimit import TokenBucket, RateLimitExceeded, send_rate_limited
+from .admission import AdmissionDenied, acquire, release
+from .models import InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession, CoalescedCall, AdmissionLease, RequestProfile, Resume, DailyScoreRollup, TopicScoreBin
+from .rollups import ScoreRollupService
+from .histograms import ScoreHistogramService, percentile_from_bins, score_bin
+from .pagination import encode_cursor, decode_cursor, keyset_page
+from .services import AIService
+from .singleflight import SingleFlightError, make_key, run_once
+from .async_views import per_request_http_client
+from .management.commands import benchmark
+
+SEED_ROWS = 15
+
+# Maximum SQL queries per endpoint, keyed by (method, route). Budgets must not
+# depend on how much data the user has; seeding SEED_ROWS rows makes any
+# per-row query blow the budget. Expensive endpoints also pay for admission
+# control: a concurrency lease and a per-user token bucket (created on first use).
+API_BUDGETS = {
+    ('POST', 'register/'): 3,
+    ('GET', 'questions/'): 1,
+    ('POST', 'submit-answer/'): 31,
+    ('POST', 'async/generate-questions/'): 19,
+    ('POST', 'async/submit-answer/'): 32,
+    ('GET', 'generate-questions/<str:topic>/'): 12,
+    ('POST', 'generate-questions/'): 17,
+    ('POST', 'sessions/'): 3,
+    ('GET', 'sessions/<int:pk>/'): 2,
+    ('PATCH', 'sessions/<int:pk>/'): 3,
+    ('GET', 'report/'): 2,
+    ('GET', 'score-trends/'): 1,
+    ('POST', 'token/'): 2,
+    ('POST', 'token/refresh/'): 1,
+    ('GET', 'test-token/'): 0,
+    ('GET', 'profile/'): 0,
+    ('PUT', 'profile/'): 2,
+    ('POST', 'save-question/'): 3,
+    ('GET', 'saved-questions/'): 2,
+    ('GET', 'dashboard-stats/'): 6,
+    ('GET', 'memory/'): 0,
+}
+
+# Web views authenticate through the session: one session read plus one user read
+WEB_BUDGETS = {
+    ('GET', ''): 4,
+    ('POST', 'login/'): 9,
+    ('POST', 'register/'): 3,
+    ('GET', 'logout/'): 4,
+    ('POST', 'generate-questions/'): 22,
+    ('GET', 'interview/<str:topic>/'): 5,
+    ('POST', 'submit-answer/'): 33,
+    ('GET', 'save-question/<int:question_id>/'): 7,
+    ('GET', 'saved-questions/'): 4,
+    ('GET', 'profile/'): 2,
+    ('GET', 'resume-interview/'): 2,
+    ('POST', 'upload-resume/'): 21,
+    ('POST', 'async/upload-resume/'): 21,
+    ('GET', 'metrics'): 0,
+}
+
+FAKE_QUESTIONS = [{"question": f"Question {i}?", "answer": f"Answer {i}."} for i in range(4)]
+
+FAKE_COMPARISON = {
+    "accuracy": 75,
+    "feedback": "Good",
+    "strengths": "Clear",
+    "improvements": "More depth",
+    "missing_points": "None",
+    "clarity_score": 80,
+    "completeness_score": 70,
+    "technical_accuracy_score": 75,
+}
+
+FAKE_RESUME = {
+    'extracted_text': 'Python developer',
+    'skills': ['Python', 'Django'],
+    'experience': ['Backend Developer'],
+    'projects': ['Interview platform'],
+}
+
+
+def fake_ai_service():
+    ai_service = mock.Mock()
+    ai_service.generate_questions.side_effect = lambda topic, count=4, difficulty="medium": FAKE_QUESTIONS[:count]
+    ai_service.compare_answers.return_value = FAKE_COMPARISON
+    ai_service.agenerate_questions = mock.AsyncMock(side_effect=ai_service.generate_questions.side_effect)
+    ai_service.acompare_answers = mock.AsyncMock(return_value=FAKE_COMPARISON)
+    return ai_service
+
+
+def fake_audio_service():
+    audio_service = mock.Mock()
+    audio_service.transcribe_audio.return_value = 'Transcribed answer'
+    return audio_service
+
+
+class FingerprintTests(TestCase):
+    def test_literals_and_in_lists_are_normalized(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 5 AND name = 'x' AND pk IN (%s, %s, %s)"),
+            fingerprint("SELECT * FROM t WHERE id = 12 AND name = 'y' AND pk IN (%s)"),
+        )
+
+    def test_recorder_reports_duplicates(self):
+        with QueryRecorder() as queries:
+            for _ in range(3):
+                list(User.objects.filter(id=1))
+        self.assertEqual(queries.count, 3)
+        self.assertEqual(list(queries.duplicates().values()), [3])
+
+
+# Pin the degradation level so its periodic in-flight count can't land inside a measured request
+@override_settings(DEGRADATION_LEVEL=0)
+class QueryBudgetTests(TestCase):
+    """Pin a SQL query budget for every endpoint in urls.py and web_urls.py"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='budget', password='budget-pass-123')
+        cls.questions = [
+            InterviewQuestion.objects.create(user=cls.user, topic='Python', question=f'Q{i}', answer=f'A{i}')
+            for i in range(SEED_ROWS)
+        ]
+        for question in cls.questions:
+            UserAnswer.objects.create(user=cls.user, question=question, user_text='text', accuracy=50,
+                                      clarity_score=50, completeness_score=50, technical_accuracy_score=50)
+            SavedQuestion.objects.create(user=cls.user, question=question)
+        cls.extra_question = InterviewQuestion.objects.create(user=cls.user, topic='Python', question='New', answer='A')
+        cls.interview_session = InterviewSession.objects.create(
+            user=cls.user, topic='Python', question_ids=[question.id for question in cls.questions]
+        )
+
+    def setUp(self):
+        for target, kwargs in (
+            ('interview_core.services.AIService', {'side_effect': fake_ai_service}),
+            ('interview_core.services.AudioService', {'side_effect': fake_audio_service}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.web = Client()
+        self.web.force_login(self.user)
+        self.bearer = f'Bearer {AccessToken.for_user(self.user)}'
+
+    def assertWithinBudget(self, budgets, method, route, request):
+        budget = budgets[(method, route)]
+        with QueryRecorder() as queries:
+            response = request()
+        self.assertLess(response.status_code, 500, f"{method} {route} failed: {response.status_code}")
+        self.assertLessEqual(
+            queries.count, budget,
+            f"{method} {route} ran {queries.count} queries (budget {budget}):\n"
+            + '\n'.join(sql for sql, _ in queries.queries)
+        )
+        return response
+
+    def test_every_endpoint_has_a_budget(self):
+        for patterns, budgets in ((api_urls.urlpatterns, API_BUDGETS), (web_urls.urlpatterns, WEB_BUDGETS)):
+            budgeted_routes = {route for _, route in budgets}
+            for pattern in patterns:
+                self.assertIn(str(pattern.pattern), budgeted_routes, f"No query budget for route '{pattern.pattern}'")
+
+    # -------------------- API --------------------
+
+    def test_api_register(self):
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'register/', lambda: APIClient().post(
+            '/api/register/', {'username': 'new-user', 'email': 'n@example.com', 'password': 'pw-12345678'}))
+
+    def test_api_questions(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'questions/', lambda: self.api.get('/api/questions/'))
+
+    def test_api_submit_answer(self):
+        audio = SimpleUploadedFile('answer.wav', b'RIFF', content_type='audio/wav')
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'submit-answer/', lambda: self.api.post(
+            '/api/submit-answer/', {'question_id': self.extra_question.id, 'audio_file': audio}, format='multipart'))
+
+    def test_api_submit_answer_retry_replays_the_stored_result(self):
+        def submit():
+            audio = SimpleUploadedFile('answer.wav', b'RIFF', content_type='audio/wav')
+            return self.api.post('/api/submit-answer/', {'question_id': self.extra_question.id, 'audio_file': audio},
+                                 format='multipart', HTTP_IDEMPOTENCY_KEY='retry-1')
+
+        first = submit()
+        with mock.patch('interview_core.services.InterviewService.process_answer') as process_answer:
+            with QueryRecorder() as queries:
+                retry = submit()
+        process_answer.assert_not_called()
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertLessEqual(queries.count, API_BUDGETS[('POST', 'submit-answer/')])
+
+    def test_api_async_submit_answer(self):
+        audio = SimpleUploadedFile('answer.webm', b'audio', content_type='audio/webm')
+        response = self.assertWithinBudget(API_BUDGETS, 'POST', 'async/submit-answer/', lambda: Client().post(
+            '/api/async/submit-answer/', {'audio_file': audio, 'question_id': self.extra_question.id},
+            HTTP_AUTHORIZATION=self.bearer))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['accuracy'], FAKE_COMPARISON['accuracy'])
+
+    def test_api_async_generate_questions(self):
+        response = self.assertWithinBudget(API_BUDGETS, 'POST', 'async/generate-questions/', lambda: Client().post(
+            '/api/async/generate-questions/', {'topic': 'Python', 'count': 2},
+            content_type='application/json', HTTP_AUTHORIZATION=self.bearer))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['questions']), 2)
+
+    def test_api_async_requires_token(self):
+        response = Client().post('/api/async/generate-questions/', {'topic': 'Python'}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_api_generate_questions_get(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'generate-questions/<str:topic>/',
+                                lambda: self.api.get('/api/generate-questions/Python/?count=2'))
+
+    def test_api_generate_questions_post(self):
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'generate-questions/', lambda: self.api.post(
+            '/api/generate-questions/', {'topic': 'Python', 'count': 2}))
+
+    def test_api_sessions(self):
+        response = self.assertWithinBudget(API_BUDGETS, 'POST', 'sessions/', lambda: self.api.post(
+            '/api/sessions/', {'topic': 'Python', 'count': 10}))
+        self.assertEqual(len(response.json()['questions']), 10)
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'sessions/', lambda: self.api.post(
+            '/api/sessions/', {'topic': 'Python', 'question_ids': [q.id for q in self.questions]}, format='json'))
+
+    def test_api_session_detail(self):
+        url = f'/api/sessions/{self.interview_session.id}/'
+        response = self.assertWithinBudget(API_BUDGETS, 'GET', 'sessions/<int:pk>/', lambda: self.api.get(url))
+        self.assertEqual([q['id'] for q in response.json()['questions']], self.interview_session.question_ids)
+        response = self.assertWithinBudget(API_BUDGETS, 'PATCH', 'sessions/<int:pk>/', lambda: self.api.patch(
+            url, {'current_index': 3}))
+        self.assertEqual(response.json()['current_index'], 3)
+
+    def test_api_report(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'report/', lambda: self.api.get('/api/report/'))
+
+    def test_api_report_export(self):
+        for export_format in ('ndjson', 'csv'):
+            with QueryRecorder() as queries:
+                response = self.api.get(f'/api/report/?export={export_format}')
+                b''.join(response.streaming_content)
+            self.assertLessEqual(queries.count, API_BUDGETS[('GET', 'report/')])
+
+    def test_api_score_trends(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'score-trends/', lambda: self.api.get('/api/score-trends/'))
+
+    def test_api_token(self):
+        response = self.assertWithinBudget(API_BUDGETS, 'POST', 'token/', lambda: APIClient().post(
+            '/api/token/', {'username': 'budget', 'password': 'budget-pass-123'}))
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'token/refresh/', lambda: APIClient().post(
+            '/api/token/refresh/', {'refresh': response.json()['refresh']}))
+
+    def test_api_test_token(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'test-token/', lambda: self.api.get('/api/test-token/'))
+
+    def test_api_profile(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'profile/', lambda: self.api.get('/api/profile/'))
+        self.assertWithinBudget(API_BUDGETS, 'PUT', 'profile/', lambda: self.api.put(
+            '/api/profile/', {'email': 'budget@example.com'}))
+
+    def test_api_save_question(self):
+        self.assertWithinBudget(API_BUDGETS, 'POST', 'save-question/', lambda: self.api.post(
+            '/api/save-question/', {'question': self.extra_question.id}))
+
+    def test_api_saved_questions(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'saved-questions/', lambda: self.api.get('/api/saved-questions/'))
+
+    def test_api_dashboard_stats(self):
+        self.assertWithinBudget(API_BUDGETS, 'GET', 'dashboard-stats/', lambda: self.api.get('/api/dashboard-stats/'))
+
+    def test_api_worker_memory(self):
+        staff = APIClient()
+        staff.force_authenticate(User(username='ops', is_staff=True))
+        response = self.assertWithinBudget(API_BUDGETS, 'GET', 'memory/', lambda: staff.get('/api/memory/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.api.get('/api/memory/').status_code, 403)
+
+    # -------------------- Web --------------------
+
+    def test_web_dashboard(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', '', lambda: self.web.get('/'))
+
+    def test_web_login(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'POST', 'login/', lambda: Client().post(
+            '/login/', {'username': 'budget', 'password': 'budget-pass-123'}))
+
+    def test_web_register(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'POST', 'register/', lambda: Client().post(
+            '/register/', {'username': 'web-user', 'email': 'w@example.com', 'password': 'pw-12345678'}))
+
+    def test_web_logout(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'logout/', lambda: self.web.get('/logout/'))
+
+    def test_web_generate_questions(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'POST', 'generate-questions/', lambda: self.web.post(
+            '/generate-questions/', {'topics': 'Python', 'count': 2}))
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_web_metrics(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'metrics', lambda: Client().get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer scrape-token'))
+
+    def test_web_interview(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'interview/<str:topic>/',
+                                lambda: self.web.get(f'/interview/Python/?s={self.interview_session.id}&q=1'))
+
+    def test_web_submit_answer(self):
+        audio = SimpleUploadedFile('answer.wav', b'RIFF', content_type='audio/wav')
+        self.assertWithinBudget(WEB_BUDGETS, 'POST', 'submit-answer/', lambda: self.web.post(
+            '/submit-answer/', {'question_id': self.extra_question.id, 'audio_file': audio}))
+
+    def test_web_submit_answer_retry_with_the_page_submission_id_evaluates_once(self):
+        page = self.web.get(f'/interview/Python/?s={self.interview_session.id}')
+        submission_id = page.context['submission_id']
+        self.assertContains(page, f'id="submission-id" value="{submission_id}"')
+
+        ai_service = fake_ai_service()
+        with mock.patch('interview_core.services.AIService', return_value=ai_service):
+            responses = [self.web.post('/submit-answer/', {
+                'question_id': self.extra_question.id, 'answer_text': 'typed', 'submission_id': submission_id,
+            }) for _ in range(2)]
+        self.assertEqual(responses[0].json(), responses[1].json())
+        self.assertEqual(responses[1]['Idempotent-Replayed'], 'true')
+        ai_service.compare_answers.assert_called_once()
+        self.assertEqual(UserAnswer.objects.filter(question=self.extra_question).count(), 1)
+        # The next render, e.g. for the next question, gets a fresh id
+        next_page = self.web.get(f'/interview/Python/?s={self.interview_session.id}&q=1')
+        self.assertNotEqual(next_page.context['submission_id'], submission_id)
+
+    def test_web_save_question(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'save-question/<int:question_id>/',
+                                lambda: self.web.get(f'/save-question/{self.extra_question.id}/'))
+
+    def test_web_saved_questions(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'saved-questions/', lambda: self.web.get('/saved-questions/'))
+
+    def test_web_profile(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'profile/', lambda: self.web.get('/profile/'))
+
+    def test_web_resume_interview(self):
+        self.assertWithinBudget(WEB_BUDGETS, 'GET', 'resume-interview/', lambda: self.web.get('/resume-interview/'))
+
+    @mock.patch('interview_core.resume_parser.ResumeParser.process_resume', return_value=FAKE_RESUME)
+    def test_web_upload_resume(self, _):
+        resume = SimpleUploadedFile('resume.pdf', b'%PDF-1.4', content_type='application/pdf')
+        self.assertWithinBudget(WEB_BUDGETS, 'POST', 'upload-resume/', lambda: self.web.post(
+            '/upload-resume/', {'resume': resume, 'count': 4}))
+
+    @mock.patch('interview_core.resume_parser.ResumeParser.aprocess_resume', return_value=FAKE_RESUME)
+    def test_web_async_upload_resume(self, _):
+        resume = SimpleUploadedFile('resume.pdf', b'%PDF-1.4', content_type='application/pdf')
+        response = self.assertWithinBudget(WEB_BUDGETS, 'POST', 'async/upload-resume/', lambda: self.web.post(
+            '/async/upload-resume/', {'resume': resume, 'count': 4}))
+        self.assertIn('?s=', response['Location'])
+
+    def test_async_endpoints_reject_bad_counts(self):
+        for count in ('abc', -2, 0):
+            response = Client().post('/api/async/generate-questions/', {'topic': 'Python', 'count': count},
+                                     content_type='application/json', HTTP_AUTHORIZATION=self.bearer)
+            self.assertEqual(response.status_code, 400, count)
+            self.assertEqual(response.json(), {'error': 'count must be a positive integer'})
+
+            resume = SimpleUploadedFile('resume.pdf', b'%PDF-1.4', content_type='application/pdf')
+            response = self.web.post('/async/upload-resume/', {'resume': resume, 'count': count}, follow=True)
+            self.assertRedirects(response, '/')
+            self.assertContains(response, 'Number of questions must be a positive whole number.')
+        self.assertFalse(Resume.objects.exists())
+
+    @override_settings(ADMISSION_CONTROL=False)
+    def test_sync_endpoints_reject_bad_counts(self):
+        sessions = InterviewSession.objects.count()
+        for count in ('abc', -2, 0):
+            for response in (
+                self.api.get(f'/api/generate-questions/Python/?count={count}'),
+                self.api.post('/api/generate-questions/', {'topic': 'Python', 'count': count}, format='json'),
+                self.api.post('/api/sessions/', {'topic': 'Python', 'count': count}, format='json'),
+            ):
+                self.assertEqual(response.status_code, 400, count)
+                self.assertEqual(response.json(), {'error': 'count must be a positive integer'})
+
+            resume = SimpleUploadedFile('resume.pdf', b'%PDF-1.4', content_type='application/pdf')
+            for response in (
+                self.web.post('/generate-questions/', {'topics': 'Python', 'count': count}, follow=True),
+                self.web.post('/upload-resume/', {'resume': resume, 'count': count}, follow=True),
+            ):
+                self.assertRedirects(response, '/')
+                self.assertContains(response, 'Number of questions must be a positive whole number.')
+        self.assertFalse(Resume.objects.exists())
+        self.assertEqual(InterviewSession.objects.count(), sessions)
+
+
+def answer_at(user, when, topic='Python', accuracy=50, clarity=50, completeness=50):
+    """Create an answered question whose answer is dated `when`"""
+    question = InterviewQuestion.objects.create(user=user, topic=topic, question='Q', answer='A', is_answered=True)
+    answer = UserAnswer.objects.create(user=user, question=question, user_text='text', accuracy=accuracy,
+                                       clarity_score=clarity, completeness_score=completeness)
+    UserAnswer.objects.filter(pk=answer.pk).update(created_at=when)
+    answer.created_at = when
+    return answer
+
+
+class ScoreRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rollups', password='rollups-pass-123')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.service = ScoreRollupService()
+
+    def at(self, day, hour=12):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+    def rollup_rows(self):
+        return list(DailyScoreRollup.objects.order_by('topic', 'day').values(
+            'topic', 'day', 'answer_count', 'accuracy_sum', 'accuracy_min', 'accuracy_max',
+            'clarity_sum', 'completeness_sum'))
+
+    def test_refresh_bucket_recomputes_min_and_max_after_a_rescore(self):
+        day = date(2025, 6, 2)
+        answer_at(self.user, self.at(day, 9), accuracy=50)
+        high = answer_at(self.user, self.at(day, 18), accuracy=90)
+        answer_at(self.user, self.at(day + timedelta(days=1)), accuracy=10)
+
+        rollup = self.service.refresh_bucket(self.user, 'Python', day)
+        self.assertEqual((rollup.answer_count, rollup.accuracy_sum, rollup.accuracy_min, rollup.accuracy_max),
+                         (2, 140, 50, 90))
+
+        UserAnswer.objects.filter(pk=high.pk).update(accuracy=30)
+        rollup = self.service.refresh_bucket(self.user, 'Python', day)
+        self.assertEqual((rollup.accuracy_sum, rollup.accuracy_min, rollup.accuracy_max), (80, 30, 50))
+
+        UserAnswer.objects.filter(created_at__date=day).delete()
+        self.assertIsNone(self.service.refresh_bucket(self.user, 'Python', day))
+        self.assertFalse(DailyScoreRollup.objects.filter(day=day).exists())
+
+    def test_rebuild_matches_incremental_refreshes(self):
+        answers = [
+            answer_at(self.user, self.at(date(2025, 6, 2), 8), accuracy=40, clarity=60),
+            answer_at(self.user, self.at(date(2025, 6, 2), 20), accuracy=80, completeness=None),
+            answer_at(self.user, self.at(date(2025, 6, 3)), topic='SQL', accuracy=None),
+            answer_at(self.user, self.at(date(2025, 7, 1)), accuracy=70),
+        ]
+        for answer in answers:
+            self.service.refresh_for_answer(answer)
+        incremental = self.rollup_rows()
+        self.assertEqual(len(incremental), 3)
+
+        self.assertEqual(self.service.rebuild(user=self.user), 3)
+        self.assertEqual(self.rollup_rows(), incremental)
+
+        # A partial rebuild leaves buckets before `since` alone
+        DailyScoreRollup.objects.filter(day=date(2025, 6, 2)).update(accuracy_sum=0)
+        self.assertEqual(self.service.rebuild(user=self.user, since=date(2025, 6, 3)), 2)
+        self.assertEqual(DailyScoreRollup.objects.get(day=date(2025, 6, 2)).accuracy_sum, 0)
+
+    def test_trend_groups_by_day_week_and_month(self):
+        # 2025-06-02 and 06-04 share a week; 06-10 is the next week; 07-01 the next month
+        for day, accuracy in ((date(2025, 6, 2), 40), (date(2025, 6, 4), 80), (date(2025, 6, 10), 60),
+                              (date(2025, 7, 1), 100)):
+            self.service.refresh_for_answer(answer_at(self.user, self.at(day), accuracy=accuracy))
+
+        def series(bucket):
+            response = self.api.get(f'/api/score-trends/?bucket={bucket}&start=2025-06-01&end=2025-07-31')
+            self.assertEqual(response.status_code, 200)
+            return [(point['bucket'][:10], point['count'], point['accuracy']['avg'], point['accuracy']['min'],
+                     point['accuracy']['max']) for point in response.json()['series']]
+
+        self.assertEqual(len(series('day')), 4)
+        self.assertEqual(series('week'), [('2025-06-02', 2, 60.0, 40, 80), ('2025-06-09', 1, 60.0, 60, 60),
+                                          ('2025-06-30', 1, 100.0, 100, 100)])
+        self.assertEqual(series('month'), [('2025-06-01', 3, 60.0, 40, 80), ('2025-07-01', 1, 100.0, 100, 100)])
+
+        response = self.api.get('/api/score-trends/?bucket=week&start=2025-06-03&end=2025-06-09&topic=SQL')
+        self.assertEqual(response.json()['series'], [])
+
+    def test_trend_rejects_bad_parameters(self):
+        for query in ('bucket=year', 'start=2025-13-01', 'end=yesterday', 'start=2025-07-01&end=2025-06-01'):
+            response = self.api.get(f'/api/score-trends/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', response.json())
+
+
+class ScoreHistogramTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='histogram', password='histogram-pass-123')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.service = ScoreHistogramService()
+
+    def bins(self, topic='python'):
+        return dict(TopicScoreBin.objects.filter(topic=topic, count__gt=0).values_list('bin', 'count'))
+
+    def test_percentile_at_bin_edges(self):
+        self.assertEqual([score_bin(s) for s in (-5, 0, 4.99, 5, 99.9, 100, 150)], [0, 0, 0, 1, 19, 19, 19])
+        counts = {0: 2, 19: 2}
+        # Half of a score's own bin counts as below it
+        self.assertEqual(percentile_from_bins(counts, 0), 25.0)
+        self.assertEqual(percentile_from_bins(counts, 100), 75.0)
+        self.assertEqual(percentile_from_bins(counts, 50), 50.0)
+        self.assertIsNone(percentile_from_bins({}, 50))
+        self.assertIsNone(percentile_from_bins(counts, None))
+
+    def test_rescored_answer_moves_between_bins(self):
+        self.service.record('Python', 42)
+        self.service.record(' PYTHON ', 44, previous_score=42)
+        self.assertEqual(self.bins(), {8: 1})
+        self.service.record('python', 88, previous_score=44)
+        self.assertEqual(self.bins(), {17: 1})
+        self.assertEqual(self.service.percentile('Python', 88), 50.0)
+
+    @mock.patch('interview_core.services.AIService', side_effect=fake_ai_service)
+    def test_answer_response_and_dashboard_report_the_topic_percentile(self, _):
+        for _ in range(3):
+            self.service.record('Python', 20)
+        question = InterviewQuestion.objects.create(user=self.user, topic='Python', question='Q', answer='A')
+
+        response = self.api.post('/api/submit-answer/', {'question_id': question.id, 'answer_text': 'typed'})
+        self.assertEqual(response.status_code, 201)
+        # Accuracy 75: three scores below plus half of its own bin, out of four
+        self.assertEqual(response.json()['topic_percentile'], 87.5)
+        self.assertEqual(self.bins(), {4: 3, 15: 1})
+
+        stats = self.api.get('/api/dashboard-stats/').json()
+        self.assertEqual(stats['average_accuracy'], 75.0)
+        self.assertEqual(stats['topic_stats'], [
+            {'topic': 'Python', 'total': 1, 'answered': 1, 'average_accuracy': 75.0, 'percentile': 87.5}
+        ])
+
+
+class ReportExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='exporter-pass-123')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.answered = InterviewQuestion.objects.create(
+            user=self.user, topic='Python', question='What is a list?', answer='A sequence', is_answered=True)
+        self.answer = UserAnswer.objects.create(user=self.user, question=self.answered, user_text='An array, "mutable"',
+                                                accuracy=80, feedback='Good,\nbut short')
+        self.unanswered = InterviewQuestion.objects.create(user=self.user, topic='SQL', question='JOIN?', answer='A')
+        other = User.objects.create_user(username='other', password='other-pass-123')
+        InterviewQuestion.objects.create(user=other, topic='Python', question='Not mine', answer='A')
+
+    def download(self, export_format):
+        response = self.api.get(f'/api/report/?export={export_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'interview-report.{export_format}', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_has_one_record_per_question(self):
+        rows = [json.loads(line) for line in self.download('ndjson').splitlines()]
+        self.assertEqual([row['question']['id'] for row in rows], [self.answered.id, self.unanswered.id])
+        self.assertEqual(rows[0]['answer']['id'], self.answer.id)
+        self.assertEqual(rows[0]['answer']['user_text'], 'An array, "mutable"')
+        self.assertEqual(rows[0]['answer']['accuracy'], 80)
+        self.assertIsNone(rows[1]['answer'])
+        self.assertEqual(rows[1]['question']['topic'], 'SQL')
+
+    def test_csv_flattens_questions_and_leaves_missing_answers_blank(self):
+        header, *rows = csv.reader(io.StringIO(self.download('csv')))
+        self.assertEqual(header[:2], ['question_id', 'question_topic'])
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['answer_user_text'], 'An array, "mutable"')
+        self.assertEqual(rows[0]['answer_feedback'], 'Good,\nbut short')
+        self.assertEqual(rows[1]['question_question'], 'JOIN?')
+        self.assertEqual({name: value for name, value in rows[1].items() if name.startswith('answer_')},
+                         {name: '' for name in header if name.startswith('answer_')})
+
+    def test_unknown_export_format_is_rejected(self):
+        response = self.api.get('/api/report/?export=xlsx')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='pager-pass-123')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        # Seven questions over three timestamps, so pages split inside groups of ties
+        base = timezone.now() - timedelta(days=1)
+        self.questions = []
+        for i in range(7):
+            question = InterviewQuestion.objects.create(user=self.user, topic='Python', question=f'Q{i}', answer='A')
+            InterviewQuestion.objects.filter(pk=question.pk).update(created_at=base + timedelta(minutes=i // 3))
+            self.questions.append(question)
+
+    def expected_order(self):
+        return list(InterviewQuestion.objects.filter(user=self.user).order_by('-created_at', '-id')
+                    .values_list('id', flat=True))
+
+    def test_cursor_round_trip(self):
+        when = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(when, 42)), (when, 42))
+        for cursor in ('!!!', 'abc', encode_cursor(when, 1)[:-3],
+                       base64.urlsafe_b64encode(b'yesterday|5').decode(),
+                       base64.urlsafe_b64encode(b'2025-01-01T00:00:00+00:00|x').decode()):
+            with self.assertRaises(ValueError, msg=cursor):
+                decode_cursor(cursor)
+
+    def test_ties_are_neither_skipped_nor_repeated(self):
+        for page_size in (1, 2, 3, 4):
+            seen, cursor = [], None
+            while True:
+                items, cursor = keyset_page(InterviewQuestion.objects.filter(user=self.user), 'created_at',
+                                            cursor=cursor, page_size=page_size)
+                seen.extend(item.id for item in items)
+                if cursor is None:
+                    break
+            self.assertEqual(seen, self.expected_order(), page_size)
+
+    def test_api_follows_next_links_and_rejects_bad_cursors(self):
+        seen, url = [], '/api/questions/?page_size=3'
+        while url:
+            data = self.api.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(seen, self.expected_order())
+
+        tampered = base64.urlsafe_b64encode(b'2025-01-01T00:00:00+00:00|nope').decode()
+        for cursor in ('not-a-cursor', tampered):
+            response = self.api.get(f'/api/questions/?cursor={cursor}')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'detail': 'Invalid cursor'})
+            self.assertEqual(self.api.get(f'/api/saved-questions/?cursor={cursor}').status_code, 400)
+
+    def test_saved_questions_load_more_partial(self):
+        for question in self.questions:
+            SavedQuestion.objects.create(user=self.user, question=question)
+        SavedQuestion.objects.update(saved_at=timezone.now())
+        more = [InterviewQuestion.objects.create(user=self.user, topic='SQL', question=f'More {i}', answer='A')
+                for i in range(5)]
+        for question in more:
+            SavedQuestion.objects.create(user=self.user, question=question)
+        web = Client()
+        web.force_login(self.user)
+
+        page = web.get('/saved-questions/')
+        self.assertContains(page, 'id="load-more"')
+        self.assertEqual(len(page.context['saved_questions']), 10)
+        cursor = page.context['next_cursor']
+
+        partial = web.get('/saved-questions/', {'cursor': cursor, 'partial': 1})
+        self.assertNotContains(partial, '<html')
+        self.assertNotContains(partial, 'next-cursor')
+        first_ids = {saved.id for saved in page.context['saved_questions']}
+        rest_ids = {saved.id for saved in partial.context['saved_questions']}
+        self.assertEqual(len(rest_ids), 2)
+        self.assertEqual(first_ids | rest_ids, set(SavedQuestion.objects.values_list('id', flat=True)))
+
+        self.assertEqual(web.get('/saved-questions/', {'cursor': 'garbage', 'partial': 1}).status_code, 400)
+        # A stale link to the full page starts over instead of failing
+        self.assertEqual(web.get('/saved-questions/', {'cursor': 'garbage'}).status_code, 200)
+
+
+class InterviewSessionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sessions', password='sessions-pass-123')
+        for i in range(3):
+            InterviewQuestion.objects.create(user=self.user, topic='Python', question=f'Q{i}', answer='A')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_bad_count_is_rejected(self):
+        for count in ('abc', -1, 0, ''):
+            response = self.api.post('/api/sessions/', {'topic': 'Python', 'count': count})
+            self.assertEqual(response.status_code, 400, count)
+            self.assertEqual(response.json(), {'error': 'count must be a positive integer'})
+        self.assertFalse(InterviewSession.objects.exists())
+
+    def test_link_without_session_redirects_to_a_new_one(self):
+        web = Client()
+        web.force_login(self.user)
+        response = web.get('/interview/Python/?q=1')
+        interview_session = InterviewSession.objects.get()
+        self.assertRedirects(response, f'/interview/Python/?s={interview_session.id}&q=1')
+        for _ in range(2):
+            self.assertEqual(web.get(response.url).status_code, 200)
+        self.assertEqual(InterviewSession.objects.count(), 1)
+
+
+class RateLimiterTests(TestCase):
+    def test_burst_then_bounded_wait(self):
+        bucket = TokenBucket('test', rate=0.5, capacity=2)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 2, delta=0.1)
+        with self.assertRaises(RateLimitExceeded):
+            bucket.acquire(max_wait=0.5)
+
+    def test_queues_until_a_token_refills(self):
+        bucket = TokenBucket('test', rate=20, capacity=1)
+        bucket.acquire(max_wait=1)
+        self.assertGreater(bucket.acquire(max_wait=1), 0)
+
+    def test_upstream_429_drains_the_bucket(self):
+        bucket = TokenBucket('test', rate=20, capacity=5)
+        throttled = mock.Mock(status_code=429, headers={'Retry-After': '30'})
+        with self.assertRaises(RateLimitExceeded):
+            send_rate_limited(lambda: throttled, bucket=bucket, max_wait=1)
+        self.assertGreater(bucket.try_acquire(), 29)
+
+
+@override_settings(ADMISSION_MAX_CONCURRENT=2, ADMISSION_RATE_PER_MINUTE=60, ADMISSION_BURST=3)
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='busy', password='busy-pass-123')
+
+    def test_concurrency_cap(self):
+        leases = [acquire(self.user, 'answer') for _ in range(2)]
+        with self.assertRaises(AdmissionDenied):
+            acquire(self.user, 'answer')
+        release(leases[0])
+        acquire(self.user, 'answer')
+
+    def test_expired_lease_is_reclaimed(self):
+        acquire(self.user, 'answer')
+        acquire(self.user, 'answer')
+        AdmissionLease.objects.filter(user=self.user, slot=0).update(expires_at=timezone.now())
+        self.assertEqual(acquire(self.user, 'answer').slot, 0)
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch('interview_core.services.AIService', side_effect=fake_ai_service):
+            statuses = [client.post('/generate-questions/', {'topics': f'Topic {i}', 'count': 1}).status_code
+                        for i in range(4)]
+            response = client.post('/generate-questions/', {'topics': 'Again', 'count': 1})
+        self.assertEqual(statuses[:3], [302, 302, 302])
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse(AdmissionLease.objects.filter(user=self.user).exists())
+
+
+@override_settings(DEGRADE_QUEUE_DEPTH=[10, 20, 30, 40], DEGRADE_LATENCY_P95=[100, 200, 300, 400],
+                   DEGRADE_RECOVERY_RATIO=0.5, DEGRADE_HOLD_SECONDS=0)
+class DegradationTests(TestCase):
+    def test_levels_rise_immediately_and_recover_with_hysteresis(self):
+        controller = degradation.DegradationController()
+        self.assertEqual(controller._update(25), degradation.BRIEF_EVALUATION)
+        # Below the level-2 threshold but not below half of it: hold
+        self.assertEqual(controller._update(15), degradation.BRIEF_EVALUATION)
+        self.assertEqual(controller._update(5), degradation.CHEAP_MODEL)
+        self.assertEqual(controller._update(0), degradation.NORMAL)
+        controller.record_latency(350)
+        self.assertEqual(controller._update(0), degradation.QUESTION_BANK)
+
+        # The hold counts from the first recovered sample, not from the last level change
+        with override_settings(DEGRADE_HOLD_SECONDS=30), \
+                mock.patch('interview_core.degradation.time.monotonic') as monotonic:
+            monotonic.return_value = 1000.0
+            controller = degradation.DegradationController()
+            self.assertEqual(controller._update(35), degradation.QUESTION_BANK)
+            monotonic.return_value = 1060.0
+            self.assertEqual(controller._update(35), degradation.QUESTION_BANK)
+            monotonic.return_value = 1062.0
+            self.assertEqual(controller._update(5), degradation.QUESTION_BANK)
+            monotonic.return_value = 1064.0
+            self.assertEqual(controller._update(35), degradation.QUESTION_BANK)
+            monotonic.return_value = 1066.0
+            self.assertEqual(controller._update(5), degradation.QUESTION_BANK)
+            monotonic.return_value = 1096.0
+            self.assertEqual(controller._update(5), degradation.BRIEF_EVALUATION)
+            # The next step down needs a hold of its own
+            monotonic.return_value = 1098.0
+            self.assertEqual(controller._update(5), degradation.BRIEF_EVALUATION)
+
+    @override_settings(DEGRADATION_LEVEL=degradation.QUESTION_BANK)
+    def test_question_bank_is_used_before_the_llm(self):
+        other = User.objects.create_user(username='other', password='other-pass-123')
+        for i in range(3):
+            InterviewQuestion.objects.create(user=other, topic='Go', question=f'Bank {i}?', answer='A')
+        user = User.objects.create_user(username='loaded', password='loaded-pass-123')
+        with mock.patch('interview_core.services.AIService', side_effect=fake_ai_service):
+            from .services import InterviewService
+            service = InterviewService()
+            questions = service.create_questions(user, 'Go', 4)
+        self.assertEqual(sorted(q.question for q in questions)[:3], ['Bank 0?', 'Bank 1?', 'Bank 2?'])
+        service.ai_service.generate_questions.assert_called_once_with('Go', 1, 'medium')
+
+    @override_settings(DEGRADATION_LEVEL=degradation.BRIEF_EVALUATION)
+    @mock.patch.dict(os.environ, {'OPENROUTER_API_KEY': 'key'})
+    def test_brief_evaluation_skips_sub_scores(self):
+        user = User.objects.create_user(username='brief', password='brief-pass-123')
+        question = InterviewQuestion.objects.create(user=user, topic='Go', question='Q', answer='A')
+        with mock.patch.object(AIService, '_make_api_request', return_value='{"accuracy": 60, "feedback": "OK"}') as request:
+            from .services import InterviewService
+            with mock.patch('interview_core.services.AudioService', side_effect=fake_audio_service):
+                answer = InterviewService().process_answer(user, question.id, None, 'Typed answer')
+        prompt, operation = request.call_args.args
+        self.assertEqual(operation, 'evaluate_degraded')
+        self.assertNotIn('clarity_score', prompt)
+        self.assertNotIn('strengths', prompt)
+
+        answer.refresh_from_db()
+        self.assertEqual(answer.accuracy, 60)
+        self.assertEqual((answer.clarity_score, answer.completeness_score, answer.technical_accuracy_score),
+                         (None, None, None))
+        # Trend averages only cover answers that have the score
+        answer_at(user, answer.created_at, topic='Go', clarity=80)
+        ScoreRollupService().rebuild(user=user)
+        point, = ScoreRollupService().trend(user, answer.created_at.date(), answer.created_at.date())
+        self.assertEqual((point['count'], point['accuracy']['avg'], point['clarity']['avg']), (2, 55.0, 80.0))
+
+    @override_settings(DEGRADATION_LEVEL=degradation.TEXT_ONLY)
+    def test_text_only_mode_rejects_audio_but_accepts_typed_answers(self):
+        user = User.objects.create_user(username='audio', password='audio-pass-123')
+        question = InterviewQuestion.objects.create(user=user, topic='Go', question='Q', answer='A')
+        client = Client()
+        client.force_login(user)
+        audio = SimpleUploadedFile('answer.wav', b'RIFF', content_type='audio/wav')
+        response = client.post('/submit-answer/', {'question_id': question.id, 'audio_file': audio})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+        # Typed answers still go straight to evaluation, without touching the transcriber
+        with mock.patch('interview_core.services.AIService', side_effect=fake_ai_service), \
+                mock.patch('interview_core.services.AudioService', side_effect=fake_audio_service) as audio_service:
+            response = client.post('/submit-answer/', {'question_id': question.id, 'answer_text': ' Typed answer '})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['accuracy'], FAKE_COMPARISON['accuracy'])
+        self.assertEqual(UserAnswer.objects.get(question=question).user_text, 'Typed answer')
+        audio_service.return_value.transcribe_audio.assert_not_called()
+
+
+@override_settings(DEGRADATION_LEVEL=0, METRICS_TOKEN='scrape-token', SERVER_TIMING=True)
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='timed', password='timed-pass-123')
+        self.question = InterviewQuestion.objects.create(user=self.user, topic='Go', question='Q', answer='A')
+        self.client.force_login(self.user)
+
+    def test_stages_reach_server_timing_and_metrics(self):
+        with mock.patch('interview_core.services.AIService', side_effect=fake_ai_service), \
+                mock.patch('interview_core.services.AudioService', side_effect=fake_audio_service):
+            response = self.client.post('/submit-answer/', {'question_id': self.question.id, 'answer_text': 'Typed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db_write;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        body = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token').content.decode()
+        self.assertIn('interview_stage_duration_seconds_count{stage="db_write",model=""}', body)
+        self.assertIn('interview_http_request_duration_seconds_bucket{route="submit-answer/",method="POST",status="2xx",le="+Inf"}', body)
+        self.assertIn('interview_degradation_level 0', body)
+
+    def test_model_names_in_server_timing_are_staff_only(self):
+        def evaluate(*args):
+            timing.record('llm_request', 0.5, 'secret/model')
+            return FAKE_COMPARISON
+
+        def submit():
+            ai_service = fake_ai_service()
+            ai_service.compare_answers.side_effect = evaluate
+            with mock.patch('interview_core.services.AIService', return_value=ai_service), \
+                    mock.patch('interview_core.services.AudioService', side_effect=fake_audio_service):
+                return self.client.post('/submit-answer/', {'question_id': self.question.id, 'answer_text': 'Typed'})
+
+        response = submit()
+        self.assertIn('llm_request;dur=500.0,', response['Server-Timing'])
+        self.assertNotIn('secret/model', response['Server-Timing'])
+
+        self.user.is_staff = True
+        self.user.save()
+        self.assertIn('llm_request;dur=500.0;desc="secret/model"', submit()['Server-Timing'])
+
+        with override_settings(SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing', submit())
+
+    def test_metrics_require_staff_or_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(Client().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        overrides = override_settings(PROFILING_ENABLED=True, PROFILE_DIR=profile_dir.name, PROFILE_MAX_FILES=2,
+                                      PROFILE_INTERVAL=0.001, DEGRADATION_LEVEL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.user = User.objects.create_user(username='profiled', password='profiled-pass-123')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_only_staff_or_token_holders_are_profiled(self):
+        self.client.get('/profile/?_profile=1')
+        self.assertFalse(RequestProfile.objects.exists())
+
+        response = Client().get('/login/', HTTP_X_PROFILE_TOKEN=profiling.make_token())
+        profile = RequestProfile.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(profile.path, '/login/')
+        self.assertTrue(os.path.exists(profile.file_path))
+
+    def test_profiles_form_a_ring_buffer(self):
+        self.user.is_staff = True
+        self.user.save()
+        for _ in range(3):
+            self.client.get('/profile/?_profile=1')
+        profiles = list(RequestProfile.objects.all())
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual(sorted(os.listdir(settings.PROFILE_DIR)), sorted(p.file_name for p in profiles))
+
+
+@override_settings(MEMORY_CEILING_MB=500)
+class MemoryWatchdogTests(TestCase):
+    def test_worker_recycles_itself_once_past_the_ceiling(self):
+        monitor = watchdog.MemoryWatchdog(interval=30, ceiling_mb=500)
+        with mock.patch('interview_core.watchdog.process_memory', side_effect=[
+            {'rss_mb': 600.0, 'pss_mb': 400.0},
+            {'rss_mb': 700.0, 'pss_mb': 520.0},
+            {'rss_mb': 720.0, 'pss_mb': 530.0},
+        ]), mock.patch('interview_core.watchdog.os.kill') as kill:
+            for _ in range(3):
+                monitor.sample()
+        # PSS is what counts, and SIGTERM (graceful shutdown) is sent only once
+        kill.assert_called_once_with(os.getpid(), signal.SIGTERM)
+        state = monitor.state()
+        self.assertTrue(state['recycling'])
+        self.assertEqual(state['peak_mb'], 530.0)
+
+    def test_sibling_workers_are_only_listed_under_gunicorn(self):
+        staff = APIClient()
+        staff.force_authenticate(User(username='ops', is_staff=True))
+        pidfile = tempfile.NamedTemporaryFile('w', suffix='.pid', delete=False)
+        pidfile.close()
+        self.addCleanup(os.unlink, pidfile.name)
+
+        def workers(master_pid):
+            with open(pidfile.name, 'w') as handle:
+                handle.write(f'{master_pid}\n')
+            with mock.patch.dict(os.environ, {'GUNICORN_PIDFILE': pidfile.name}), \
+                    mock.patch('interview_core.views.child_pids', return_value=[os.getpid(), 4242]), \
+                    mock.patch('interview_core.views.process_memory', return_value={'pss_mb': 80.0}):
+                return staff.get('/api/memory/').json()['other_workers']
+
+        self.assertEqual(workers(os.getppid()), [{'pid': 4242, 'pss_mb': 80.0}])
+        # The parent is not the gunicorn master (runserver, uvicorn, a shell or PID 1)
+        self.assertEqual(workers(os.getppid() + 1), [])
+
+
+class SingleFlightTests(TestCase):
+    def test_duplicate_within_reuse_window_gets_the_first_result(self):
+        self.assertEqual(run_once('test', [1], lambda: {'value': 1}), {'value': 1})
+        duplicate = mock.Mock()
+        self.assertEqual(run_once('test', [1], duplicate), {'value': 1})
+        duplicate.assert_not_called()
+
+    def test_follower_waits_for_the_in_flight_call(self):
+        call = CoalescedCall.objects.create(key=make_key('test', [2]), scope='test', started_at=timezone.now())
+
+        def leader_finishes(_):
+            CoalescedCall.objects.filter(pk=call.pk).update(status='done', result={'value': 2}, completed_at=timezone.now())
+
+        duplicate = mock.Mock()
+        with mock.patch('interview_core.singleflight.time.sleep', side_effect=leader_finishes):
+            self.assertEqual(run_once('test', [2], duplicate), {'value': 2})
+        duplicate.assert_not_called()
+
+    def test_follower_shares_the_leader_failure(self):
+        call = CoalescedCall.objects.create(key=make_key('test', [3]), scope='test', started_at=timezone.now())
+
+        def leader_fails(_):
+            CoalescedCall.objects.filter(pk=call.pk).update(status='failed', completed_at=timezone.now())
+
+        with mock.patch('interview_core.singleflight.time.sleep', side_effect=leader_fails):
+            with self.assertRaises(SingleFlightError):
+                run_once('test', [3], mock.Mock())
+
+    def test_generate_form_double_submit_creates_one_session(self):
+        user = User.objects.create_user(username='double', password='double-pass-123')
+        client = Client()
+        client.force_login(user)
+        with mock.patch('interview_core.services.AIService', side_effect=fake_ai_service):
+            first = client.post('/generate-questions/', {'topics': 'Python', 'count': 2})
+            second = client.post('/generate-questions/', {'topics': 'Python', 'count': 2})
+        self.assertEqual(first['Location'], second['Location'])
+        self.assertEqual(InterviewQuestion.objects.filter(user=user).count(), 2)
+
+
+@override_settings(LLM_MODELS={'generate': ['model-a', 'model-b']}, LLM_HEDGE_DEFAULT_DELAY=5, LLM_BREAKER_FAILURES=2)
+class LLMClientTests(TestCase):
+    def setUp(self):
+        self.behaviour = {}
+        self.calls = []
+        for target, kwargs in (
+            ('interview_core.llm.send_rate_limited', {'side_effect': lambda send: (send(), 0.0)}),
+            ('interview_core.llm.requests.post', {'side_effect': self.fake_post}),
+            ('interview_core.llm.circuit_breaker', {'new': llm.CircuitBreaker()}),
+            ('interview_core.llm.latency_tracker', {'new': llm.LatencyTracker()}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_post(self, url, headers, json, timeout):
+        model = json['model']
+        self.calls.append(model)
+        delay, status_code = self.behaviour.get(model, (0, 200))
+        time.sleep(delay)
+        return mock.Mock(status_code=status_code, text='error', json=lambda: {
+            'choices': [{'message': {'content': f'from {model}'}}]
+        })
+
+    def test_wsgi_views_close_their_http_client(self):
+        clients = []
+
+        @per_request_http_client
+        async def view(request):
+            clients.append(llm.get_async_http_client())
+            return HttpResponse()
+
+        for _ in range(2):
+            async_to_sync(view)(RequestFactory().get('/'))
+        self.assertIsNot(clients[0], clients[1])
+        self.assertTrue(all(client.is_closed for client in clients))
+
+        # Under ASGI the loop outlives requests, so they share its client
+        async def serve_two():
+            for _ in range(2):
+                await view(AsyncRequestFactory().get('/'))
+            await clients[-1].aclose()
+        asyncio.run(serve_two())
+        self.assertIs(clients[2], clients[3])
+
+    def test_falls_back_to_the_next_model(self):
+        self.behaviour['model-a'] = (0, 500)
+        client = llm.LLMClient('generate', api_key='key')
+        self.assertEqual(client.complete('prompt'), 'from model-b')
+        self.assertEqual(client.last_model, 'model-b')
+
+    @override_settings(LLM_HEDGE_DEFAULT_DELAY=0.05)
+    def test_hedges_a_slow_call(self):
+        self.behaviour['model-a'] = (1, 200)
+        start = time.monotonic()
+        self.assertEqual(llm.LLMClient('generate', api_key='key').complete('prompt'), 'from model-b')
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_breaker_skips_a_failing_model(self):
+        self.behaviour['model-a'] = (0, 500)
+        client = llm.LLMClient('generate', api_key='key')
+        for _ in range(3):
+            client.complete('prompt')
+        self.assertEqual(self.calls.count('model-a'), 2)
+
+    def test_all_models_failing_raises(self):
+        self.behaviour.update({'model-a': (0, 500), 'model-b': (0, 503)})
+        with self.assertRaises(llm.LLMRequestError):
+            llm.LLMClient('generate', api_key='key').complete('prompt')
+
+    def test_recorded_completions_replay_without_network(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'llm.jsonl.gz')
+            with override_settings(LLM_TRANSPORT='record', LLM_FIXTURES_PATH=path):
+                self.assertEqual(llm.LLMClient('generate', api_key='key').complete('prompt'), 'from model-a')
+            self.assertEqual(self.calls, ['model-a'])
+
+            with override_settings(LLM_TRANSPORT='replay', LLM_FIXTURES_PATH=path), \
+                    mock.patch.dict(os.environ, {'OPENROUTER_API_KEY': ''}):
+                llm_fixtures._store = None  # read the file afresh, as a new worker would
+                self.assertEqual(llm.LLMClient('generate').complete('prompt'), 'from model-a')
+                self.assertEqual(asyncio.run(llm.LLMClient('generate').acomplete('prompt')), 'from model-a')
+                with self.assertRaises(llm.LLMRequestError):
+                    llm.LLMClient('generate').complete('never recorded')
+            self.assertEqual(self.calls, ['model-a'])
+
+    @override_settings(LLM_TRANSPORT='replay', LLM_MODELS=dict.fromkeys(('generate', 'evaluate', 'evaluate_degraded'), ['model-a']))
+    def test_replay_needs_no_api_key(self):
+        with mock.patch.dict(os.environ, {'OPENROUTER_API_KEY': ''}):
+            AIService()
+
+
+@override_settings(DEBUG=True)
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def test_headers_are_added_in_debug(self):
+        user = User.objects.create_user(username='headers', password='headers-pass-123')
+        client = Client()
+        client.force_login(user)
+        response = client.get('/profile/')
+        self.assertIn('X-DB-Query-Count', response)
+        self.assertIn('X-DB-Query-Time-Ms', response)
+        self.assertEqual(response['X-DB-Duplicate-Queries'], '0')
+
+
+class BenchmarkTests(TestCase):
+    def test_baseline_comparison_flags_only_slowdowns_past_the_threshold(self):
+        baseline = {'benchmarks': {'a': {'median_ms': 10.0}, 'b': {'median_ms': 10.0}, 'gone': {'median_ms': 1.0}}}
+        results = {'benchmarks': {'a': {'median_ms': 11.0}, 'b': {'median_ms': 13.0}, 'new': {'median_ms': 5.0}}}
+        rows = {name: regressed for name, _, _, _, regressed in benchmark.compare(results, baseline, 0.2)}
+        self.assertEqual(rows, {'a': False, 'b': True})
+
+    def test_resume_fixtures_extract_every_page(self):
+        from .resume_parser import ResumeParser
+        with tempfile.TemporaryDirectory() as directory:
+            for extension, build in (('pdf', benchmark.pdf_bytes), ('docx', benchmark.docx_bytes)):
+                path = os.path.join(directory, f'resume.{extension}')
+                with open(path, 'wb') as f:
+                    f.write(build(3))
+                extract = getattr(ResumeParser(), f'extract_text_from_{extension}')
+                self.assertEqual(extract(path).count(benchmark.RESUME_LINE), 3 * benchmark.LINES_PER_PAGE)
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='retention', password='retention-pass-123')
+        self.old = timezone.now() - timedelta(days=400)
+
+    def question(self, **fields):
+        question = InterviewQuestion.objects.create(user=self.user, topic='Python', question='Q', answer='A', **fields)
+        InterviewQuestion.objects.filter(pk=question.pk).update(created_at=self.old)
+        return question
+
+    def test_purge_deletes_only_expired_rows_in_batches(self):
+        unused = [self.question() for _ in range(5)]
+        saved = self.question()
+        SavedQuestion.objects.create(user=self.user, question=saved)
+        answered = self.question(is_answered=True)
+        UserAnswer.objects.create(user=self.user, question=answered, user_text='answer')
+        recent = InterviewQuestion.objects.create(user=self.user, topic='Python', question='Q', answer='A')
+
+        cutoff = retention.cutoff_for('unsaved_questions', days=90)
+        self.assertEqual(retention.purge('unsaved_questions', cutoff, dry_run=True), 5)
+        self.assertEqual(InterviewQuestion.objects.count(), 8)
+
+        # 3 batches (2, 2, 1 rows), each its own savepoint with a bounded set of queries
+        with self.assertNumQueries(21):
+            self.assertEqual(retention.purge('unsaved_questions', cutoff, batch_size=2, sleep=0), 5)
+        self.assertFalse(InterviewQuestion.objects.filter(pk__in=[q.pk for q in unused]).exists())
+        self.assertEqual(set(InterviewQuestion.objects.values_list('pk', flat=True)), {saved.pk, answered.pk, recent.pk})
+
+    def test_purged_answers_leave_their_questions_purgeable(self):
+        purged = self.question(is_answered=True)
+        old_answer = UserAnswer.objects.create(user=self.user, question=purged, user_text='old')
+        UserAnswer.objects.filter(pk=old_answer.pk).update(created_at=self.old)
+        kept = self.question(is_answered=True)
+        UserAnswer.objects.create(user=self.user, question=kept, user_text='recent')
+        # Left answered by a purge from before is_answered was reset
+        stale = self.question(is_answered=True)
+
+        self.assertEqual(retention.purge('answers', retention.cutoff_for('answers', days=30), sleep=0), 1)
+        self.assertEqual(dict(InterviewQuestion.objects.values_list('pk', 'is_answered')),
+                         {purged.pk: False, kept.pk: True, stale.pk: True})
+
+        cutoff = retention.cutoff_for('unsaved_questions', days=90)
+        self.assertEqual(retention.purge('unsaved_questions', cutoff, sleep=0), 2)
+        self.assertEqual(list(InterviewQuestion.objects.values_list('pk', flat=True)), [kept.pk])
+
+    def test_latest_resume_is_kept(self):
+        resumes = [Resume.objects.create(user=self.user, extracted_text=str(i)) for i in range(3)]
+        for i, resume in enumerate(resumes):
+            Resume.objects.filter(pk=resume.pk).update(uploaded_at=self.old + timedelta(days=i))
+        self.assertEqual(retention.purge('resumes', retention.cutoff_for('resumes', days=30), sleep=0), 2)
+        self.assertEqual(list(Resume.objects.values_list('pk', flat=True)), [resumes[-1].pk])
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='archive', password='archive-pass-123')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        overrides = override_settings(ARCHIVE_DIR=archive_dir.name, ARCHIVE_USER_BUCKETS=4)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def question(self, days_ago, answered=False):
+        question = InterviewQuestion.objects.create(user=self.user, topic='Python', question=f'Q{days_ago}', answer='A')
+        if answered:
+            UserAnswer.objects.create(user=self.user, question=question, user_text='answer', accuracy=0.5)
+            UserAnswer.objects.filter(question=question).update(created_at=timezone.now() - timedelta(days=days_ago))
+        InterviewQuestion.objects.filter(pk=question.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return question
+
+    def test_archive_moves_old_history_and_report_merges_it(self):
+        old = [self.question(400, answered=True), self.question(430), self.question(470, answered=True)]
+        saved = self.question(420)
+        SavedQuestion.objects.create(user=self.user, question=saved)
+        recent = self.question(5, answered=True)
+
+        cutoff = archive.cutoff_for(365)
+        self.assertEqual(sum(q for _, q, _ in archive.archive(cutoff, dry_run=True)), 3)
+        results = archive.archive(cutoff, batch_size=2, sleep=0)
+        self.assertEqual(sum(q for _, q, _ in results), 3)
+        self.assertEqual(sum(a for _, _, a in results), 2)
+        self.assertEqual(set(InterviewQuestion.objects.values_list('pk', flat=True)), {saved.pk, recent.pk})
+        self.assertEqual(UserAnswer.objects.count(), 1)
+
+        response = self.api.get('/api/report/')
+        self.assertEqual(len(response.json()['questions']), 2)
+        with self.assertNumQueries(API_BUDGETS[('GET', 'report/')]):
+            response = self.api.get('/api/report/?include_archived=1')
+        data = response.json()
+        self.assertEqual({q['id'] for q in data['questions']}, {q.pk for q in old + [saved, recent]})
+        self.assertEqual(len(data['answers']), 3)
+        self.assertIn({'id': old[0].pk, 'topic': 'Python', 'question': 'Q400', 'answer': 'A'},
+                      [a['question'] for a in data['answers']])
+
+        response = self.api.get('/api/report/?export=ndjson&include_archived=1')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+
+    def test_changing_the_bucket_count_keeps_older_files_readable(self):
+        first = self.question(400, answered=True)
+        archive.archive(archive.cutoff_for(365), sleep=0)
+        with override_settings(ARCHIVE_USER_BUCKETS=1):
+            self.assertNotEqual(self.user.id % 1, self.user.id % 4)
+            second = self.question(500)
+            archive.archive(archive.cutoff_for(365), sleep=0)
+            self.assertEqual(len(list(Path(settings.ARCHIVE_DIR).glob('*/*.jsonl.gz'))), 2)
+            self.assertEqual({q.pk for q in archive.iter_archived(self.user)}, {first.pk, second.pk})
+            data = self.api.get('/api/report/?include_archived=1').json()
+        self.assertEqual({q['id'] for q in data['questions']}, {first.pk, second.pk})
+        self.assertEqual(len(data['answers']), 1)
+
+    def test_unknown_compression_is_rejected(self):
+        self.question(400)
+        with self.assertRaises(archive.ArchiveError):
+            archive.archive(archive.cutoff_for(365), compression='lz4')
+        self.assertEqual(InterviewQuestion.objects.count(), 1)
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self, *extra):
+        call_command('generate_synthetic_data', '--users', '30', '--topics', '20', '--seed', '7',
+                     '--end-date', '2025-06-30', '--skip-aggregates', *extra, stdout=io.StringIO())
+        return list(InterviewQuestion.objects.order_by('created_at', 'question').values_list(
+            'user__username', 'topic', 'question', 'is_answered', 'created_at'))
+
+    def test_same_seed_regenerates_identical_data(self):
+        first = self.generate()
+        self.assertEqual(self.generate('--clear'), first)
+        self.assertEqual(UserAnswer.objects.count(), InterviewQuestion.objects.filter(is_answered=True).count())
+        # Zipf popularity: the top-ranked topic is asked about more than any other
+        topics = Counter(topic for _, topic, _, _, _ in first)
+        self.assertEqual(topics.most_common(1)[0][0], 'Python')
+
+
+class StartupTests(TestCase):
+    def test_worker_boot_does_not_import_ml_stack(self):
+        script = (
+            "import sys, backend.wsgi, backend.urls, interview_core.template_views; "
+            "print(sorted(m for m in ('transformers', 'torch', 'librosa') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        self.assertEqual(output, '[]')
@@ -0,0 +1,84 @@
+"""Per-request stage timers.
+
+ServerTimingMiddleware opens a RequestTimings for each request in a context
+variable. Code on the hot path wraps its stages in `stage(...)` (or calls
+`record(...)` with a duration it measured itself). Every timing feeds the
+metrics histograms, and the timings for the current request become its
+Server-Timing header. Context variables follow sync_to_async and the LLM
+executor threads, so stages run off the request thread are counted too.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.entries = []
+        self.started = time.perf_counter()
+        # Whether DEBUG/INFO logs from this request are kept; see logsampling.SampledFilter
+        self.log_sampled = random.random() < settings.LOG_SAMPLE_RATE
+
+    def add(self, name, seconds, model=None):
+        # list.append is atomic, so hedged LLM threads can add concurrently
+        self.entries.append((name, seconds, model))
+
+    def used_models(self):
+        return any(model for _, _, model in self.entries)
+
+    def header(self, with_models=True):
+        """Server-Timing value: one entry per stage with the summed duration, plus the total.
+
+        with_models names the LLM models behind each stage in its desc.
+        """
+        totals = {}
+        for name, seconds, model in self.entries:
+            entry = totals.setdefault(name, [0.0, []])
+            entry[0] += seconds
+            if model and model not in entry[1]:
+                entry[1].append(model)
+        parts = []
+        for name, (seconds, models) in totals.items():
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if models and with_models:
+                part += f';desc="{",".join(models)}"'
+            parts.append(part)
+        parts.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def begin():
+    """Start timing a request; returns a token for end()"""
+    return _current.set(RequestTimings())
+
+
+def end(token):
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def current():
+    return _current.get()
+
+
+def record(name, seconds, model=None):
+    """Record a stage duration measured by the caller"""
+    metrics.stage_duration.observe(seconds, stage=name, model=model or '')
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds, model)
+
+
+@contextmanager
+def stage(name, model=None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started, model)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import RegisterView, InterviewQuestionListView, SaveQuestionView, ListSavedQuestionsView, UserAnswerCreateView, GenerateQuestionsView, FullUserReportView, UserProfileView
+from .views import RegisterView, InterviewQuestionListView, SaveQuestionView, ListSavedQuestionsView, UserAnswerCreateView, GenerateQuestionsView, InterviewSessionCreateView, InterviewSessionDetailView, FullUserReportView, ScoreTrendView, UserProfileView, WorkerMemoryView
 from .filters import DashboardStatsView
+from .async_views import generate_questions_api, submit_answer_api
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -14,7 +15,12 @@ urlpatterns = [
     path('submit-answer/', UserAnswerCreateView.as_view(), name='submit-answer'),
     path('generate-questions/<str:topic>/', GenerateQuestionsView.as_view(), name='generate-questions'),
     path('generate-questions/', GenerateQuestionsView.as_view(), name='generate_questions'),
+    path('async/generate-questions/', generate_questions_api, name='async-generate-questions'),
+    path('async/submit-answer/', submit_answer_api, name='async-submit-answer'),
+    path('sessions/', InterviewSessionCreateView.as_view(), name='interview-sessions'),
+    path('sessions/<int:pk>/', InterviewSessionDetailView.as_view(), name='interview-session-detail'),
     path('report/', FullUserReportView.as_view(), name='full-user-report'),
+    path('score-trends/', ScoreTrendView.as_view(), name='score-trends'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path("test-token/", lambda r: JsonResponse({"message": "token route works"})),
@@ -22,5 +28,6 @@ urlpatterns = [
     path('save-question/', SaveQuestionView.as_view(), name='save-question'),   
     path('saved-questions/', ListSavedQuestionsView.as_view(), name='saved-questions'),
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('memory/', WorkerMemoryView.as_view(), name='worker-memory'),
 
 ]
@@ -1,18 +1,41 @@
+import hmac
 import logging
+import os
+from datetime import date, timedelta
 from rest_framework import generics, status, permissions
 from rest_framework.views import APIView
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import serializers
+from rest_framework.authentication import SessionAuthentication
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import InterviewQuestion, UserAnswer, SavedQuestion
-from .serializers import RegisterSerializer, InterviewQuestionSerializer, UserAnswerSerializer, UserSerializer, SavedQuestionSerializer
-from .services import InterviewService
-from .pagination import StandardResultsSetPagination
+from django.utils import timezone
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Prefetch
+from django.utils.decorators import method_decorator
+from .models import InterviewQuestion, UserAnswer, SavedQuestion, InterviewSession
+from .serializers import RegisterSerializer, InterviewQuestionSerializer, UserAnswerSerializer, UserSerializer, SavedQuestionSerializer, InterviewSessionSerializer
+from .services import InterviewService, InterviewSessionService
+from .rollups import ScoreRollupService, BUCKET_FUNCTIONS
+from .pagination import KeysetPagination, SavedQuestionKeysetPagination
+from .exports import iter_report_rows, stream_ndjson, stream_csv
+from .archive import iter_archived
+from . import degradation, metrics
+from .memory import child_pids, gunicorn_master_pid, process_memory
+from .watchdog import memory_state
+from .admission import admission_control
+from .singleflight import SingleFlightError, idempotency_key, run_idempotent
 
 logger = logging.getLogger(__name__)
 
+# export query value -> (content type, file extension, row encoder)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', stream_ndjson),
+    'csv': ('text/csv', 'csv', stream_csv),
+}
+
 # --------------------
 # Auth Views
 # --------------------
@@ -28,19 +51,23 @@ class RegisterView(generics.CreateAPIView):
 
 class InterviewQuestionListView(generics.ListAPIView):
     serializer_class = InterviewQuestionSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = KeysetPagination
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return InterviewQuestion.objects.filter(user=self.request.user).order_by('-created_at')
+        return InterviewQuestion.objects.filter(user=self.request.user)
 
 
 
 class GenerateQuestionsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(admission_control('generate'))
     def get(self, request, topic):
-        count = int(request.GET.get('count', 4))
+        try:
+            count = InterviewService.clean_count(request.GET.get('count'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         difficulty = request.GET.get('difficulty', 'medium')
         
         try:
@@ -57,21 +84,30 @@ class GenerateQuestionsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @method_decorator(admission_control('generate'))
     def post(self, request):
         topic = request.data.get('topic')
-        count = int(request.data.get('count', 4))
         difficulty = request.data.get('difficulty', 'medium')
         
         if not topic:
             return Response({"error": "Topic is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            count = InterviewService.clean_count(request.data.get('count'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
             interview_service = InterviewService()
-            created_questions = interview_service.create_questions(request.user, topic, count, difficulty)
+            # Retries and double-clicks with the same parameters share one generation
+            interview_session = InterviewSessionService().start_once(
+                request.user, [topic, count, difficulty], topic,
+                lambda: interview_service.create_questions(request.user, topic, count, difficulty)
+            )
             
             # Redirect to interview page
             from django.shortcuts import redirect
-            return redirect('interview', topic=topic)
+            from django.urls import reverse
+            return redirect(f"{reverse('interview', kwargs={'topic': topic})}?s={interview_session.id}")
         
         except Exception as e:
             logger.error(f"Failed to generate questions for topic {topic}: {str(e)}")
@@ -85,28 +121,58 @@ class GenerateQuestionsView(APIView):
 # --------------------
 
 class UserAnswerCreateView(APIView):
-    parser_classes = (MultiPartParser, FormParser)
+    # JSON is accepted for typed answers (answer_text), which carry no file
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(admission_control('answer'))
     def post(self, request, format=None):
         audio_file = request.FILES.get('audio_file')
         question_id = request.data.get('question_id')
+        try:
+            answer_text = InterviewService.clean_answer_text(request.data.get('answer_text'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not audio_file or not question_id:
+        if not (audio_file or answer_text) or not question_id:
             return Response(
-                {"error": "Missing audio file or question ID"}, 
+                {"error": "Missing question ID, or an audio file or answer text"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
+        if answer_text is None and degradation.controller.level() >= degradation.TEXT_ONLY:
+            return Response(
+                {"error": degradation.AUDIO_UNAVAILABLE_MESSAGE},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(degradation.AUDIO_RETRY_AFTER)}
+            )
+
+        def submit():
             interview_service = InterviewService()
             answer = interview_service.process_answer(
-                request.user, question_id, audio_file
+                request.user, question_id, audio_file, answer_text
             )
             
             serializer = UserAnswerSerializer(answer)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            data = serializer.data
+            data['topic_percentile'] = answer.topic_percentile
+            return data
         
+        key = idempotency_key(request)
+        try:
+            if key is None:
+                data, replayed = submit(), False
+            else:
+                # A retry with the same key gets the stored result without re-running Whisper or the LLM
+                data, replayed = run_idempotent('answer', [request.user.id, str(question_id), key], submit)
+            
+            response = Response(data, status=status.HTTP_201_CREATED)
+            if replayed:
+                response['Idempotent-Replayed'] = 'true'
+            return response
+        
+        except SingleFlightError as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             logger.error(f"Failed to process answer for question {question_id}: {str(e)}")
             return Response(
@@ -115,13 +181,99 @@ class UserAnswerCreateView(APIView):
             )
     
 
+# --------------------
+# Interview Sessions
+# --------------------
+
+class InterviewSessionCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        topic = request.data.get('topic')
+        question_ids = request.data.get('question_ids')
+        session_service = InterviewSessionService()
+
+        if not topic:
+            return Response({"error": "Topic is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if question_ids:
+            try:
+                question_ids = [int(question_id) for question_id in question_ids]
+            except (TypeError, ValueError):
+                return Response({"error": "question_ids must be a list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+            owned_ids = set(InterviewQuestion.objects.filter(
+                user=request.user, id__in=question_ids
+            ).values_list('id', flat=True))
+            if owned_ids != set(question_ids):
+                return Response({"error": "Unknown question ids"}, status=status.HTTP_400_BAD_REQUEST)
+            interview_session = InterviewSession.objects.create(
+                user=request.user, topic=topic, question_ids=question_ids
+            )
+        else:
+            try:
+                count = InterviewService.clean_count(request.data.get('count'))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            interview_session = session_service.start_latest(request.user, topic, count)
+            if interview_session is None:
+                return Response({"error": f"No questions found for topic: {topic}"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = InterviewSessionSerializer(interview_session)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class InterviewSessionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self, pk):
+        return generics.get_object_or_404(InterviewSession, pk=pk, user=self.request.user)
+
+    def get(self, request, pk):
+        serializer = InterviewSessionSerializer(self.get_object(pk))
+        return Response(serializer.data)
+
+    def patch(self, request, pk):
+        interview_session = self.get_object(pk)
+        try:
+            current_index = int(request.data.get('current_index'))
+        except (TypeError, ValueError):
+            return Response({"error": "current_index must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        InterviewSessionService().move_to(interview_session, current_index)
+        serializer = InterviewSessionSerializer(interview_session)
+        return Response(serializer.data)
+
+
 class FullUserReportView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
+        include_archived = request.GET.get('include_archived', '').lower() in ('1', 'true', 'yes')
+        
+        # Streaming export keeps memory flat for users with a large history
+        export_format = request.GET.get('export')
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return Response(
+                    {"error": f"export must be one of: {', '.join(EXPORT_FORMATS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            content_type, extension, encoder = EXPORT_FORMATS[export_format]
+            response = StreamingHttpResponse(encoder(iter_report_rows(user, include_archived=include_archived)), content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="interview-report.{extension}"'
+            return response
+        
         questions = InterviewQuestion.objects.filter(user=user)
-        answers = UserAnswer.objects.filter(user=user)
+        answers = UserAnswer.objects.filter(user=user).select_related('user', 'question')
+        if include_archived:
+            # Archived history is older than anything hot, so it goes after it
+            questions, answers = list(questions), list(answers)
+            hot_ids = {question.id for question in questions}
+            for question in iter_archived(user):
+                if question.id not in hot_ids:
+                    questions.append(question)
+                    answers.extend(question.archived_answers)
 
         q_serializer = InterviewQuestionSerializer(questions, many=True)
         a_serializer = UserAnswerSerializer(answers, many=True)
@@ -132,6 +284,41 @@ class FullUserReportView(APIView):
         })
 
 
+class ScoreTrendView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        bucket = request.GET.get('bucket', 'day')
+        if bucket not in BUCKET_FUNCTIONS:
+            return Response(
+                {"error": f"bucket must be one of: {', '.join(BUCKET_FUNCTIONS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+            start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return Response(
+                {"error": "start and end must be dates in YYYY-MM-DD format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if start > end:
+            return Response({"error": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+
+        topic = request.GET.get('topic')
+        series = ScoreRollupService().trend(request.user, start, end, bucket=bucket, topic=topic)
+
+        return Response({
+            "start": start,
+            "end": end,
+            "bucket": bucket,
+            "topic": topic,
+            "series": series,
+        })
+
+
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
@@ -162,7 +349,58 @@ class SaveQuestionView(generics.CreateAPIView):
 class ListSavedQuestionsView(generics.ListAPIView):
     serializer_class = SavedQuestionSerializer
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = SavedQuestionKeysetPagination
 
     def get_queryset(self):
-        return SavedQuestion.objects.filter(user=self.request.user)
+        return SavedQuestion.objects.filter(user=self.request.user).select_related('question').prefetch_related(
+            Prefetch(
+                'question__user_answers',
+                queryset=UserAnswer.objects.filter(user=self.request.user),
+                to_attr='user_answer_list'
+            )
+        )
+
+
+# --------------------
+# Memory
+# --------------------
+
+class WorkerMemoryView(APIView):
+    """Memory watchdog report for the worker serving the request, plus its sibling gunicorn workers.
+
+    ?allocations=1 adds the tracemalloc allocation sites that grew most (needs MEMORY_TRACEMALLOC).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        report = memory_state(include_allocations=request.query_params.get('allocations') == '1')
+        # Only a gunicorn master's other children are workers; under runserver,
+        # uvicorn or a container init they would be unrelated processes
+        siblings = []
+        if gunicorn_master_pid() == os.getppid():
+            siblings = [pid for pid in child_pids(os.getppid()) if pid != os.getpid()]
+        report['other_workers'] = [{'pid': pid, **(process_memory(pid) or {})} for pid in siblings]
+        return Response(report)
+
+
+# --------------------
+# Metrics
+# --------------------
+
+class CanViewMetrics(permissions.BasePermission):
+    """Staff users, or a scraper presenting METRICS_TOKEN as a bearer token"""
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class MetricsView(APIView):
+    # Session auth only: the bearer token here is METRICS_TOKEN, not a JWT
+    authentication_classes = [SessionAuthentication]
+    permission_classes = [CanViewMetrics]
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
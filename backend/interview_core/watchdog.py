@@ -0,0 +1,150 @@
+"""Per-worker memory watchdog.
+
+Started in every gunicorn worker by gunicorn.conf.py. A daemon thread samples
+the worker's memory every MEMORY_WATCHDOG_INTERVAL seconds. Once PSS (RSS
+where PSS is unavailable) passes MEMORY_CEILING_MB, the worker sends itself
+SIGTERM. That is gunicorn's and uvicorn's graceful shutdown: the worker stops
+accepting requests, finishes the ones in flight and exits, and the master
+starts a fresh replacement.
+
+With MEMORY_TRACEMALLOC on, tracemalloc runs in the worker and the report
+includes the allocation sites that grew most since the worker started.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+import tracemalloc
+from collections import deque
+from django.conf import settings
+from .memory import process_memory, format_memory
+
+logger = logging.getLogger(__name__)
+
+# Samples kept for the report; at the default interval this is the last hour
+SAMPLE_HISTORY = 120
+
+
+def _tracemalloc_filters():
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ]
+
+
+def _ceiling_value(report):
+    return report.get('pss_mb', report.get('rss_mb', 0))
+
+
+class MemoryWatchdog:
+    def __init__(self, interval, ceiling_mb):
+        self.interval = interval
+        self.ceiling_mb = ceiling_mb
+        self.samples = deque(maxlen=SAMPLE_HISTORY)
+        self.peak_mb = 0.0
+        self.recycling = False
+        self._baseline = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if settings.MEMORY_TRACEMALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(settings.MEMORY_TRACEMALLOC_FRAMES)
+            self._baseline = tracemalloc.take_snapshot().filter_traces(_tracemalloc_filters())
+        report = process_memory()
+        if self.ceiling_mb and report and _ceiling_value(report) > self.ceiling_mb:
+            # Recycling would just restart into the same state, over and over
+            logger.error(
+                "MEMORY_CEILING_MB=%s is below worker %s's footprint at boot (%s); not recycling",
+                self.ceiling_mb, os.getpid(), format_memory(report)
+            )
+            self.ceiling_mb = 0
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name='memory-watchdog', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Memory watchdog sample failed")
+
+    def sample(self):
+        report = process_memory()
+        if not report:
+            return None
+        self.samples.append((time.time(), report))
+        self.peak_mb = max(self.peak_mb, _ceiling_value(report))
+        if self.ceiling_mb and not self.recycling and _ceiling_value(report) > self.ceiling_mb:
+            self._recycle(report)
+        return report
+
+    def _recycle(self, report):
+        self.recycling = True
+        logger.warning(
+            "Worker %s is over the %sMB memory ceiling (%s); recycling after in-flight requests finish",
+            os.getpid(), self.ceiling_mb, format_memory(report)
+        )
+        for allocation in self.top_allocations(limit=10) or []:
+            logger.warning("  %s: %+.1fKB in %+d blocks", allocation['location'],
+                           allocation['size_diff_kb'], allocation['count_diff'])
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def top_allocations(self, limit=20):
+        """Allocation sites by growth since the worker started, or None without tracemalloc"""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_tracemalloc_filters())
+        if self._baseline is not None:
+            stats = snapshot.compare_to(self._baseline, 'lineno')
+        else:
+            stats = snapshot.statistics('lineno')
+        return [
+            {
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_kb': round(stat.size / 1024, 1),
+                'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1),
+                'count_diff': getattr(stat, 'count_diff', stat.count),
+            }
+            for stat in stats[:limit]
+        ]
+
+    def state(self, include_allocations=False):
+        current = self.samples[-1][1] if self.samples else process_memory()
+        report = {
+            'pid': os.getpid(),
+            'ceiling_mb': self.ceiling_mb or None,
+            'peak_mb': self.peak_mb,
+            'recycling': self.recycling,
+            'current': current,
+            'history': [{'at': at, 'mb': _ceiling_value(sample)} for at, sample in self.samples],
+        }
+        if include_allocations:
+            report['top_allocations'] = self.top_allocations()
+        return report
+
+
+watchdog = None
+
+
+def start_watchdog():
+    """Start this process's watchdog once; a no-op when MEMORY_WATCHDOG is off"""
+    global watchdog
+    if watchdog is None and settings.MEMORY_WATCHDOG:
+        watchdog = MemoryWatchdog(settings.MEMORY_WATCHDOG_INTERVAL, settings.MEMORY_CEILING_MB).start()
+    return watchdog
+
+
+def memory_state(include_allocations=False):
+    """The watchdog's report, or a one-off sample in processes without a watchdog"""
+    if watchdog is not None:
+        return watchdog.state(include_allocations)
+    return MemoryWatchdog(0, settings.MEMORY_CEILING_MB).state(include_allocations)
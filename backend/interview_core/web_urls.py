@@ -5,6 +5,8 @@ from .template_views import (
     save_question_view, saved_questions_view, profile_view, upload_resume_view,
     resume_interview_view
 )
+from .async_views import upload_resume_async_view
+from .views import MetricsView
 
 urlpatterns = [
     path('', dashboard_view, name='dashboard'),
@@ -19,4 +21,7 @@ urlpatterns = [
     path('profile/', profile_view, name='profile'),
     path('resume-interview/', resume_interview_view, name='resume_interview'),
     path('upload-resume/', upload_resume_view, name='upload_resume'),
+    path('async/upload-resume/', upload_resume_async_view, name='upload_resume_async'),
+    # No trailing slash: Prometheus scrapes /metrics by default
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
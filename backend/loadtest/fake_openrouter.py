@@ -0,0 +1,216 @@
+"""Local stand-in for the OpenRouter chat completions API.
+
+Answers POST /api/v1/chat/completions with well-formed JSON for each of the
+app's prompts (question generation, answer evaluation, resume parsing) after a
+log-normal delay. It can also fail a share of requests with 500s or 429s and
+stream replies as server-sent events when the request sets "stream": true.
+Stdlib only, so it runs anywhere the backend does.
+
+    python loadtest/fake_openrouter.py --port 9100 --latency 1.5 --error-rate 0.02
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/api/v1 gunicorn -c gunicorn.conf.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = '/api/v1/chat/completions'
+
+
+def _generation(prompt):
+    count = re.search(r'\*\*exactly (\d+)\*\*', prompt)
+    topic = re.search(r'about \*\*(.+?)\*\*', prompt)
+    count = int(count.group(1)) if count else 4
+    topic = topic.group(1) if topic else 'software engineering'
+    return json.dumps([
+        {
+            'question': f'Question {i + 1} about {topic}: how would you explain {topic} to a colleague?',
+            'answer': f'A clear explanation of {topic} covering its purpose, trade-offs and a practical example.',
+        }
+        for i in range(count)
+    ])
+
+
+def _evaluation(prompt):
+    scores = {key: random.randint(40, 95) for key in (
+        'accuracy', 'clarity_score', 'completeness_score', 'technical_accuracy_score'
+    )}
+    if 'one sentence overall assessment' in prompt:
+        return json.dumps({**scores, 'feedback': 'A reasonable answer that covers the main idea.'})
+    return json.dumps({
+        **scores,
+        'feedback': 'A reasonable answer that covers the main idea but could go deeper.',
+        'strengths': 'Clear structure; correct core concept.',
+        'improvements': 'Add a concrete example and discuss trade-offs.',
+        'missing_points': 'Edge cases and performance considerations.',
+    })
+
+
+def _resume():
+    return json.dumps({
+        'skills': ['Python', 'Django', 'PostgreSQL', 'Docker'],
+        'experience': ['Backend Developer at Example Corp', 'Data Engineer'],
+        'projects': ['Interview practice platform', 'ETL pipeline'],
+    })
+
+
+def completion_text(prompt):
+    """Reply in the shape the app's parser for this prompt expects"""
+    if "Candidate's Answer" in prompt:
+        return _evaluation(prompt)
+    if 'Analyze this resume' in prompt:
+        return _resume()
+    if 'interview questions' in prompt:
+        return _generation(prompt)
+    return 'OK'
+
+
+class FakeOpenRouter:
+    def __init__(self, latency, sigma, error_rate, throttle_rate, model_latency):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.model_latency = model_latency
+        self.lock = threading.Lock()
+        self.counts = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    def delay(self, model):
+        median = self.model_latency.get(model, self.latency)
+        return median * random.lognormvariate(0, self.sigma) if self.sigma else median
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+
+def make_handler(fake, verbose):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            if verbose:
+                super().log_message(format, *args)
+
+        def _json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            # Counters, handy when checking how many calls a load test really made
+            with fake.lock:
+                self._json(200, dict(fake.counts))
+
+        def do_POST(self):
+            if self.path.rstrip('/') != COMPLETIONS_PATH:
+                self._json(404, {'error': {'message': 'Not found'}})
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            model = payload.get('model', 'fake/model')
+            prompt = ''.join(message.get('content', '') for message in payload.get('messages', []))
+            fake.count('requests')
+
+            roll = random.random()
+            if roll < fake.throttle_rate:
+                fake.count('throttled')
+                self._json(429, {'error': {'message': 'Rate limit exceeded'}}, {'Retry-After': '1'})
+                return
+
+            delay = fake.delay(model)
+            if roll < fake.throttle_rate + fake.error_rate:
+                time.sleep(delay)
+                fake.count('errors')
+                self._json(500, {'error': {'message': 'Injected upstream error'}})
+                return
+
+            content = completion_text(prompt)
+            completion_id = f'gen-{uuid.uuid4().hex[:12]}'
+            if payload.get('stream'):
+                self._stream(completion_id, model, content, delay)
+                return
+            time.sleep(delay)
+            self._json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4},
+            })
+
+        def _stream(self, completion_id, model, content, delay):
+            """Server-sent events: the first chunk after ~30% of the delay, the rest spread over the remainder"""
+            chunks = [content[i:i + 40] for i in range(0, len(content), 40)] or ['']
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            time.sleep(delay * 0.3)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    time.sleep(delay * 0.7 / len(chunks))
+                event = {
+                    'id': completion_id,
+                    'object': 'chat.completion.chunk',
+                    'model': model,
+                    'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}],
+                }
+                self.wfile.write(f'data: {json.dumps(event)}\n\n'.encode())
+                self.wfile.flush()
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+def _model_latency(values):
+    latencies = {}
+    for value in values:
+        model, _, seconds = value.rpartition('=')
+        latencies[model] = float(seconds)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake OpenRouter chat completions server for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--latency', type=float, default=1.5, help='Median response time in seconds')
+    parser.add_argument('--sigma', type=float, default=0.4,
+                        help='Log-normal spread of response times (0 = constant latency)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Share of requests answered immediately with a 429')
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=SECONDS',
+                        help='Median latency for one model, e.g. to exercise hedging and fallback')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    fake = FakeOpenRouter(args.latency, args.sigma, args.error_rate, args.throttle_rate,
+                          _model_latency(args.model_latency))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake, args.verbose))
+    server.daemon_threads = True
+    print(f'Fake OpenRouter on http://{args.host}:{args.port}/api/v1 '
+          f'(median {args.latency}s, errors {args.error_rate:.0%}, 429s {args.throttle_rate:.0%})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f'Served {fake.counts}')
+
+
+if __name__ == '__main__':
+    main()
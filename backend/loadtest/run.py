@@ -0,0 +1,249 @@
+"""Load generator that drives full interview journeys against a running server.
+
+Each virtual user registers, gets a JWT, generates a question set, opens the
+session, answers every question (a short WAV recording, or typed text for
+--text-ratio of users) and loads the dashboard. A --resume-ratio share of
+users also log in through the web pages and upload a DOCX resume. Users start
+evenly over --ramp-up seconds and repeat the journey until --duration runs out.
+
+Point the server at loadtest/fake_openrouter.py and TRANSCRIBER_BACKEND=stub so
+the numbers measure this app rather than OpenRouter or the GPU:
+
+    python -m loadtest.run --base-url http://127.0.0.1:8000 --users 20 --duration 60
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import random
+import re
+import struct
+import time
+import uuid
+import wave
+from collections import defaultdict
+
+import httpx
+
+TOPICS = ['Python', 'Django', 'PostgreSQL', 'System Design', 'Docker', 'REST APIs', 'Algorithms']
+ANSWER_TEXT = (
+    'It separates the concerns cleanly: the interface stays stable while the implementation can change, '
+    'which keeps the callers simple and makes the behaviour easy to test.'
+)
+REJECTED = (429, 503)
+
+
+def wav_bytes(seconds=2.0, rate=16000):
+    """A mono 16-bit tone; the stub transcriber never looks at the samples"""
+    frames = b''.join(
+        struct.pack('<h', int(8000 * math.sin(2 * math.pi * 440 * i / rate)))
+        for i in range(int(seconds * rate))
+    )
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+    return buffer.getvalue()
+
+
+def docx_bytes():
+    from docx import Document
+
+    document = Document()
+    document.add_heading('Jordan Example', 0)
+    document.add_paragraph('Skills: Python, Django, PostgreSQL, Docker, Redis')
+    document.add_paragraph('Experience: Backend Developer at Example Corp, 2019-2024')
+    document.add_paragraph('Projects: Interview practice platform; ETL pipeline for billing data')
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+class Stats:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.outcomes = defaultdict(lambda: {'ok': 0, 'rejected': 0, 'errors': 0})
+        self.journeys = 0
+
+    def add(self, name, seconds, outcome):
+        self.samples[name].append(seconds)
+        self.outcomes[name][outcome] += 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            endpoints[name] = {
+                'count': len(ordered),
+                **self.outcomes[name],
+                'rps': round(len(ordered) / elapsed, 2),
+                **{f'p{p}_ms': round(_percentile(ordered, p) * 1000, 1) for p in (50, 95, 99)},
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        return {
+            'elapsed_seconds': round(elapsed, 1),
+            'requests': total,
+            'requests_per_second': round(total / elapsed, 2),
+            'journeys_completed': self.journeys,
+            'endpoints': endpoints,
+        }
+
+
+def _percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class VirtualUser:
+    def __init__(self, client, stats, args, rng, audio, resume):
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.audio = audio
+        self.resume = resume
+        self.username = f'load-{uuid.uuid4().hex[:12]}'
+        self.password = uuid.uuid4().hex
+        self.headers = {}
+
+    async def call(self, name, method, url, expect=(200,), **kwargs):
+        """Time one request; a wrong status raises so the journey starts over"""
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.add(name, time.perf_counter() - started, 'errors')
+            raise
+        elapsed = time.perf_counter() - started
+        if response.status_code in expect:
+            self.stats.add(name, elapsed, 'ok')
+            return response
+        self.stats.add(name, elapsed, 'rejected' if response.status_code in REJECTED else 'errors')
+        raise JourneyFailed(f'{name}: HTTP {response.status_code}')
+
+    async def think(self):
+        if self.args.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+
+    async def sign_up(self):
+        await self.call('register', 'POST', '/api/register/', expect=(201,), json={
+            'username': self.username, 'email': f'{self.username}@example.com', 'password': self.password,
+        })
+        response = await self.call('token', 'POST', '/api/token/', json={
+            'username': self.username, 'password': self.password,
+        })
+        self.headers = {'Authorization': f"Bearer {response.json()['access']}"}
+
+    async def interview(self):
+        response = await self.call('generate_questions', 'POST', '/api/generate-questions/', expect=(302,),
+                                   headers=self.headers, json={
+                                       'topic': self.rng.choice(TOPICS),
+                                       'count': self.args.questions,
+                                       'difficulty': self.rng.choice(['easy', 'medium', 'hard']),
+                                   })
+        session_id = re.search(r'[?&]s=(\d+)', response.headers.get('location', '')).group(1)
+        response = await self.call('session', 'GET', f'/api/sessions/{session_id}/', headers=self.headers)
+
+        typed = self.rng.random() < self.args.text_ratio
+        for question in response.json()['questions']:
+            await self.think()
+            headers = {**self.headers, 'Idempotency-Key': uuid.uuid4().hex}
+            if typed:
+                await self.call('submit_answer_text', 'POST', '/api/submit-answer/', expect=(201,),
+                                headers=headers, json={'question_id': question['id'], 'answer_text': ANSWER_TEXT})
+            else:
+                await self.call('submit_answer_audio', 'POST', '/api/submit-answer/', expect=(201,),
+                                headers=headers, data={'question_id': str(question['id'])},
+                                files={'audio_file': ('answer.wav', self.audio, 'audio/wav')})
+        await self.call('dashboard_stats', 'GET', '/api/dashboard-stats/', headers=self.headers)
+
+    async def upload_resume(self):
+        """The web flow: session login with CSRF, then a multipart resume upload"""
+        await self.call('login_page', 'GET', '/login/')
+        csrf = self.client.cookies.get('csrftoken')
+        await self.call('login', 'POST', '/login/', expect=(302,), data={
+            'username': self.username, 'password': self.password, 'csrfmiddlewaretoken': csrf,
+        })
+        response = await self.call('upload_resume', 'POST', '/upload-resume/', expect=(302,),
+                                   headers={'X-CSRFToken': self.client.cookies.get('csrftoken')},
+                                   data={'count': str(self.args.questions), 'difficulty': 'medium'},
+                                   files={'resume': ('resume.docx', self.resume,
+                                                     'application/vnd.openxmlformats-officedocument.wordprocessingml.document')})
+        if '/interview/' not in response.headers.get('location', ''):
+            raise JourneyFailed('upload_resume: did not redirect to the interview')
+
+    async def run(self, deadline):
+        await self.sign_up()
+        if self.rng.random() < self.args.resume_ratio:
+            await self.upload_resume()
+        while time.monotonic() < deadline:
+            await self.interview()
+            self.stats.journeys += 1
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+async def user_loop(index, args, stats, deadline, audio, resume):
+    await asyncio.sleep(args.ramp_up * index / max(1, args.users))
+    rng = random.Random(args.seed + index)
+    while time.monotonic() < deadline:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            try:
+                await VirtualUser(client, stats, args, rng, audio, resume).run(deadline)
+            except (JourneyFailed, httpx.HTTPError, KeyError, ValueError, AttributeError):
+                # Back off briefly, then start over as a new user
+                await asyncio.sleep(1)
+
+
+async def main_async(args):
+    stats = Stats()
+    audio = wav_bytes(args.audio_seconds)
+    resume = docx_bytes() if args.resume_ratio else None
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(user_loop(i, args, stats, deadline, audio, resume) for i in range(args.users)))
+    return stats.report(time.monotonic() - started)
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['requests_per_second']} req/s), {report['journeys_completed']} interviews completed")
+    print(f"{'endpoint':<22}{'count':>7}{'ok':>7}{'429/503':>9}{'errors':>8}{'rps':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in report['endpoints'].items():
+        print(f"{name:<22}{row['count']:>7}{row['ok']:>7}{row['rejected']:>9}{row['errors']:>8}{row['rps']:>8}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive interview journeys against a running server')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+    parser.add_argument('--ramp-up', type=float, default=10, help='Seconds over which users start')
+    parser.add_argument('--questions', type=int, default=3, help='Questions per interview')
+    parser.add_argument('--text-ratio', type=float, default=0.2, help='Share of interviews answered by typing')
+    parser.add_argument('--resume-ratio', type=float, default=0.1, help='Share of users who upload a resume')
+    parser.add_argument('--think-time', type=float, default=1.0, help='Mean pause before each answer, seconds')
+    parser.add_argument('--audio-seconds', type=float, default=2.0, help='Length of the uploaded recordings')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout, seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()